@@ -0,0 +1,153 @@
+"""
+Main content extraction module
+Readability-style boilerplate removal: scores text blocks by length, commas,
+link density and class hints and keeps the densest region of the page
+"""
+from typing import Dict, Optional, Union
+import re
+import logging
+
+from html_parsing import parse_tree
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Never content, dropped with their subtrees
+BOILERPLATE_TAGS = ('script', 'style', 'noscript', 'template', 'nav', 'footer', 'header',
+                    'aside', 'iframe', 'svg', 'button', 'select', 'menu')
+
+# Forms are dropped only when they look like search or login boxes: ASP.NET
+# WebForms pages wrap the whole body in one <form>
+FORM_HINT_RE = re.compile(r'search|login|log-in|signin|sign-in|subscribe|newsletter', re.IGNORECASE)
+
+# class/id hints
+UNLIKELY_RE = re.compile(
+    r'nav|menu|footer|header|sidebar|breadcrumb|cookie|consent|banner|share|social|'
+    r'comment|advert|promo|popup|modal|skip|search|related|newsletter', re.IGNORECASE)
+MAYBE_RE = re.compile(r'and|article|body|column|main|content', re.IGNORECASE)
+POSITIVE_RE = re.compile(
+    r'article|body|content|entry|main|page|post|text|story|program|course|'
+    r'description|overview|detail|curriculum', re.IGNORECASE)
+NEGATIVE_RE = re.compile(
+    r'hidden|nav|menu|footer|sidebar|meta|widget|sponsor|share|social|comment|'
+    r'banner|breadcrumb|cookie|related|promo', re.IGNORECASE)
+
+# Paragraph-like elements whose text is scored
+SCORED_TAGS = ('p', 'pre', 'td', 'li', 'dd', 'blockquote', 'h2', 'h3', 'h4')
+
+# Starting score of a candidate container, by tag
+TAG_WEIGHTS = {
+    'main': 10, 'article': 10, 'section': 3, 'div': 5, 'pre': 3, 'td': 3, 'blockquote': 3,
+    'address': -3, 'ol': -3, 'ul': -3, 'dl': -3, 'dd': -3, 'dt': -3, 'li': -3,
+    'h1': -5, 'h2': -5, 'h3': -5, 'h4': -5, 'h5': -5, 'h6': -5, 'th': -5,
+}
+
+# Elements that end a line when rendered; text_content() would glue their text together
+BLOCK_TAGS = ('p', 'div', 'section', 'article', 'main', 'li', 'ul', 'ol', 'dl', 'dt', 'dd',
+              'table', 'tr', 'td', 'th', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre',
+              'blockquote', 'address', 'br', 'hr')
+
+MIN_BLOCK_LENGTH = 25
+# Below this the extraction is not trusted and the whole body is used
+MIN_CONTENT_LENGTH = 200
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(text.split())
+
+
+def _class_weight(element) -> int:
+    weight = 0
+    for attribute in (element.get('class'), element.get('id')):
+        if attribute:
+            if NEGATIVE_RE.search(attribute):
+                weight -= 25
+            if POSITIVE_RE.search(attribute):
+                weight += 25
+    return weight
+
+
+def _link_density(element, text_length: int) -> float:
+    if not text_length:
+        return 0.0
+    link_length = sum(len(_normalize(link.text_content())) for link in element.iter('a'))
+    return min(1.0, link_length / text_length)
+
+
+def _strip_boilerplate(root):
+    """Drop non-content tags and containers whose class/id marks them as chrome"""
+    for element in list(root.iter(*BOILERPLATE_TAGS)):
+        if element.getparent() is not None:
+            element.drop_tree()
+    for form in list(root.iter('form')):
+        hints = ' '.join(form.get(name, '') for name in ('class', 'id', 'role', 'action'))
+        if FORM_HINT_RE.search(hints) and form.getparent() is not None:
+            form.drop_tree()
+    for element in list(root.iter()):
+        if not isinstance(element.tag, str):
+            # Comments and processing instructions
+            if element.getparent() is not None:
+                element.drop_tree()
+            continue
+        if element.tag in ('html', 'body', 'main', 'article') or element.getparent() is None:
+            continue
+        hints = f"{element.get('class', '')} {element.get('id', '')}"
+        if hints.strip() and UNLIKELY_RE.search(hints) and not MAYBE_RE.search(hints):
+            element.drop_tree()
+    for element in root.iter(*BLOCK_TAGS):
+        element.tail = ' ' + (element.tail or '')
+
+
+def extract_main_content(content: Union[bytes, str]) -> Dict[str, Optional[str]]:
+    """
+    Main text of an HTML page, plus its declared language
+    Returns {'text': whitespace-normalized main text, 'lang': <html lang> or None}
+    """
+    root = parse_tree(content)
+    lang = root.get('lang') or root.get('xml:lang')
+    _strip_boilerplate(root)
+
+    # Score every paragraph-like block into its parent (full) and grandparent (half)
+    scores = {}
+    for block in root.iter(*SCORED_TAGS):
+        text = _normalize(block.text_content())
+        if len(text) < MIN_BLOCK_LENGTH:
+            continue
+        block_score = 1 + text.count(',') + min(len(text) // 100, 3)
+        parent = block.getparent()
+        for ancestor, share in ((parent, 1.0), (parent.getparent() if parent is not None else None, 0.5)):
+            if ancestor is None or not isinstance(ancestor.tag, str):
+                continue
+            if ancestor not in scores:
+                scores[ancestor] = TAG_WEIGHTS.get(ancestor.tag, 0) + _class_weight(ancestor)
+            scores[ancestor] += block_score * share
+
+    body = root.find('body')
+    fallback = _normalize((body if body is not None else root).text_content())
+    if not scores:
+        return {'text': fallback, 'lang': lang}
+
+    # Links-heavy regions (menus, link lists) lose most of their score
+    final = {}
+    for element, score in scores.items():
+        text_length = len(_normalize(element.text_content()))
+        final[element] = score * (1 - _link_density(element, text_length))
+    top = max(final, key=final.get)
+
+    # Siblings that score well belong to the same article
+    threshold = max(10.0, final[top] * 0.2)
+    parts = []
+    parent = top.getparent()
+    siblings = parent if parent is not None else [top]
+    for sibling in siblings:
+        if sibling is top or final.get(sibling, float('-inf')) >= threshold:
+            parts.append(_normalize(sibling.text_content()))
+        elif isinstance(sibling.tag, str) and sibling.tag == 'p':
+            text = _normalize(sibling.text_content())
+            if len(text) > 80 and _link_density(sibling, len(text)) < 0.25:
+                parts.append(text)
+    text = ' '.join(part for part in parts if part)
+
+    if len(text) < MIN_CONTENT_LENGTH:
+        text = fallback
+    return {'text': text, 'lang': lang}
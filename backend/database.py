@@ -13,6 +13,15 @@ logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
+# Columns added after tables were first created: (table, column, SQL type, backfill statement)
+MIGRATION_COLUMNS = [
+    ('programs', 'delivery_mode', 'VARCHAR', "UPDATE programs SET delivery_mode = 'offline' WHERE delivery_mode IS NULL"),
+    ('universities', 'website_url', 'VARCHAR', None),
+    ('universities', 'website_status', 'VARCHAR', None),
+    ('universities', 'website_checked_at', 'DATETIME', None),
+    ('programs', 'simhash', 'VARCHAR', None),
+]
+
 class University(Base):
     """University model"""
     __tablename__ = "universities"
@@ -22,6 +31,9 @@ class University(Base):
     translated_name = Column(String, index=True)
     country = Column(String, nullable=False, index=True)
     exists_in_gotouniversity = Column(Boolean, default=False)
+    website_url = Column(String)  # Resolved homepage
+    website_status = Column(String)  # resolved, unresolved (None = never tried)
+    website_checked_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -42,7 +54,8 @@ class Program(Base):
     delivery_mode = Column(String, default="offline")  # online, offline, hybrid, bilingual
     visited = Column(Boolean, default=False)
     content_hash = Column(String, index=True)  # SHA256 hash
-    embedding_vector = Column(LargeBinary)  # Stored as bytes
+    simhash = Column(String)  # 64-bit SimHash of the main text, 16 hex digits
+    embedding_vector = Column(LargeBinary)  # float32 bytes; copy of the embedding store entry (migration fallback)
     last_checked = Column(DateTime, default=datetime.utcnow)
     last_modified_header = Column(String)
     etag = Column(String)
@@ -54,6 +67,26 @@ class Program(Base):
     university = relationship("University", back_populates="programs")
 
 
+class Job(Base):
+    """Background job model (university fetch, program search)"""
+    __tablename__ = "jobs"
+    
+    id = Column(String, primary_key=True)  # UUID hex
+    kind = Column(String, nullable=False, index=True)
+    status = Column(String, nullable=False, default="queued", index=True)  # queued, running, completed, failed, cancelled, interrupted
+    params = Column(Text)  # JSON
+    progress_current = Column(Integer, default=0)
+    progress_total = Column(Integer, default=0)
+    message = Column(String)
+    result = Column(Text)  # JSON, partial while running
+    error = Column(Text)
+    cancel_requested = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class Database:
     """Database manager"""
     
@@ -86,23 +119,27 @@ class Database:
                 return  # Database will be created with correct schema
             
             inspector = inspect(self.engine)
+            tables = inspector.get_table_names()
             
-            # Check if programs table exists
-            if 'programs' in inspector.get_table_names():
-                columns = [col['name'] for col in inspector.get_columns('programs')]
+            for table, column, sql_type, backfill in MIGRATION_COLUMNS:
+                # Tables that don't exist yet are created with the full schema
+                if table not in tables:
+                    continue
+                columns = [col['name'] for col in inspector.get_columns(table)]
                 
-                if 'delivery_mode' not in columns:
+                if column not in columns:
                     try:
-                        logger.info("Migrating database: Adding delivery_mode column...")
+                        logger.info(f"Migrating database: Adding {table}.{column} column...")
                         with self.engine.begin() as conn:
                             # SQLite ALTER TABLE ADD COLUMN (no DEFAULT in ALTER)
-                            conn.execute(text("ALTER TABLE programs ADD COLUMN delivery_mode VARCHAR"))
+                            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}"))
                             # Update existing rows to have default value
-                            conn.execute(text("UPDATE programs SET delivery_mode = 'offline' WHERE delivery_mode IS NULL"))
-                        logger.info("✅ Migration complete: delivery_mode column added")
+                            if backfill:
+                                conn.execute(text(backfill))
+                        logger.info(f"✅ Migration complete: {column} column added")
                     except Exception as e:
                         logger.warning(f"Migration failed: {e}")
-                        logger.info("Database will work, but delivery_mode may not be available. Delete database to recreate with correct schema.")
+                        logger.info(f"Database will work, but {column} may not be available. Delete database to recreate with correct schema.")
         except Exception as e:
             logger.warning(f"Migration check failed: {e}. Database will be created/recreated as needed.")
             # Migration failed, but database will still work
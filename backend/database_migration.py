@@ -6,6 +6,8 @@ from sqlalchemy import create_engine, text, inspect
 import os
 import logging
 
+from database import MIGRATION_COLUMNS
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -26,23 +28,26 @@ def migrate_database(db_path: str = None):
         engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
         inspector = inspect(engine)
         
-        # Check if programs table exists
-        if 'programs' in inspector.get_table_names():
-            columns = [col['name'] for col in inspector.get_columns('programs')]
+        tables = inspector.get_table_names()
+        
+        for table, column, sql_type, backfill in MIGRATION_COLUMNS:
+            # Check if table exists
+            if table not in tables:
+                logger.info(f"{table} table doesn't exist yet. Will be created with correct schema.")
+                continue
+            columns = [col['name'] for col in inspector.get_columns(table)]
             
-            if 'delivery_mode' not in columns:
-                logger.info("Adding delivery_mode column to programs table...")
+            if column not in columns:
+                logger.info(f"Adding {column} column to {table} table...")
                 with engine.begin() as conn:
                     # SQLite doesn't support DEFAULT in ALTER TABLE easily
                     # So we add column, then update existing rows
-                    conn.execute(text("ALTER TABLE programs ADD COLUMN delivery_mode VARCHAR"))
-                    conn.execute(text("UPDATE programs SET delivery_mode = 'offline' WHERE delivery_mode IS NULL"))
-                    conn.commit()
-                logger.info("✅ Migration complete: delivery_mode column added")
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}"))
+                    if backfill:
+                        conn.execute(text(backfill))
+                logger.info(f"✅ Migration complete: {column} column added")
             else:
-                logger.info("✅ Database already has delivery_mode column")
-        else:
-            logger.info("Programs table doesn't exist yet. Will be created with correct schema.")
+                logger.info(f"✅ Database already has {table}.{column} column")
     
     except Exception as e:
         logger.error(f"Migration error: {e}")
@@ -0,0 +1,161 @@
+"""
+Embedding backend module
+Loads the sentence embedding model on the selected inference backend:
+PyTorch (sentence-transformers), ONNX Runtime, or int8-quantized ONNX
+"""
+from typing import List, Optional, Sequence, Tuple
+import json
+import os
+import platform
+import logging
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+# int8 exports published with the sentence-transformers models, per CPU family
+QUANTIZED_ONNX_FILES = {
+    'arm64': 'onnx/model_qint8_arm64.onnx',
+    'avx512_vnni': 'onnx/model_qint8_avx512_vnni.onnx',
+    'avx2': 'onnx/model_quint8_avx2.onnx',
+}
+
+
+def default_backend() -> str:
+    """Backend from GUIS_EMBEDDING_BACKEND (torch, onnx or onnx-int8; default torch)"""
+    backend = os.getenv('GUIS_EMBEDDING_BACKEND', 'torch').strip().lower()
+    if backend not in BACKENDS:
+        logger.warning(f"Unknown embedding backend '{backend}', using torch")
+        return 'torch'
+    return backend
+
+
+def _cpu_flags() -> set:
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('flags'):
+                    return set(line.split(':', 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+
+def quantized_onnx_file() -> str:
+    """int8 model file for this CPU (GUIS_ONNX_MODEL_FILE overrides)"""
+    override = os.getenv('GUIS_ONNX_MODEL_FILE')
+    if override:
+        return override
+    if platform.machine().lower() in ('arm64', 'aarch64'):
+        return QUANTIZED_ONNX_FILES['arm64']
+    if 'avx512_vnni' in _cpu_flags():
+        return QUANTIZED_ONNX_FILES['avx512_vnni']
+    return QUANTIZED_ONNX_FILES['avx2']
+
+
+class OnnxEncoder:
+    """
+    Sentence encoder on ONNX Runtime, without PyTorch
+    Reproduces the sentence-transformers pipeline of the model repository
+    (tokenizer, mean pooling, optional normalization) and exposes the subset
+    of the SentenceTransformer API that MLClassifier uses
+    """
+
+    def __init__(self, model_name: str, file_name: str = 'onnx/model.onnx'):
+        # Optional dependencies: only needed for this backend
+        import onnxruntime as ort
+        from huggingface_hub import hf_hub_download
+        from tokenizers import Tokenizer
+
+        repo_id = model_name if '/' in model_name else f"sentence-transformers/{model_name}"
+        self.model_name = model_name
+        self.file_name = file_name
+
+        max_length = 256
+        try:
+            with open(hf_hub_download(repo_id, 'sentence_bert_config.json')) as f:
+                max_length = json.load(f).get('max_seq_length', max_length)
+        except Exception as e:
+            logger.debug(f"No sentence_bert_config.json for {repo_id}: {e}")
+        self.normalize = False
+        try:
+            with open(hf_hub_download(repo_id, 'modules.json')) as f:
+                self.normalize = any(module.get('type', '').endswith('Normalize') for module in json.load(f))
+        except Exception as e:
+            logger.debug(f"No modules.json for {repo_id}: {e}")
+
+        self.tokenizer = Tokenizer.from_file(hf_hub_download(repo_id, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            hf_hub_download(repo_id, file_name), options, providers=['CPUExecutionProvider']
+        )
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self._dimension: Optional[int] = None
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self._input_names:
+            feeds['token_type_ids'] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens
+        mask = attention_mask[:, :, None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        vectors = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors.astype(np.float32)
+
+    def encode(self, sentences: Sequence[str], batch_size: int = 32, show_progress_bar: bool = False,
+               **kwargs) -> np.ndarray:
+        """Embeddings, one row per sentence"""
+        if isinstance(sentences, str):
+            return self.encode([sentences], batch_size)[0]
+        if not sentences:
+            return np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        # Length-sorted batches need less padding
+        order = sorted(range(len(sentences)), key=lambda i: len(sentences[i]))
+        rows = []
+        for start in range(0, len(order), batch_size):
+            rows.append(self._encode_batch([sentences[i] for i in order[start:start + batch_size]]))
+        sorted_vectors = np.concatenate(rows)
+        vectors = np.empty_like(sorted_vectors)
+        vectors[order] = sorted_vectors
+        self._dimension = vectors.shape[1]
+        return vectors
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dimension is None:
+            self._dimension = self._encode_batch(['dimension probe']).shape[1]
+        return self._dimension
+
+
+def load_embedding_model(model_name: str, backend: str = 'torch') -> Tuple[object, str]:
+    """
+    Embedding model on the requested backend: (model, backend actually used)
+    ONNX backends fall back to PyTorch when onnxruntime, the tokenizer or
+    the exported model file is unavailable
+    """
+    if backend in ('onnx', 'onnx-int8'):
+        file_name = quantized_onnx_file() if backend == 'onnx-int8' else 'onnx/model.onnx'
+        try:
+            encoder = OnnxEncoder(model_name, file_name)
+            logger.info(f"Loaded {model_name} on ONNX Runtime ({file_name})")
+            return encoder, backend
+        except Exception as e:
+            logger.warning(f"ONNX backend unavailable ({e}), falling back to PyTorch")
+
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(model_name)
+    logger.info(f"Loaded {model_name} on PyTorch")
+    return model, 'torch'
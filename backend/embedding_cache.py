@@ -0,0 +1,173 @@
+"""
+Embedding cache module
+Content-addressed cache of text embeddings: an in-memory LRU in front of a
+SQLite store of float16 vectors, keyed by model name and normalized text
+"""
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# On-disk and in-memory vector format; float16 halves the size and keeps
+# cosine similarities within about 1e-3 of the float32 originals
+STORE_DTYPE = np.float16
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-normalized text, so layout differences share one entry"""
+    return ' '.join((text or '').split())
+
+
+class EmbeddingCache:
+    """
+    Embeddings by content key
+    A key is the SHA-256 of the model name and the normalized text, so entries
+    of different models never mix and identical texts from any page share one.
+    Vectors are returned as float32 after the float16 round trip; callers
+    should pass fresh vectors through quantize() too, so results don't depend
+    on whether a text was cached.
+    """
+
+    def __init__(self, db_path: str = None, max_memory_entries: int = 20000):
+        if db_path is None:
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            db_path = os.path.join(project_root, "embedding_cache.db")
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self._memory: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\x00{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def quantize(vectors: np.ndarray) -> np.ndarray:
+        """Vectors as they come back from the cache (float16 precision, float32 dtype)"""
+        return np.asarray(vectors).astype(STORE_DTYPE).astype(np.float32)
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Add to the LRU tier (caller holds the lock)"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors (float32) for the keys that have one"""
+        found = {}
+        missing = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                else:
+                    missing.append(key)
+            self.memory_hits += len(found)
+            from_disk = 0
+
+            # SQLite limits bound parameters per statement
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=STORE_DTYPE)
+                    self._remember(key, vector)
+                    found[key] = vector
+                    from_disk += 1
+            self.disk_hits += from_disk
+            self.misses += len(missing) - from_disk
+        return {key: vector.astype(np.float32) for key, vector in found.items()}
+
+    def put_many(self, model_name: str, items: Iterable[Tuple[str, np.ndarray]]):
+        """Store (key, vector) pairs in both tiers"""
+        rows = []
+        now = time.time()
+        with self._lock:
+            for key, vector in items:
+                stored = np.ascontiguousarray(vector, dtype=STORE_DTYPE)
+                self._remember(key, stored)
+                rows.append((key, model_name, stored.shape[0], stored.tobytes(), now))
+            if rows:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model, dim, vector, stored_at) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
+
+    def purge(self, model_name: Optional[str] = None) -> int:
+        """Delete the entries of one model (default: everything)"""
+        with self._lock:
+            self._memory.clear()
+            if model_name is None:
+                cursor = self._conn.execute("DELETE FROM embeddings")
+            else:
+                cursor = self._conn.execute("DELETE FROM embeddings WHERE model = ?", (model_name,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            in_memory = len(self._memory)
+        return {
+            'entries': count,
+            'in_memory': in_memory,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+        }
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Process-wide cache, configured from the environment:
+    GUIS_EMBEDDING_CACHE=0 disables it, GUIS_EMBEDDING_CACHE_PATH and
+    GUIS_EMBEDDING_CACHE_MEMORY (LRU entries) tune it
+    """
+    global _shared_cache
+    if os.getenv('GUIS_EMBEDDING_CACHE', '1') == '0':
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            try:
+                max_memory = int(os.getenv('GUIS_EMBEDDING_CACHE_MEMORY', 20000))
+                _shared_cache = EmbeddingCache(os.getenv('GUIS_EMBEDDING_CACHE_PATH'), max_memory)
+            except Exception as e:
+                logger.warning(f"Embedding cache unavailable: {e}")
+                return None
+        return _shared_cache
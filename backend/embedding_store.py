@@ -0,0 +1,396 @@
+"""
+Embedding store module
+Append-only, memory-mapped file of program embeddings (float16 or int8)
+with an id -> row index and metadata naming the model that produced them
+"""
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from datetime import datetime
+import json
+import os
+import threading
+import logging
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+STORE_DTYPES = ('float16', 'int8')
+
+META_FILE = 'meta.json'
+VECTORS_FILE = 'vectors.bin'  # rows of dim values in the store dtype
+IDS_FILE = 'ids.bin'  # int64 id per row
+SCALES_FILE = 'scales.bin'  # float32 scale per row (int8 only)
+PREVIOUS_DIR = 'previous'  # files of the store before its last reset
+
+
+def default_store_dtype() -> str:
+    """Dtype of new stores from GUIS_EMBEDDING_STORE_DTYPE (float16 or int8; default float16)"""
+    dtype = os.getenv('GUIS_EMBEDDING_STORE_DTYPE', 'float16').strip().lower()
+    if dtype not in STORE_DTYPES:
+        logger.warning(f"Unknown embedding store dtype '{dtype}', using float16")
+        return 'float16'
+    return dtype
+
+
+class EmbeddingStore:
+    """
+    Embeddings by integer id, in flat files under one directory
+    Rows are only ever appended: writing an id again appends a new row that
+    supersedes the old one, and compact() drops superseded rows. A row
+    counts once its id is written (ids.bin last), so a crash mid-append
+    leaves a tail that is truncated on the next open.
+    float16 rows take half the space of float32; int8 rows a quarter, with
+    a per-row scale (max |value| / 127). matrix() exposes the stored rows
+    without copying.
+    """
+
+    def __init__(self, directory: str = None, dtype: Optional[str] = None):
+        if directory is None:
+            directory = os.getenv('GUIS_EMBEDDING_STORE_PATH')
+        if directory is None:
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            directory = os.path.join(project_root, "embedding_store")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._lock = threading.RLock()
+
+        self.meta = self._read_meta()
+        requested = dtype or default_store_dtype()
+        if self.meta is None:
+            self.meta = {
+                'format': FORMAT_VERSION,
+                'model': None,
+                'dim': None,
+                'dtype': requested,
+                'generation': 1,
+                'updated_at': None,
+            }
+        elif dtype and self.meta.get('dtype') != dtype:
+            logger.info(f"Embedding store at {directory} keeps its dtype {self.meta.get('dtype')}")
+
+        self._row_of: Dict[int, int] = {}
+        self._rows = 0
+        self._views: Optional[Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]] = None
+        self._open()
+
+    # Metadata
+
+    @property
+    def model(self) -> Optional[str]:
+        return self.meta.get('model')
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self.meta.get('dim')
+
+    @property
+    def dtype(self) -> str:
+        return self.meta['dtype']
+
+    @property
+    def generation(self) -> int:
+        """Incremented whenever the store is reset for another model"""
+        return self.meta.get('generation', 1)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _read_meta(self) -> Optional[Dict]:
+        try:
+            with open(self._path(META_FILE)) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable embedding store metadata, starting over: {e}")
+            return None
+        if meta.get('format') != FORMAT_VERSION or meta.get('dtype') not in STORE_DTYPES:
+            logger.warning(f"Unsupported embedding store format {meta.get('format')}, starting over")
+            return None
+        return meta
+
+    def _write_meta(self):
+        """Replace meta.json atomically (caller holds the lock)"""
+        self.meta['updated_at'] = datetime.utcnow().isoformat()
+        tmp_path = self._path(META_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp_path, self._path(META_FILE))
+
+    def set_meta(self, **values):
+        """Record extra metadata (e.g. migration markers) in meta.json"""
+        with self._lock:
+            self.meta.update(values)
+            self._write_meta()
+
+    # Files
+
+    @property
+    def _row_bytes(self) -> int:
+        return self.dim * np.dtype(self.dtype).itemsize
+
+    def _open(self):
+        """Count complete rows, truncate partial tails and index ids"""
+        with self._lock:
+            self._views = None
+            if not self.dim:
+                for name in (VECTORS_FILE, IDS_FILE, SCALES_FILE):
+                    open(self._path(name), 'wb').close()
+                self._rows = 0
+                self._row_of = {}
+                return
+
+            sizes = {name: os.path.getsize(self._path(name)) if os.path.exists(self._path(name)) else 0
+                     for name in (VECTORS_FILE, IDS_FILE, SCALES_FILE)}
+            rows = min(sizes[VECTORS_FILE] // self._row_bytes, sizes[IDS_FILE] // 8)
+            if self.dtype == 'int8':
+                rows = min(rows, sizes[SCALES_FILE] // 4)
+            expected = {
+                VECTORS_FILE: rows * self._row_bytes,
+                IDS_FILE: rows * 8,
+                SCALES_FILE: rows * 4 if self.dtype == 'int8' else 0,
+            }
+            for name, size in expected.items():
+                if sizes[name] != size:
+                    logger.warning(f"Truncating {name} of the embedding store to {rows} rows")
+                    with open(self._path(name), 'ab') as f:
+                        f.truncate(size)
+
+            self._rows = rows
+            ids = np.fromfile(self._path(IDS_FILE), dtype=np.int64, count=rows)
+            # Later rows supersede earlier ones
+            self._row_of = dict(zip(ids.tolist(), range(rows)))
+
+    def _mapped(self) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        """Read-only (vectors, ids, scales) maps of the current rows"""
+        with self._lock:
+            if self._views is None:
+                if not self._rows:
+                    vectors = np.empty((0, self.dim or 0), dtype=self.dtype)
+                    ids = np.empty(0, dtype=np.int64)
+                    scales = np.empty(0, dtype=np.float32) if self.dtype == 'int8' else None
+                else:
+                    vectors = np.memmap(self._path(VECTORS_FILE), dtype=self.dtype, mode='r',
+                                        shape=(self._rows, self.dim))
+                    ids = np.memmap(self._path(IDS_FILE), dtype=np.int64, mode='r', shape=(self._rows,))
+                    scales = None
+                    if self.dtype == 'int8':
+                        scales = np.memmap(self._path(SCALES_FILE), dtype=np.float32, mode='r',
+                                           shape=(self._rows,))
+                self._views = (vectors, ids, scales)
+            return self._views
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if self.dtype == 'int8':
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+            return quantized, scales.astype(np.float32)
+        return vectors.astype(np.float16), None
+
+    @staticmethod
+    def _decode(rows: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+        vectors = rows.astype(np.float32)
+        if scales is not None:
+            vectors *= scales[:, None]
+        return vectors
+
+    # Writing
+
+    def ensure_model(self, model_name: str, dim: int) -> bool:
+        """
+        Bind the store to a model (its base name: vectors of one model are
+        comparable whatever the inference backend); vectors of another model
+        or dimension are not, so a mismatch starts an empty store and moves
+        the old files to previous/
+        Returns True if the store was reset
+        """
+        with self._lock:
+            if self.model == model_name and self.dim == dim:
+                return False
+            if self.model and self.model.split('@')[0] == model_name and self.dim == dim:
+                # Stores keyed by backend ('model@int8') hold the same model's vectors
+                self.meta['model'] = model_name
+                self._write_meta()
+                return False
+            reset = self.model is not None
+            if reset:
+                logger.warning(f"Embedding model changed ({self.model}/{self.dim} -> {model_name}/{dim}), "
+                               f"moving {len(self)} stored embeddings to {PREVIOUS_DIR}/")
+                self._archive()
+                self.meta['generation'] = self.generation + 1
+            self.meta.update(model=model_name, dim=int(dim))
+            self._write_meta()
+            self._open()
+            return reset
+
+    def _archive(self):
+        """Move the current files to previous/ (replacing an older archive) and start empty ones"""
+        with self._lock:
+            self._views = None
+            archive = self._path(PREVIOUS_DIR)
+            os.makedirs(archive, exist_ok=True)
+            for name in (VECTORS_FILE, IDS_FILE, SCALES_FILE, META_FILE):
+                if os.path.exists(self._path(name)):
+                    os.replace(self._path(name), os.path.join(archive, name))
+                elif os.path.exists(os.path.join(archive, name)):
+                    os.remove(os.path.join(archive, name))
+            for name in (VECTORS_FILE, IDS_FILE, SCALES_FILE):
+                open(self._path(name), 'wb').close()
+            self._rows = 0
+            self._row_of = {}
+
+    def put_many(self, ids: Sequence[int], vectors: np.ndarray):
+        """Append vectors (rows of a 2-D array, one per id); call ensure_model() first"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(ids):
+            return
+        with self._lock:
+            if not self.dim:
+                raise ValueError("Embedding store has no model; call ensure_model() first")
+            if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional vectors, got shape {vectors.shape}")
+            encoded, scales = self._encode(vectors)
+            ids = np.asarray(ids, dtype=np.int64)
+
+            # Vectors and scales first; a row exists once its id is written
+            with open(self._path(VECTORS_FILE), 'ab') as f:
+                f.write(np.ascontiguousarray(encoded).tobytes())
+            if scales is not None:
+                with open(self._path(SCALES_FILE), 'ab') as f:
+                    f.write(scales.tobytes())
+            with open(self._path(IDS_FILE), 'ab') as f:
+                f.write(ids.tobytes())
+
+            for offset, item_id in enumerate(ids.tolist()):
+                self._row_of[item_id] = self._rows + offset
+            self._rows += len(ids)
+            self._views = None
+
+    def compact(self) -> int:
+        """Rewrite the files without superseded rows; returns the rows dropped"""
+        with self._lock:
+            dropped = self._rows - len(self._row_of)
+            if not dropped:
+                return 0
+            vectors, ids, scales = self._mapped()
+            live = np.fromiter(sorted(self._row_of.values()), dtype=np.int64, count=len(self._row_of))
+            parts = {VECTORS_FILE: vectors[live], IDS_FILE: ids[live]}
+            if scales is not None:
+                parts[SCALES_FILE] = scales[live]
+            # Maps must be closed before the files are replaced (Windows)
+            self._views = None
+            del vectors, ids, scales
+            for name, data in parts.items():
+                tmp_path = self._path(name + '.tmp')
+                with open(tmp_path, 'wb') as f:
+                    f.write(np.ascontiguousarray(data).tobytes())
+                os.replace(tmp_path, self._path(name))
+            self._open()
+            logger.info(f"Compacted embedding store: dropped {dropped} superseded rows")
+            return dropped
+
+    # Reading
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._row_of
+
+    def matrix(self) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        """
+        Zero-copy (vectors, ids, scales) views of every stored row, in the
+        store dtype; superseded rows are included (see live_rows())
+        int8 values times the row scale give the original vector
+        """
+        return self._mapped()
+
+    def live_rows(self) -> np.ndarray:
+        """Row numbers holding the current vector of each id, ascending"""
+        with self._lock:
+            return np.fromiter(sorted(self._row_of.values()), dtype=np.int64, count=len(self._row_of))
+
+    def get(self, item_id: int) -> Optional[np.ndarray]:
+        """float32 vector of one id"""
+        found_ids, vectors = self.get_many([item_id])
+        return vectors[0] if found_ids else None
+
+    def get_many(self, ids: Sequence[int]) -> Tuple[List[int], np.ndarray]:
+        """(ids found, float32 vectors in that order)"""
+        with self._lock:
+            found = [item_id for item_id in ids if item_id in self._row_of]
+            rows = np.array([self._row_of[item_id] for item_id in found], dtype=np.int64)
+            vectors, _, scales = self._mapped()
+            if not found:
+                return [], np.empty((0, self.dim or 0), dtype=np.float32)
+            return found, self._decode(vectors[rows], scales[rows] if scales is not None else None)
+
+    def iter_chunks(self, chunk_size: int = 50000) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """(ids, float32 vectors) of the current rows, chunk by chunk"""
+        live = self.live_rows()
+        vectors, ids, scales = self._mapped()
+        for start in range(0, len(live), chunk_size):
+            rows = live[start:start + chunk_size]
+            # Live rows are mostly contiguous; slice the span, then select
+            first, last = rows[0], rows[-1] + 1
+            span = rows - first
+            chunk_scales = scales[first:last][span] if scales is not None else None
+            yield np.array(ids[first:last][span]), self._decode(vectors[first:last][span], chunk_scales)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            size = sum(os.path.getsize(self._path(name))
+                       for name in (VECTORS_FILE, IDS_FILE, SCALES_FILE) if os.path.exists(self._path(name)))
+            return {
+                'model': self.model,
+                'dim': self.dim,
+                'dtype': self.dtype,
+                'generation': self.generation,
+                'embeddings': len(self._row_of),
+                'rows': self._rows,
+                'bytes': size,
+            }
+
+
+def import_program_embeddings(store: EmbeddingStore, session, program_model, model_name: str,
+                              chunk_size: int = 5000) -> int:
+    """
+    Copy float32 blobs of the legacy programs.embedding_vector column into
+    the store, once (recorded in the store metadata)
+    Ids already in the store and vectors of another dimension are skipped
+    """
+    if store.meta.get('legacy_imported'):
+        return 0
+    imported = skipped = 0
+    query = session.query(program_model.id, program_model.embedding_vector).filter(
+        program_model.embedding_vector.isnot(None)
+    ).execution_options(yield_per=chunk_size)
+    ids, vectors = [], []
+
+    def flush():
+        nonlocal imported
+        if ids:
+            store.put_many(ids, np.stack(vectors))
+            imported += len(ids)
+            ids.clear()
+            vectors.clear()
+
+    for item_id, blob in query:
+        vector = np.frombuffer(blob, dtype=np.float32)
+        if not store.dim:
+            store.ensure_model(model_name, vector.shape[0])
+        if vector.shape[0] != store.dim or item_id in store:
+            skipped += 1
+            continue
+        ids.append(item_id)
+        vectors.append(vector)
+        if len(ids) >= chunk_size:
+            flush()
+    flush()
+    store.set_meta(legacy_imported=True)
+    if imported or skipped:
+        logger.info(f"Imported {imported} program embeddings into the embedding store ({skipped} skipped)")
+    return imported
@@ -0,0 +1,109 @@
+"""
+HTML parsing module
+One place to choose the fastest available parser (selectolax, lxml, html.parser)
+and to parse only the parts of a page a caller needs
+"""
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.dammit import EncodingDetector
+from typing import List, Optional, Tuple, Union
+import re
+import logging
+
+try:
+    import lxml.html
+    from lxml import etree
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+try:
+    from selectolax.parser import HTMLParser
+    HAS_SELECTOLAX = True
+except ImportError:
+    HAS_SELECTOLAX = False
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tree builder for BeautifulSoup: lxml is several times faster than html.parser
+HTML_PARSER = 'lxml' if HAS_LXML else 'html.parser'
+
+
+def has_class(name: str) -> re.Pattern:
+    """
+    Class matcher for SoupStrainer
+    While parsing, strainers see the raw class attribute ("infobox vcard"),
+    so a plain class_='infobox' would miss multi-class elements
+    """
+    return re.compile(r'(^|\s)' + re.escape(name) + r'(\s|$)')
+
+
+# Partial parses: only matching elements (and their children) are built
+LINKS_ONLY = SoupStrainer('a', href=True)
+HEAD_ONLY = SoupStrainer('head')
+INFOBOX_ONLY = SoupStrainer('table', class_=has_class('infobox'))
+SEARCH_RESULTS_ONLY = SoupStrainer('div', class_=has_class('mw-search-result'))
+
+
+def parse_html(content: Union[bytes, str], only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    """
+    Parse a document with the fastest tree builder installed
+    only: a SoupStrainer (e.g. LINKS_ONLY) to build just part of the tree
+    """
+    return BeautifulSoup(content or b'', HTML_PARSER, parse_only=only)
+
+
+def _lxml_parser(content: bytes):
+    """
+    lxml parser for raw bytes
+    Without a declared charset libxml2 assumes Latin-1; the web mostly means UTF-8
+    """
+    encoding = EncodingDetector.find_declared_encoding(content, is_html=True, search_entire_document=False)
+    return lxml.html.HTMLParser(encoding=encoding or 'utf-8')
+
+
+def parse_tree(content: Union[bytes, str]):
+    """Raw lxml element tree, for hot paths that walk the document themselves"""
+    if not HAS_LXML:
+        raise ImportError("lxml is required for parse_tree")
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return lxml.html.document_fromstring(content, parser=_lxml_parser(content))
+
+
+def walk_tree(root):
+    """(event, element) pairs for 'start' and 'end' of every element, in document order"""
+    return etree.iterwalk(root, events=('start', 'end'))
+
+
+def extract_links(content: Union[bytes, str]) -> List[Tuple[str, str]]:
+    """
+    All (href, text) pairs of <a href> elements, without building a soup
+    Text matches BeautifulSoup's get_text(strip=True)
+    """
+    if not content:
+        return []
+    if isinstance(content, str):
+        # lxml rejects str input that carries an encoding declaration
+        content = content.encode('utf-8')
+    if HAS_SELECTOLAX:
+        try:
+            tree = HTMLParser(content)
+            return [
+                (node.attributes.get('href') or '', node.text(deep=True, separator='', strip=True))
+                for node in tree.css('a[href]')
+            ]
+        except Exception as e:
+            logger.debug(f"selectolax failed, trying next parser: {e}")
+    if HAS_LXML:
+        try:
+            root = lxml.html.fromstring(content, parser=_lxml_parser(content))
+            return [
+                (element.get('href'), ''.join(text.strip() for text in element.itertext()))
+                for element in root.iter('a')
+                if element.get('href') is not None
+            ]
+        except Exception as e:
+            logger.debug(f"lxml failed, falling back to BeautifulSoup: {e}")
+    soup = BeautifulSoup(content, 'html.parser', parse_only=LINKS_ONLY)
+    return [(link.get('href'), link.get_text(strip=True)) for link in soup.find_all('a', href=True)]
@@ -0,0 +1,284 @@
+"""
+Persistent HTTP cache
+SQLite-backed response cache with TTL and conditional revalidation,
+shared by every requests.Session in the scrapers and analyzers
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from datetime import timedelta
+from http import HTTPStatus
+from typing import Dict, Optional
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Headers worth keeping with a cached body
+_STORED_HEADERS = ('content-type', 'content-encoding', 'content-language', 'etag',
+                   'last-modified', 'cache-control', 'expires', 'date', 'location')
+
+# Statuses worth caching: pages and permanent redirects
+_CACHEABLE_STATUSES = (200, 301, 308)
+
+# Limits are re-applied after this many stores, so long runs stay bounded too
+_LIMIT_CHECK_INTERVAL = 1000
+
+
+class HTTPCache:
+    """
+    URL-keyed response store: body, headers, ETag and Last-Modified
+    Entries older than max_age seconds are dropped, and the oldest beyond
+    max_entries too (None disables a limit); limits apply when the cache is
+    opened and every _LIMIT_CHECK_INTERVAL stores
+    """
+
+    def __init__(self, db_path: str = None, ttl: float = 86400,
+                 max_age: Optional[float] = 30 * 86400, max_entries: Optional[int] = 50000):
+        if db_path is None:
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            db_path = os.path.join(project_root, "http_cache.db")
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._stores_since_check = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    status INTEGER NOT NULL,
+                    headers TEXT,
+                    body BLOB,
+                    etag TEXT,
+                    last_modified TEXT,
+                    stored_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_stored_at ON responses (stored_at)")
+            self._conn.commit()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        removed = self.enforce_limits()
+        if removed:
+            logger.info(f"HTTP cache: dropped {removed} old entries")
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Return the cached entry for url (fresh or stale), or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body, etag, last_modified, stored_at FROM responses WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if not row:
+            return None
+        status, headers, body, etag, last_modified, stored_at = row
+        return {
+            'url': url,
+            'status': status,
+            'headers': json.loads(headers) if headers else {},
+            'body': body or b'',
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored_at': stored_at,
+        }
+
+    def is_fresh(self, entry: Optional[Dict]) -> bool:
+        return bool(entry) and (time.time() - entry['stored_at']) < self.ttl
+
+    def has_fresh(self, url: str) -> bool:
+        """True if url can be served without touching the network"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stored_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        return bool(row) and (time.time() - row[0]) < self.ttl
+
+    def store(self, url: str, response: requests.Response):
+        """Store a 200 response or permanent redirect"""
+        headers = {k: v for k, v in response.headers.items() if k.lower() in _STORED_HEADERS}
+        # The body is stored decoded, so the encoding header no longer applies
+        headers.pop('Content-Encoding', None)
+        headers.pop('content-encoding', None)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, status, headers, body, etag, last_modified, stored_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, response.status_code, json.dumps(headers), response.content,
+                 response.headers.get('ETag'), response.headers.get('Last-Modified'), time.time())
+            )
+            self._conn.commit()
+            self._stores_since_check += 1
+            check_limits = self._stores_since_check >= _LIMIT_CHECK_INTERVAL
+        if check_limits:
+            self.enforce_limits()
+
+    def touch(self, url: str):
+        """Mark an entry fresh again after a 304 Not Modified"""
+        with self._lock:
+            self._conn.execute("UPDATE responses SET stored_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def purge(self, older_than: Optional[float] = None) -> int:
+        """Delete entries older than older_than seconds (default: everything)"""
+        with self._lock:
+            if older_than is None:
+                cursor = self._conn.execute("DELETE FROM responses")
+            else:
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE stored_at < ?", (time.time() - older_than,)
+                )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def enforce_limits(self) -> int:
+        """Drop entries past max_age, then the oldest beyond max_entries; returns how many"""
+        removed = self.purge(self.max_age) if self.max_age is not None else 0
+        with self._lock:
+            self._stores_since_check = 0
+            if self.max_entries is not None:
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE url IN "
+                    "(SELECT url FROM responses ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                self._conn.commit()
+                removed += cursor.rowcount
+        return removed
+
+    def record(self, outcome: str):
+        """Count a lookup outcome: 'hits', 'revalidated' or 'misses'"""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {
+                'entries': count,
+                'hits': self.hits,
+                'revalidated': self.revalidated,
+                'misses': self.misses,
+            }
+
+
+class CachingAdapter(HTTPAdapter):
+    """
+    Transport adapter that serves GETs from an HTTPCache
+    Stale entries are revalidated with If-None-Match / If-Modified-Since, as
+    are fresh ones when the request says Cache-Control: no-cache (or
+    max-age=0, or Pragma: no-cache). Requests that already carry conditional
+    headers or ask for streaming pass straight through.
+    """
+
+    def __init__(self, cache: HTTPCache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def has_fresh(self, url: str) -> bool:
+        return self.cache.has_fresh(url)
+
+    def send(self, request, stream=False, **kwargs):
+        if (request.method != 'GET' or stream
+                or 'If-None-Match' in request.headers or 'If-Modified-Since' in request.headers):
+            return super().send(request, stream=stream, **kwargs)
+
+        url = request.url
+        entry = self.cache.get(url)
+        if self.cache.is_fresh(entry) and not self._must_revalidate(request):
+            self.cache.record('hits')
+            return self._build_cached_response(request, entry)
+
+        if entry:
+            if entry.get('etag'):
+                request.headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                request.headers['If-Modified-Since'] = entry['last_modified']
+
+        response = super().send(request, stream=stream, **kwargs)
+
+        if response.status_code == 304 and entry:
+            self.cache.record('revalidated')
+            self.cache.touch(url)
+            response.close()
+            return self._build_cached_response(request, entry)
+
+        self.cache.record('misses')
+        if (response.status_code in _CACHEABLE_STATUSES
+                and 'no-store' not in response.headers.get('Cache-Control', '')):
+            try:
+                self.cache.store(url, response)
+            except Exception as e:
+                logger.debug(f"Could not cache {url}: {e}")
+        return response
+
+    @staticmethod
+    def _must_revalidate(request) -> bool:
+        """True if the request forbids answering from the cache without asking the server"""
+        cache_control = request.headers.get('Cache-Control', '').lower()
+        return ('no-cache' in cache_control or 'max-age=0' in cache_control
+                or 'no-cache' in request.headers.get('Pragma', '').lower())
+
+    def _build_cached_response(self, request, entry: Dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = HTTPStatus(entry['status']).phrase
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['body']
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(0)
+        response.connection = self
+        response._content_consumed = True
+        response.from_cache = True
+        return response
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache() -> Optional[HTTPCache]:
+    """
+    Process-wide cache, configured from the environment:
+    GUIS_HTTP_CACHE=0 disables it, GUIS_HTTP_CACHE_PATH, GUIS_HTTP_CACHE_TTL,
+    GUIS_HTTP_CACHE_MAX_AGE (seconds) and GUIS_HTTP_CACHE_MAX_ENTRIES tune it
+    (0 disables a limit)
+    """
+    global _shared_cache
+    if os.getenv('GUIS_HTTP_CACHE', '1') == '0':
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            try:
+                ttl = float(os.getenv('GUIS_HTTP_CACHE_TTL', 86400))
+                max_age = float(os.getenv('GUIS_HTTP_CACHE_MAX_AGE', 30 * 86400))
+                max_entries = int(os.getenv('GUIS_HTTP_CACHE_MAX_ENTRIES', 50000))
+                _shared_cache = HTTPCache(os.getenv('GUIS_HTTP_CACHE_PATH'), ttl=ttl,
+                                          max_age=max_age or None, max_entries=max_entries or None)
+            except Exception as e:
+                logger.warning(f"HTTP cache unavailable: {e}")
+                return None
+        return _shared_cache
+
+
+def install_cache(session: requests.Session, cache: Optional[HTTPCache] = None) -> Optional[HTTPCache]:
+    """Mount the caching adapter on a session; returns the cache in use (or None)"""
+    cache = cache or get_shared_cache()
+    if cache is None:
+        return None
+    adapter = CachingAdapter(cache)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return cache
@@ -0,0 +1,242 @@
+"""
+Background job module
+Runs long fetch/search operations outside the HTTP request,
+with progress, partial results and cancellation stored in SQLite
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import json
+import threading
+import time
+import uuid
+import logging
+
+from database import Database, Job
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled', 'interrupted')
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation was requested"""
+
+
+class JobContext:
+    """Handle passed to a running job for progress, partial results and cancellation"""
+
+    def __init__(self, manager: 'JobManager', job_id: str, flush_interval: float = 1.0,
+                 cancel_poll_interval: float = 2.0):
+        self.manager = manager
+        self.job_id = job_id
+        self.flush_interval = flush_interval
+        # How often the stored cancel flag is read (another process may set it)
+        self.cancel_poll_interval = cancel_poll_interval
+        self._last_cancel_poll = time.monotonic()
+        self.current = 0
+        self.total = 0
+        self.message = None
+        self.items: List[Dict] = []
+        self._last_flush = 0.0
+
+    def set_total(self, total: int):
+        self.total = total
+        self.flush()
+
+    def advance(self, step: int = 1, message: Optional[str] = None):
+        """Record progress; written to the database at most every flush_interval"""
+        self.current += step
+        if message:
+            self.message = message
+        self.flush()
+
+    def add_results(self, items: List[Dict]):
+        """Append partial results visible through /api/jobs/{id}"""
+        self.items.extend(items)
+
+    def is_cancelled(self) -> bool:
+        now = time.monotonic()
+        check_db = now - self._last_cancel_poll >= self.cancel_poll_interval
+        if check_db:
+            self._last_cancel_poll = now
+        return self.manager.is_cancel_requested(self.job_id, check_db=check_db)
+
+    def check_cancelled(self):
+        if self.is_cancelled():
+            raise JobCancelled()
+
+    def flush(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        self.manager._update(
+            self.job_id,
+            progress_current=self.current,
+            progress_total=self.total,
+            message=self.message,
+            result=json.dumps({"items": self.items}, default=str)
+        )
+
+
+class JobManager:
+    """Runs jobs on a small worker pool and persists their state"""
+
+    def __init__(self, database: Database, max_workers: int = 2):
+        self.database = database
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._cancelled = set()
+        self._lock = threading.Lock()
+        self._recover()
+
+    def _recover(self):
+        """Jobs that were queued or running when the process stopped can't resume"""
+        session = self.database.get_session()
+        try:
+            count = session.query(Job).filter(Job.status.in_(['queued', 'running'])).update(
+                {
+                    Job.status: 'interrupted',
+                    Job.error: 'Server restarted before the job finished',
+                    Job.finished_at: datetime.utcnow()
+                },
+                synchronize_session=False
+            )
+            session.commit()
+            if count:
+                logger.info(f"Marked {count} unfinished jobs as interrupted")
+        except Exception as e:
+            logger.warning(f"Job recovery failed: {e}")
+            session.rollback()
+        finally:
+            session.close()
+
+    def submit(self, kind: str, params: Dict, func: Callable[[JobContext], Dict]) -> str:
+        """Create a job and queue func(ctx); returns the job id"""
+        job_id = uuid.uuid4().hex
+        session = self.database.get_session()
+        try:
+            session.add(Job(id=job_id, kind=kind, status='queued', params=json.dumps(params)))
+            session.commit()
+        finally:
+            session.close()
+        self._executor.submit(self._run, job_id, func)
+        return job_id
+
+    def _run(self, job_id: str, func: Callable[[JobContext], Dict]):
+        if self.is_cancel_requested(job_id, check_db=True):
+            self._update(job_id, status='cancelled', finished_at=datetime.utcnow())
+            return
+
+        self._update(job_id, status='running', started_at=datetime.utcnow())
+        ctx = JobContext(self, job_id)
+        try:
+            result = func(ctx)
+            ctx.flush(force=True)
+            self._update(
+                job_id,
+                status='completed',
+                result=json.dumps(result, default=str),
+                finished_at=datetime.utcnow()
+            )
+        except JobCancelled:
+            ctx.flush(force=True)
+            self._update(job_id, status='cancelled', finished_at=datetime.utcnow())
+            logger.info(f"Job {job_id} cancelled")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            ctx.flush(force=True)
+            self._update(job_id, status='failed', error=str(e), finished_at=datetime.utcnow())
+        finally:
+            with self._lock:
+                self._cancelled.discard(job_id)
+
+    def _update(self, job_id: str, **fields):
+        session = self.database.get_session()
+        try:
+            session.query(Job).filter(Job.id == job_id).update(fields, synchronize_session=False)
+            session.commit()
+        except Exception as e:
+            logger.warning(f"Could not update job {job_id}: {e}")
+            session.rollback()
+        finally:
+            session.close()
+
+    def cancel(self, job_id: str) -> bool:
+        """Request cancellation; returns False if the job is unknown or already finished"""
+        session = self.database.get_session()
+        try:
+            job = session.query(Job).filter(Job.id == job_id).first()
+            if not job or job.status in FINISHED_STATUSES:
+                return False
+            job.cancel_requested = True
+            session.commit()
+        finally:
+            session.close()
+        with self._lock:
+            self._cancelled.add(job_id)
+        return True
+
+    def is_cancel_requested(self, job_id: str, check_db: bool = False) -> bool:
+        """
+        Cancellation requested in this process, or (with check_db) through the
+        stored flag, which also covers requests made by another process
+        """
+        with self._lock:
+            if job_id in self._cancelled:
+                return True
+        if not check_db:
+            return False
+        session = self.database.get_session()
+        try:
+            job = session.query(Job.cancel_requested).filter(Job.id == job_id).first()
+        except Exception as e:
+            logger.warning(f"Could not read cancel flag of job {job_id}: {e}")
+            return False
+        finally:
+            session.close()
+        if not job or not job.cancel_requested:
+            return False
+        with self._lock:
+            self._cancelled.add(job_id)
+        return True
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        session = self.database.get_session()
+        try:
+            job = session.query(Job).filter(Job.id == job_id).first()
+            return self._to_dict(job) if job else None
+        finally:
+            session.close()
+
+    def list(self, limit: int = 50) -> List[Dict]:
+        session = self.database.get_session()
+        try:
+            jobs = session.query(Job).order_by(Job.created_at.desc()).limit(limit).all()
+            return [self._to_dict(job, include_result=False) for job in jobs]
+        finally:
+            session.close()
+
+    def _to_dict(self, job: Job, include_result: bool = True) -> Dict:
+        end = job.finished_at or datetime.utcnow()
+        data = {
+            "id": job.id,
+            "kind": job.kind,
+            "status": job.status,
+            "params": json.loads(job.params) if job.params else {},
+            "progress": {
+                "current": job.progress_current or 0,
+                "total": job.progress_total or 0
+            },
+            "message": job.message,
+            "error": job.error,
+            "cancel_requested": bool(job.cancel_requested),
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+            "elapsed_seconds": round((end - job.started_at).total_seconds(), 3) if job.started_at else None
+        }
+        if include_result:
+            data["result"] = json.loads(job.result) if job.result else None
+        return data
@@ -0,0 +1,149 @@
+"""
+Keyword matching module
+Counts every keyword of several groups at once, and holds the keyword
+rules shared by the scraper, detectors and classifier
+"""
+from typing import Dict, Iterable, List, Set
+import logging
+
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class KeywordMatcher:
+    """
+    Multi-group substring matcher
+    Semantics match `keyword in text` for every keyword: a keyword counts once
+    however often it occurs, and overlapping keywords ('ma' inside 'master')
+    are all found. Texts are expected to be lowercased already.
+
+    With pyahocorasick installed all groups are matched in one pass over the
+    text. Without it each distinct keyword is tested once with str.__contains__,
+    however many groups share it; on CPython that beats a compiled
+    alternation regex, which has to try every text position in Python's
+    backtracking engine.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        self.groups: Dict[str, List[str]] = {
+            name: list(dict.fromkeys(keyword.lower() for keyword in keywords))
+            for name, keywords in groups.items()
+        }
+        self._keyword_groups: Dict[str, Set[str]] = {}
+        for name, keywords in self.groups.items():
+            for keyword in keywords:
+                self._keyword_groups.setdefault(keyword, set()).add(name)
+
+        self._automaton = None
+        if HAS_AHOCORASICK and self._keyword_groups:
+            automaton = ahocorasick.Automaton()
+            for keyword in self._keyword_groups:
+                automaton.add_word(keyword, keyword)
+            automaton.make_automaton()
+            self._automaton = automaton
+
+    def keywords_in(self, text: str) -> Set[str]:
+        """Every keyword (of any group) that occurs in text"""
+        if not text:
+            return set()
+        if self._automaton is not None:
+            return {keyword for _, keyword in self._automaton.iter(text)}
+        return {keyword for keyword in self._keyword_groups if keyword in text}
+
+    def find(self, text: str) -> Dict[str, Set[str]]:
+        """Distinct keywords found, per group"""
+        result = {name: set() for name in self.groups}
+        for keyword in self.keywords_in(text):
+            for name in self._keyword_groups[keyword]:
+                result[name].add(keyword)
+        return result
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """Number of distinct keywords found, per group"""
+        return {name: len(found) for name, found in self.find(text).items()}
+
+    def matches(self, text: str, group: str) -> bool:
+        """True if any keyword of one group occurs (stops at the first hit)"""
+        return bool(text) and any(keyword in text for keyword in self.groups.get(group, ()))
+
+
+# --- Shared rules -----------------------------------------------------------
+
+# Delivery mode indicators (LanguageDetector.detect_delivery_mode)
+DELIVERY_MODE_RULES = KeywordMatcher({
+    'online': [
+        'online', 'distance learning', 'remote', 'virtual', 'e-learning',
+        'web-based', 'digital', 'asynchronous', 'synchronous online'
+    ],
+    'offline': [
+        'on-campus', 'on campus', 'in-person', 'in person', 'campus-based',
+        'residential', 'face-to-face', 'physical attendance'
+    ],
+    'hybrid': [
+        'hybrid', 'blended', 'mixed mode', 'flexible learning',
+        'combination', 'part online part offline'
+    ],
+    'bilingual': [
+        'bilingual', 'dual language', 'two languages', 'english and',
+        'taught in english and', 'multilingual'
+    ],
+})
+
+# Explicit statements of English instruction (LanguageDetector.detect_english)
+ENGLISH_INSTRUCTION_RULES = KeywordMatcher({
+    'english': [
+        'language of instruction: english',
+        'taught in english',
+        'instruction in english',
+        'english language',
+        'medium of instruction: english'
+    ],
+})
+
+# Study level indicators (MLClassifier._rule_based_classify)
+LEVEL_RULES = KeywordMatcher({
+    'UG': [
+        'bachelor', 'bsc', 'ba', 'undergraduate', 'b.tech', 'btech',
+        'bachelor\'s', 'bachelors', 'undergrad'
+    ],
+    'PG': [
+        'master', 'msc', 'ma', 'postgraduate', 'm.tech', 'mtech',
+        'master\'s', 'masters', 'phd', 'doctorate', 'doctoral',
+        'graduate', 'mba', 'mphil'
+    ],
+})
+
+# Words of a real program page (CourseScraper._validate_program_page)
+ACADEMIC_STRUCTURE_RULES = KeywordMatcher({
+    'academic': [
+        'program', 'curriculum', 'course', 'module', 'credit',
+        'degree', 'bachelor', 'master', 'study', 'academic'
+    ],
+})
+
+# URL/anchor terms used by the link filters and the crawler (CourseScraper)
+LINK_RULES = KeywordMatcher({
+    # Program pages (crawler results)
+    'program': ['program', 'course', 'degree', 'study', 'bachelor', 'master'],
+    # Program pages among site search results
+    'search_result': ['program', 'course', 'degree', 'study', 'academic'],
+    # Pages that lead towards programs (worth following)
+    'navigation': ['program', 'course', 'degree', 'study', 'bachelor', 'master',
+                   'academic', 'facult', 'department', 'school',
+                   'undergraduate', 'graduate', 'postgraduate'],
+})
+
+# Institution names on Wikipedia (wikipedia_source)
+UNIVERSITY_RULES = KeywordMatcher({
+    'any': ['university', 'college', 'institute', 'academy', 'school',
+            'universität', 'université', 'universidad'],
+    'table_name': ['university', 'college', 'institute', 'academy', 'school'],
+    'table_href': ['university', 'college', 'institute'],
+    'link': ['university', 'college', 'institute', 'academy'],
+})
@@ -3,11 +3,15 @@ Language detection module
 Detects if program is taught in English
 """
 import requests
-from bs4 import BeautifulSoup
 from typing import Optional, Tuple
 import logging
 from langdetect import detect, LangDetectException
 
+from request_scheduler import RequestScheduler, default_scheduler
+from http_cache import HTTPCache, install_cache
+from page_fetcher import FetchedPage
+from keyword_matcher import DELIVERY_MODE_RULES, ENGLISH_INSTRUCTION_RULES
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -15,54 +19,43 @@ logger = logging.getLogger(__name__)
 class LanguageDetector:
     """Detects if a program page indicates English instruction"""
     
-    def __init__(self, timeout: int = 10):
+    def __init__(self, timeout: int = 10, scheduler: Optional[RequestScheduler] = None,
+                 http_cache: Optional[HTTPCache] = None):
         self.timeout = timeout
+        self.scheduler = scheduler or default_scheduler
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        # Persistent on-disk HTTP cache shared by all sessions
+        self.http_cache = install_cache(self.session, http_cache)
+    
+    def _get_page(self, url: str, page: Optional[FetchedPage]) -> FetchedPage:
+        """Use the shared page if given, otherwise fetch it"""
+        if page is not None:
+            return page
+        self.scheduler.acquire(url)
+        response = self.session.get(url, timeout=self.timeout)
+        return FetchedPage.from_response(response)
     
-    def detect_delivery_mode(self, url: str) -> Tuple[str, float]:
+    def detect_delivery_mode(self, url: str, page: Optional[FetchedPage] = None) -> Tuple[str, float]:
         """
         Detect delivery mode: online, offline, hybrid, or bilingual
         Returns: (mode: str, confidence: float)
         """
         try:
-            response = self.session.get(url, timeout=self.timeout)
-            if response.status_code != 200:
+            page = self._get_page(url, page)
+            if page.status_code != 200:
                 return "offline", 0.5
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            page_text = soup.get_text().lower()
-            
-            # Online indicators
-            online_keywords = [
-                'online', 'distance learning', 'remote', 'virtual', 'e-learning',
-                'web-based', 'digital', 'asynchronous', 'synchronous online'
-            ]
-            
-            # Offline indicators
-            offline_keywords = [
-                'on-campus', 'on campus', 'in-person', 'in person', 'campus-based',
-                'residential', 'face-to-face', 'physical attendance'
-            ]
-            
-            # Hybrid indicators
-            hybrid_keywords = [
-                'hybrid', 'blended', 'mixed mode', 'flexible learning',
-                'combination', 'part online part offline'
-            ]
-            
-            # Bilingual indicators
-            bilingual_keywords = [
-                'bilingual', 'dual language', 'two languages', 'english and',
-                'taught in english and', 'multilingual'
-            ]
+            page_text = page.text_lower
             
-            online_count = sum(1 for keyword in online_keywords if keyword in page_text)
-            offline_count = sum(1 for keyword in offline_keywords if keyword in page_text)
-            hybrid_count = sum(1 for keyword in hybrid_keywords if keyword in page_text)
-            bilingual_count = sum(1 for keyword in bilingual_keywords if keyword in page_text)
+            # Online / offline / hybrid / bilingual indicators, counted in one pass
+            counts = DELIVERY_MODE_RULES.counts(page_text)
+            online_count = counts['online']
+            offline_count = counts['offline']
+            hybrid_count = counts['hybrid']
+            bilingual_count = counts['bilingual']
             
             # Determine mode
             if bilingual_count > 0:
@@ -81,41 +74,28 @@ class LanguageDetector:
             logger.warning(f"Delivery mode detection error for {url}: {e}")
             return "offline", 0.0
     
-    def detect_english(self, url: str) -> Tuple[bool, float]:
+    def detect_english(self, url: str, page: Optional[FetchedPage] = None) -> Tuple[bool, float]:
         """
         Detect if program is taught in English
         Returns: (is_english: bool, confidence: float)
         """
         try:
-            response = self.session.get(url, timeout=self.timeout)
-            if response.status_code != 200:
+            page = self._get_page(url, page)
+            if page.status_code != 200:
                 return False, 0.0
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
             # Method 1: Check HTML lang attribute
-            html_lang = soup.find('html', lang=True)
-            if html_lang:
-                lang_attr = html_lang.get('lang', '').lower()
-                if 'en' in lang_attr:
-                    return True, 0.9
+            lang_attr = (page.lang or '').lower()
+            if 'en' in lang_attr:
+                return True, 0.9
             
             # Method 2: Check for "Language of Instruction" text
-            page_text = soup.get_text().lower()
-            language_indicators = [
-                'language of instruction: english',
-                'taught in english',
-                'instruction in english',
-                'english language',
-                'medium of instruction: english'
-            ]
-            
-            for indicator in language_indicators:
-                if indicator in page_text:
-                    return True, 0.95
+            page_text = page.text_lower
+            if ENGLISH_INSTRUCTION_RULES.matches(page_text, 'english'):
+                return True, 0.95
             
             # Method 3: Use langdetect on main content
-            main_content = self._extract_main_content(soup)
+            main_content = page.main_text
             if main_content:
                 try:
                     detected_lang = detect(main_content)
@@ -140,29 +120,6 @@ class LanguageDetector:
             logger.warning(f"Language detection error for {url}: {e}")
             return False, 0.0
     
-    def _extract_main_content(self, soup: BeautifulSoup) -> Optional[str]:
-        """Extract main content from page (skip nav, footer, etc.)"""
-        # Try to find main content areas
-        main_selectors = [
-            'main', 'article', '.content', '#content', '.main-content',
-            '.program-description', '.course-description'
-        ]
-        
-        for selector in main_selectors:
-            element = soup.select_one(selector)
-            if element:
-                return element.get_text()
-        
-        # Fallback: get body text, but remove common non-content elements
-        body = soup.find('body')
-        if body:
-            # Remove script, style, nav, footer
-            for tag in body.find_all(['script', 'style', 'nav', 'footer', 'header']):
-                tag.decompose()
-            return body.get_text()
-        
-        return None
-    
     def _calculate_english_ratio(self, text: str) -> float:
         """Calculate ratio of English words in text"""
         # Common English words
@@ -1,12 +1,16 @@
 """
 FastAPI backend main application
 """
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import Iterator, List, Optional, Dict, Tuple
 from sqlalchemy.orm import Session
 from datetime import datetime
+import json
+import os
+import threading
 import logging
 
 from database import Database, University, Program
@@ -17,6 +21,14 @@ from ml_classifier import MLClassifier
 from metadata_checker import MetadataChecker
 from gotouni_checker import GotoUniChecker
 from ai_query import AIQuery
+from program_search import ProgramSearch
+from jobs import JobManager, JobContext
+from request_scheduler import default_scheduler
+from url_utils import url_key
+from vector_index import VectorIndex, load_program_index
+from embedding_store import EmbeddingStore, import_program_embeddings
+from ml_training import LABELS, RetrainWorker
+import numpy as np
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -39,10 +51,63 @@ university_scraper = UniversityScraper()
 course_scraper = CourseScraper()
 translator = Translator()
 language_detector = LanguageDetector()
-ml_classifier = MLClassifier()
+ml_classifier = MLClassifier()  # Embedding model loads on first use
 metadata_checker = MetadataChecker()
 goto_uni_checker = GotoUniChecker()
 ai_query = AIQuery()
+program_search = ProgramSearch(ml_classifier)
+job_manager = JobManager(db)
+embedding_store = EmbeddingStore()
+retrain_worker = RetrainWorker(ml_classifier.trainer)  # Trains on label feedback in the background
+
+# Embedding index for similarity search, loaded on first use
+program_index: Optional[VectorIndex] = None
+_program_index_lock = threading.Lock()
+
+
+def get_program_index() -> VectorIndex:
+    """The program embedding index (built from the embedding store on first call)"""
+    global program_index
+    if program_index is None:
+        with _program_index_lock:
+            if program_index is None:
+                program_index = load_program_index(embedding_store)
+    return program_index
+
+
+@app.on_event("startup")
+def import_legacy_embeddings():
+    """Copy embeddings stored in the programs table into the embedding store (once)"""
+    session = db.get_session()
+    try:
+        import_program_embeddings(embedding_store, session, Program, ml_classifier.model_name)
+    except Exception as e:
+        logger.warning(f"Could not import stored program embeddings: {e}")
+    finally:
+        session.close()
+
+
+@app.on_event("startup")
+def warm_up_ml_classifier():
+    """With GUIS_ML_WARMUP=1, load the embedding model in the background at startup"""
+    if os.getenv('GUIS_ML_WARMUP', '0') == '1':
+        threading.Thread(target=ml_classifier.warm_up, name="ml-warmup", daemon=True).start()
+
+
+@app.on_event("startup")
+def start_retrain_worker():
+    """Train on feedback left pending by a previous run, then wait for more"""
+    retrain_worker.start()
+
+
+@app.on_event("shutdown")
+def stop_retrain_worker():
+    retrain_worker.stop()
+
+
+@app.on_event("shutdown")
+def close_course_scraper():
+    course_scraper.close()
 
 
 # Dependency
@@ -62,17 +127,37 @@ class CountryRequest(BaseModel):
 class CourseRequest(BaseModel):
     country: str
     course: str
+    workers: Optional[int] = None  # Universities processed concurrently
 
 
 class ProgramVisitRequest(BaseModel):
     program_id: int
 
 
+class RecheckRequest(BaseModel):
+    country: Optional[str] = None
+    course: Optional[str] = None
+    program_ids: Optional[List[int]] = None
+    batch_size: int = 200
+    max_workers: int = 8
+
+
 class AIQueryRequest(BaseModel):
     question: str
     context: Optional[Dict] = None
 
 
+class LabelFeedback(BaseModel):
+    level: str  # UG or PG
+    program_id: Optional[int] = None  # Stored program; its level is corrected too
+    text: Optional[str] = None  # Program title, embedded if there is no stored embedding
+
+
+class FeedbackRequest(BaseModel):
+    items: List[LabelFeedback]
+    retrain_now: bool = False
+
+
 # API Endpoints
 @app.get("/")
 def root():
@@ -100,6 +185,7 @@ def get_universities(
                 "translated_name": uni.translated_name,
                 "country": uni.country,
                 "exists_in_gotouniversity": uni.exists_in_gotouniversity,
+                "website_url": uni.website_url,
                 "created_at": uni.created_at.isoformat() if uni.created_at else None
             })
         
@@ -112,62 +198,234 @@ def get_universities(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/universities/fetch")
-def fetch_universities(request: CountryRequest, db_session: Session = Depends(get_db)):
-    """Fetch universities for a country"""
-    try:
-        # Check if already in database
-        existing = db_session.query(University).filter(
-            University.country == request.country
-        ).all()
+def _university_summary(university: University) -> Dict:
+    return {
+        "id": university.id,
+        "original_name": university.original_name,
+        "translated_name": university.translated_name,
+        "exists_in_gotouniversity": university.exists_in_gotouniversity
+    }
+
+
+def iter_fetch_universities(country: str, db_session: Session, ctx: Optional[JobContext] = None,
+                            commit_each: bool = False) -> Iterator[Dict]:
+    """
+    Fetch, translate and store new universities for a country
+    Yields each university once added (once committed with commit_each)
+    """
+    if ctx:
+        ctx.advance(0, f"Searching sources for universities in {country}")
+    university_names = university_scraper.fetch_universities(country)
+    if ctx:
+        ctx.set_total(len(university_names))
+    
+    for name in university_names:
+        if ctx:
+            ctx.check_cancelled()
         
-        if existing:
-            return {
-                "message": "Universities already in database",
-                "count": len(existing),
-                "universities": [
-                    {
-                        "id": u.id,
-                        "original_name": u.original_name,
-                        "translated_name": u.translated_name,
-                        "exists_in_gotouniversity": u.exists_in_gotouniversity
-                    }
-                    for u in existing
-                ]
-            }
+        # Translate if needed
+        translated = translator.translate(name)
         
-        # Fetch new universities
-        university_names = university_scraper.fetch_universities(request.country)
+        # Check gotouniversity
+        exists, matched_name, similarity = goto_uni_checker.check_exists(translated)
         
-        universities = []
-        for name in university_names:
-            # Translate if needed
-            translated = translator.translate(name)
-            
-            # Check gotouniversity
-            exists, matched_name, similarity = goto_uni_checker.check_exists(translated)
-            
-            # Create university record
-            university = University(
-                original_name=name,
-                translated_name=translated,
-                country=request.country,
-                exists_in_gotouniversity=exists
-            )
-            db_session.add(university)
-            universities.append({
-                "original_name": name,
-                "translated_name": translated,
-                "exists_in_gotouniversity": exists
-            })
-        
-        db_session.commit()
+        # Create university record
+        university = University(
+            original_name=name,
+            translated_name=translated,
+            country=country,
+            exists_in_gotouniversity=exists
+        )
+        db_session.add(university)
+        if commit_each:
+            db_session.commit()
         
+        yield {
+            "original_name": name,
+            "translated_name": translated,
+            "exists_in_gotouniversity": exists
+        }
+    
+    db_session.commit()
+
+
+def run_fetch_universities(country: str, db_session: Session, ctx: Optional[JobContext] = None) -> Dict:
+    """
+    Fetch, translate and store universities for a country
+    ctx (when run as a background job) receives progress and partial results
+    """
+    # Check if already in database
+    existing = db_session.query(University).filter(
+        University.country == country
+    ).all()
+    
+    if existing:
         return {
-            "message": f"Fetched {len(universities)} universities",
-            "count": len(universities),
-            "universities": universities
+            "message": "Universities already in database",
+            "count": len(existing),
+            "universities": [_university_summary(u) for u in existing]
+        }
+    
+    universities = []
+    for university_data in iter_fetch_universities(country, db_session, ctx):
+        universities.append(university_data)
+        if ctx:
+            ctx.add_results([university_data])
+            ctx.advance(1, f"Processed {university_data['original_name']}")
+    
+    return {
+        "message": f"Fetched {len(universities)} universities",
+        "count": len(universities),
+        "universities": universities
+    }
+
+
+def iter_search_programs(country: str, course: str, workers: Optional[int], db_session: Session,
+                         ctx: Optional[JobContext] = None, commit_each: bool = False,
+                         ordered: bool = True) -> Iterator[Tuple[Dict, List[Dict]]]:
+    """
+    Search universities of a country for a course and store new programs
+    Yields (university, new program results) per university; with commit_each
+    every university is committed before it is yielded
+    """
+    # Get universities for country
+    universities = db_session.query(University).filter(
+        University.country == country
+    ).all()
+    
+    if not universities:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No universities found for {country}. Please fetch universities first."
+        )
+    
+    # Snapshot of stored URLs (canonical keys) so workers can skip known programs
+    existing_urls = {url_key(url) for (url,) in db_session.query(Program.program_url)}
+    
+    # Stored fingerprints per university, so workers can skip near-duplicate pages
+    simhashes = {}
+    for university_id, program_url, simhash, level in db_session.query(
+        Program.university_id, Program.program_url, Program.simhash, Program.level
+    ).join(University).filter(
+        University.country == country, Program.simhash.isnot(None)
+    ):
+        simhashes.setdefault(university_id, []).append((program_url, simhash, level))
+    
+    university_infos = [
+        {
+            "id": university.id,
+            "name": university.translated_name or university.original_name,
+            "original_name": university.original_name,
+            "website_url": university.website_url,
+            "website_status": university.website_status,
+            "website_checked_at": university.website_checked_at,
+            "simhashes": simhashes.get(university.id, [])
         }
+        for university in universities
+    ]
+    if ctx:
+        ctx.set_total(len(university_infos))
+    
+    pending_embeddings = []
+    
+    # Universities are processed concurrently; records are persisted here
+    for university_info, records in program_search.iter_universities(
+        university_infos, course, existing_urls, workers=workers, ordered=ordered
+    ):
+        # Remember newly discovered (or missing) homepages
+        if university_info.get('website_update'):
+            db_session.query(University).filter(University.id == university_info['id']).update(
+                university_info['website_update'], synchronize_session=False
+            )
+        
+        university_programs = []
+        new_programs = []
+        new_embeddings = []
+        for record in records:
+            key = url_key(record['program']['program_url'])
+            if key in existing_urls:
+                continue  # Found by another university in this search
+            existing_urls.add(key)
+            program = Program(**record['program'])
+            db_session.add(program)
+            new_programs.append(program)
+            new_embeddings.append(record.get('embedding'))
+            university_programs.append(record['result'])
+        
+        # Embeddings are stored by program id (assigned on flush) once committed
+        if new_programs:
+            db_session.flush()
+            pending_embeddings.extend(
+                (program.id, embedding) for program, embedding in zip(new_programs, new_embeddings)
+            )
+        
+        if commit_each:
+            db_session.commit()
+            _store_embeddings(pending_embeddings)
+            pending_embeddings = []
+        yield university_info, university_programs
+    
+    db_session.commit()
+    _store_embeddings(pending_embeddings)
+
+
+def _store_embeddings(programs: List[Tuple[int, Optional[np.ndarray]]]):
+    """Append (program id, embedding) pairs to the embedding store and a loaded similarity index"""
+    global program_index
+    programs = [(program_id, embedding) for program_id, embedding in programs if embedding is not None]
+    if not programs:
+        return
+    try:
+        ids = [program_id for program_id, _ in programs]
+        vectors = np.stack([embedding for _, embedding in programs])
+        # Under the index lock, so a concurrent index load can't miss these rows
+        with _program_index_lock:
+            if embedding_store.ensure_model(ml_classifier.model_name, vectors.shape[1]):
+                # Older vectors were discarded; rebuild the index on next use
+                program_index = None
+            embedding_store.put_many(ids, vectors)
+            if program_index is not None:
+                program_index.add_many(ids, vectors)
+    except Exception as e:
+        logger.warning(f"Could not store embeddings of new programs: {e}")
+
+
+def run_search_programs(country: str, course: str, workers: Optional[int], db_session: Session,
+                        ctx: Optional[JobContext] = None) -> Dict:
+    """
+    Search universities of a country for a course and store new programs
+    As a background job (ctx given), each university is committed as it
+    finishes so partial results survive; otherwise one commit at the end
+    """
+    programs_found = []
+    
+    for university_info, university_programs in iter_search_programs(
+        country, course, workers, db_session, ctx=ctx, commit_each=ctx is not None
+    ):
+        programs_found.extend(university_programs)
+        if ctx:
+            ctx.add_results(university_programs)
+            ctx.advance(1, f"Searched {university_info['name']}")
+            ctx.check_cancelled()
+    
+    # Count UG/PG
+    ug_count = sum(1 for p in programs_found if p['level'] == 'UG')
+    pg_count = sum(1 for p in programs_found if p['level'] == 'PG')
+    
+    return {
+        "message": f"Found {len(programs_found)} programs",
+        "total": len(programs_found),
+        "ug_count": ug_count,
+        "pg_count": pg_count,
+        "programs": programs_found
+    }
+
+
+@app.post("/api/universities/fetch")
+def fetch_universities(request: CountryRequest, db_session: Session = Depends(get_db)):
+    """Fetch universities for a country"""
+    try:
+        return run_fetch_universities(request.country, db_session)
     except Exception as e:
         logger.error(f"Error fetching universities: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -177,101 +435,263 @@ def fetch_universities(request: CountryRequest, db_session: Session = Depends(ge
 def search_programs(request: CourseRequest, db_session: Session = Depends(get_db)):
     """Search for programs matching course in universities from country"""
     try:
-        # Get universities for country
-        universities = db_session.query(University).filter(
+        return run_search_programs(request.country, request.course, request.workers, db_session)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching programs: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _stream_event(event: str, data: Dict, fmt: str) -> str:
+    """Encode one event as an NDJSON line or an SSE message"""
+    payload = json.dumps(data, default=str)
+    if fmt == "sse":
+        return f"event: {event}\ndata: {payload}\n\n"
+    return json.dumps({"type": event, "data": data}, default=str) + "\n"
+
+
+def _streaming_response(events: Iterator[str], fmt: str) -> StreamingResponse:
+    media_type = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    return StreamingResponse(events, media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+
+@app.post("/api/universities/fetch/stream")
+def fetch_universities_stream(request: CountryRequest, fmt: str = Query("ndjson", alias="format")):
+    """Fetch universities, streaming each one (NDJSON or SSE) as soon as it is stored"""
+    fmt = "sse" if fmt == "sse" else "ndjson"
+    
+    def events() -> Iterator[str]:
+        session = db.get_session()
+        count = 0
+        try:
+            existing = session.query(University).filter(
+                University.country == request.country
+            ).all()
+            if existing:
+                for university in existing:
+                    count += 1
+                    yield _stream_event("university", _university_summary(university), fmt)
+                message = "Universities already in database"
+            else:
+                for university_data in iter_fetch_universities(request.country, session, commit_each=True):
+                    count += 1
+                    yield _stream_event("university", university_data, fmt)
+                message = f"Fetched {count} universities"
+            yield _stream_event("done", {"message": message, "count": count}, fmt)
+        except Exception as e:
+            logger.error(f"Error streaming universities: {e}")
+            session.rollback()
+            yield _stream_event("error", {"detail": str(e)}, fmt)
+        finally:
+            session.close()
+    
+    return _streaming_response(events(), fmt)
+
+
+@app.post("/api/programs/search/stream")
+def search_programs_stream(request: CourseRequest, fmt: str = Query("ndjson", alias="format"),
+                           db_session: Session = Depends(get_db)):
+    """Search programs, streaming each program (NDJSON or SSE) as soon as it is stored"""
+    fmt = "sse" if fmt == "sse" else "ndjson"
+    has_universities = db_session.query(University.id).filter(
+        University.country == request.country
+    ).first()
+    if not has_universities:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No universities found for {request.country}. Please fetch universities first."
+        )
+    
+    def events() -> Iterator[str]:
+        session = db.get_session()
+        total = ug_count = pg_count = 0
+        try:
+            for university_info, university_programs in iter_search_programs(
+                request.country, request.course, request.workers, session,
+                commit_each=True, ordered=False
+            ):
+                for program in university_programs:
+                    total += 1
+                    if program['level'] == 'UG':
+                        ug_count += 1
+                    elif program['level'] == 'PG':
+                        pg_count += 1
+                    yield _stream_event("program", program, fmt)
+                yield _stream_event("university", {
+                    "university": university_info['name'],
+                    "programs": len(university_programs)
+                }, fmt)
+            yield _stream_event("done", {
+                "message": f"Found {total} programs",
+                "total": total,
+                "ug_count": ug_count,
+                "pg_count": pg_count
+            }, fmt)
+        except Exception as e:
+            logger.error(f"Error streaming programs: {e}")
+            session.rollback()
+            yield _stream_event("error", {"detail": str(e)}, fmt)
+        finally:
+            session.close()
+    
+    return _streaming_response(events(), fmt)
+
+
+def _job_with_session(func, *args):
+    """Wrap a run_* function as a job body with its own database session"""
+    def _job(ctx: JobContext) -> Dict:
+        session = db.get_session()
+        try:
+            return func(*args, session, ctx)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    return _job
+
+
+@app.post("/api/jobs/universities/fetch")
+def submit_fetch_universities_job(request: CountryRequest):
+    """Start fetching universities in the background; returns a job id"""
+    try:
+        job_id = job_manager.submit(
+            "universities_fetch",
+            request.model_dump(),
+            _job_with_session(run_fetch_universities, request.country)
+        )
+        return {"job_id": job_id, "status": "queued"}
+    except Exception as e:
+        logger.error(f"Error submitting fetch job: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/jobs/programs/search")
+def submit_search_programs_job(request: CourseRequest, db_session: Session = Depends(get_db)):
+    """Start a program search in the background; returns a job id"""
+    try:
+        has_universities = db_session.query(University.id).filter(
             University.country == request.country
-        ).all()
-        
-        if not universities:
+        ).first()
+        if not has_universities:
             raise HTTPException(
                 status_code=404,
                 detail=f"No universities found for {request.country}. Please fetch universities first."
             )
         
-        programs_found = []
-        
-        for university in universities:
-            try:
-                # Search for courses
-                course_links = course_scraper.search_courses(
-                    university.translated_name or university.original_name,
-                    request.course
-                )
-                
-                for link_info in course_links:
-                    url = link_info['url']
-                    
-                    # Check if program already exists
-                    existing = db_session.query(Program).filter(
-                        Program.program_url == url
-                    ).first()
-                    
-                    if existing:
-                        continue
-                    
-                    # Detect language
-                    is_english, confidence = language_detector.detect_english(url)
-                    
-                    # Classify UG/PG
-                    level, ml_confidence = ml_classifier.classify(
-                        link_info.get('title', request.course)
-                    )
-                    
-                    # Get metadata
-                    metadata = metadata_checker.check_metadata(url)
-                    
-                    # Get embedding
-                    embedding = ml_classifier.get_embedding(
-                        f"{link_info.get('title', request.course)} {request.course}"
-                    )
-                    
-                    # Create program record
-                    program = Program(
-                        university_id=university.id,
-                        course_name=request.course,
-                        program_url=url,
-                        level=level,
-                        taught_in_english=is_english,
-                        visited=False,
-                        content_hash=metadata.get('content_hash'),
-                        embedding_vector=embedding.tobytes(),
-                        last_checked=metadata.get('last_checked'),
-                        last_modified_header=metadata.get('last_modified_header'),
-                        etag=metadata.get('etag'),
-                        confidence_score=str(ml_confidence)
-                    )
-                    db_session.add(program)
-                    
-                    programs_found.append({
-                        "university": university.translated_name or university.original_name,
-                        "url": url,
-                        "level": level,
-                        "taught_in_english": is_english,
-                        "confidence": ml_confidence
-                    })
-            
-            except Exception as e:
-                logger.warning(f"Error processing {university.original_name}: {e}")
-                continue
-        
-        db_session.commit()
-        
-        # Count UG/PG
-        ug_count = sum(1 for p in programs_found if p['level'] == 'UG')
-        pg_count = sum(1 for p in programs_found if p['level'] == 'PG')
-        
-        return {
-            "message": f"Found {len(programs_found)} programs",
-            "total": len(programs_found),
-            "ug_count": ug_count,
-            "pg_count": pg_count,
-            "programs": programs_found
-        }
-    
+        job_id = job_manager.submit(
+            "programs_search",
+            request.model_dump(),
+            _job_with_session(run_search_programs, request.country, request.course, request.workers)
+        )
+        return {"job_id": job_id, "status": "queued"}
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error searching programs: {e}")
+        logger.error(f"Error submitting search job: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/jobs")
+def list_jobs(limit: int = 50):
+    """List recent jobs (without results)"""
+    try:
+        jobs = job_manager.list(limit)
+        return {"total": len(jobs), "jobs": jobs}
+    except Exception as e:
+        logger.error(f"Error listing jobs: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    """Job status, progress, partial or final result, errors and timing"""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """Request cancellation of a queued or running job"""
+    if not job_manager.cancel(job_id):
+        raise HTTPException(status_code=404, detail="Job not found or already finished")
+    return {"message": "Cancellation requested", "job_id": job_id}
+
+
+def _program_summary(program: Program) -> Dict:
+    university = program.university
+    return {
+        "id": program.id,
+        "university": {
+            "id": university.id,
+            "original_name": university.original_name,
+            "translated_name": university.translated_name,
+            "exists_in_gotouniversity": university.exists_in_gotouniversity
+        },
+        "course_name": program.course_name,
+        "program_url": program.program_url,
+        "level": program.level,
+        "taught_in_english": program.taught_in_english,
+        "visited": program.visited,
+        "confidence_score": program.confidence_score
+    }
+
+
+def _similar_programs(hits: List[Tuple[int, float]], db_session: Session) -> List[Dict]:
+    """Program summaries with their similarity, in hit order (ids no longer stored are dropped)"""
+    programs = {
+        program.id: program
+        for program in db_session.query(Program).filter(Program.id.in_([program_id for program_id, _ in hits]))
+    }
+    return [
+        dict(_program_summary(programs[program_id]), similarity=round(score, 4))
+        for program_id, score in hits if program_id in programs
+    ]
+
+
+@app.get("/api/programs/semantic-search")
+def semantic_search_programs(q: str, k: int = Query(10, ge=1, le=100),
+                             db_session: Session = Depends(get_db)):
+    """Programs whose embedding is closest to the query text"""
+    try:
+        if not q.strip():
+            raise HTTPException(status_code=400, detail="Query must not be empty")
+        index = get_program_index()
+        if not len(index):
+            return {"query": q, "total": 0, "programs": []}
+        query_vector = ml_classifier.get_embedding(q)
+        results = _similar_programs(index.search(query_vector, k), db_session)
+        return {"query": q, "total": len(results), "programs": results}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in semantic search: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/programs/{program_id}/similar")
+def get_similar_programs(program_id: int, k: int = Query(10, ge=1, le=100),
+                         db_session: Session = Depends(get_db)):
+    """The k programs most similar to a stored program (by embedding)"""
+    try:
+        index = get_program_index()
+        vector = index.vector(program_id)
+        if vector is None:
+            program = db_session.query(Program).filter(Program.id == program_id).first()
+            if not program:
+                raise HTTPException(status_code=404, detail="Program not found")
+            vector = embedding_store.get(program_id)
+            if vector is None:
+                raise HTTPException(status_code=404, detail="Program has no embedding")
+        results = _similar_programs(index.search(vector, k, exclude=[program_id]), db_session)
+        return {"program_id": program_id, "total": len(results), "programs": results}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error finding similar programs: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -301,24 +721,7 @@ def get_programs(
         
         programs = query.all()
         
-        result = []
-        for program in programs:
-            university = program.university
-            result.append({
-                "id": program.id,
-                "university": {
-                    "id": university.id,
-                    "original_name": university.original_name,
-                    "translated_name": university.translated_name,
-                    "exists_in_gotouniversity": university.exists_in_gotouniversity
-                },
-                "course_name": program.course_name,
-                "program_url": program.program_url,
-                "level": program.level,
-                "taught_in_english": program.taught_in_english,
-                "visited": program.visited,
-                "confidence_score": program.confidence_score
-            })
+        result = [_program_summary(program) for program in programs]
         
         ug_count = sum(1 for p in programs if p.level == 'UG')
         pg_count = sum(1 for p in programs if p.level == 'PG')
@@ -335,6 +738,85 @@ def get_programs(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/programs/recheck")
+def recheck_programs(request: RecheckRequest, db_session: Session = Depends(get_db)):
+    """Revalidate stored programs with conditional GETs and record changes"""
+    try:
+        query = db_session.query(
+            Program.id, Program.program_url, Program.content_hash, Program.simhash,
+            Program.etag, Program.last_modified_header
+        )
+        
+        if request.country:
+            query = query.join(University).filter(University.country == request.country)
+        
+        if request.course:
+            query = query.filter(Program.course_name.contains(request.course))
+        
+        if request.program_ids:
+            query = query.filter(Program.id.in_(request.program_ids))
+        
+        batch_size = max(1, request.batch_size)
+        checked = not_modified = changed = errors = 0
+        changed_ids = []
+        last_id = 0
+        
+        # Keyset pagination: one batch of network checks, then one commit
+        while True:
+            rows = query.filter(Program.id > last_id).order_by(Program.id).limit(batch_size).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            
+            results = metadata_checker.check_many([
+                {
+                    "url": row.program_url,
+                    "content_hash": row.content_hash,
+                    "simhash": row.simhash,
+                    "etag": row.etag,
+                    "last_modified_header": row.last_modified_header
+                }
+                for row in rows
+            ], max_workers=request.max_workers)
+            
+            updates = []
+            for row, metadata in zip(rows, results):
+                checked += 1
+                if metadata.get('error'):
+                    errors += 1
+                    continue
+                if metadata.get('not_modified'):
+                    not_modified += 1
+                if metadata.get('has_changed'):
+                    changed += 1
+                    changed_ids.append(row.id)
+                updates.append({
+                    "id": row.id,
+                    "content_hash": metadata.get('content_hash'),
+                    "simhash": metadata.get('simhash'),
+                    "etag": metadata.get('etag'),
+                    "last_modified_header": metadata.get('last_modified_header'),
+                    "last_checked": metadata.get('last_checked')
+                })
+            
+            if updates:
+                db_session.bulk_update_mappings(Program, updates)
+            db_session.commit()
+        
+        return {
+            "message": f"Rechecked {checked} programs, {changed} changed",
+            "checked": checked,
+            "not_modified": not_modified,
+            "changed": changed,
+            "errors": errors,
+            "changed_program_ids": changed_ids
+        }
+    
+    except Exception as e:
+        logger.error(f"Error rechecking programs: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/api/programs/visit")
 def mark_visited(request: ProgramVisitRequest, db_session: Session = Depends(get_db)):
     """Mark program as visited"""
@@ -366,6 +848,100 @@ def ai_query_endpoint(request: AIQueryRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/ml/feedback")
+def submit_label_feedback(request: FeedbackRequest, db_session: Session = Depends(get_db)):
+    """
+    Record corrected UG/PG labels
+    Corrections are stored at once and trained on in the background; the
+    new classifier version replaces the active one without a restart
+    """
+    try:
+        examples = []
+        skipped = []
+        for item in request.items:
+            level = item.level.strip().upper()
+            if level not in LABELS:
+                raise HTTPException(status_code=400, detail=f"Invalid level '{item.level}' (expected UG or PG)")
+            example = {'label': LABELS[level], 'text': item.text, 'source': 'feedback'}
+            
+            if item.program_id is not None:
+                program = db_session.query(Program).filter(Program.id == item.program_id).first()
+                if not program:
+                    raise HTTPException(status_code=404, detail=f"Program {item.program_id} not found")
+                program.level = level
+                program.confidence_score = "1.0"
+                example['program_id'] = program.id
+                # Reuse the stored embedding when it comes from the active model
+                if embedding_store.model == ml_classifier.model_name:
+                    example['vector'] = embedding_store.get(program.id)
+            
+            if example.get('vector') is None and not item.text:
+                skipped.append(item.program_id)
+                continue
+            examples.append(example)
+        
+        db_session.commit()
+        ids = retrain_worker.submit(examples) if examples else []
+        if request.retrain_now:
+            retrain_worker.retrain_now()
+        return {
+            "accepted": len(ids),
+            "skipped": skipped,
+            "model_version": ml_classifier.model_version,
+            "pending": retrain_worker.status()['pending']
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error recording label feedback: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/ml/status")
+def get_ml_status():
+    """Active classifier version, stored training examples and retraining state"""
+    try:
+        return {
+            "model_version": ml_classifier.model_version,
+            "model": ml_classifier.model_metadata,
+            "examples": ml_classifier.trainer.counts(),
+            "retraining": retrain_worker.status()
+        }
+    except Exception as e:
+        logger.error(f"Error getting ML status: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/ml/retrain")
+def retrain_ml_classifier():
+    """Train on pending feedback now instead of waiting for a full batch"""
+    retrain_worker.retrain_now()
+    return {"message": "Retraining requested", "pending": retrain_worker.status()['pending']}
+
+
+@app.get("/api/ml/models")
+def get_ml_models():
+    """Stored classifier versions, newest first"""
+    registry = ml_classifier.registry
+    return {
+        "current": registry.current_version(),
+        "active": ml_classifier.model_version,
+        "versions": [registry.metadata(version) for version in reversed(registry.versions())]
+    }
+
+
+@app.post("/api/ml/models/{version}/activate")
+def activate_ml_model(version: int):
+    """Switch the running classifier to a stored version (rollback)"""
+    loaded = ml_classifier.registry.load(version) if version in ml_classifier.registry.versions() else None
+    if loaded is None:
+        raise HTTPException(status_code=404, detail="Classifier version not found")
+    model, metadata = loaded
+    ml_classifier.registry.activate(version)
+    ml_classifier.swap_classifier(model, version, metadata)
+    return {"message": "Classifier version activated", "version": version}
+
+
 @app.get("/api/stats")
 def get_stats(db_session: Session = Depends(get_db)):
     """Get system statistics"""
@@ -390,6 +966,31 @@ def get_stats(db_session: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/crawler/hosts")
+def get_crawler_hosts():
+    """Per-host request scheduler state: queue depth, wait times, throttling"""
+    try:
+        hosts = default_scheduler.stats()
+        return {
+            "total_hosts": len(hosts),
+            "queued": sum(h['queued'] for h in hosts.values()),
+            "hosts": hosts
+        }
+    except Exception as e:
+        logger.error(f"Error getting crawler stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/embeddings/stats")
+def get_embedding_stats():
+    """Embedding store state: model, dtype, stored vectors and file size"""
+    try:
+        return embedding_store.stats()
+    except Exception as e:
+        logger.error(f"Error getting embedding stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -4,10 +4,17 @@ Tracks content changes using hash, headers, etc.
 """
 import hashlib
 import requests
-from typing import Optional, Dict, Tuple
+from typing import Optional, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import threading
 import logging
 
+from request_scheduler import RequestScheduler, default_scheduler
+from http_cache import HTTPCache, get_shared_cache, install_cache
+from page_fetcher import FetchedPage
+from simhash import CHANGE_DISTANCE, hamming_distance
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -15,48 +22,101 @@ logger = logging.getLogger(__name__)
 class MetadataChecker:
     """Checks for changes in program pages"""
     
-    def __init__(self, timeout: int = 10):
+    def __init__(self, timeout: int = 10, scheduler: Optional[RequestScheduler] = None,
+                 http_cache: Optional[HTTPCache] = None):
         self.timeout = timeout
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        self.scheduler = scheduler or default_scheduler
+        # Persistent on-disk HTTP cache shared by all sessions
+        self.http_cache = http_cache or get_shared_cache()
+        # requests sessions are not shared across threads (check_many runs a pool)
+        self._local = threading.local()
+    
+    @property
+    def session(self) -> requests.Session:
+        """This thread's session"""
+        if not hasattr(self._local, 'session'):
+            session = requests.Session()
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            })
+            install_cache(session, self.http_cache)
+            self._local.session = session
+        return self._local.session
     
     def check_metadata(self, url: str, existing_hash: Optional[str] = None,
                       existing_etag: Optional[str] = None,
-                      existing_last_modified: Optional[str] = None) -> Dict:
+                      existing_last_modified: Optional[str] = None,
+                      page: Optional[FetchedPage] = None,
+                      existing_simhash: Optional[str] = None) -> Dict:
         """
         Check metadata and detect changes
+        Without a page, sends a conditional GET built from the stored
+        ETag / Last-Modified; a 304 skips downloading and hashing the body.
+        The request always reaches the server: a fresh HTTP cache entry is
+        revalidated (Cache-Control: no-cache), never served as-is.
         Returns dict with:
         - content_hash: SHA256 hash
+        - simhash: SimHash fingerprint of the main text (None for near-empty pages)
+        - distance: bits changed since existing_simhash (None if not comparable)
         - etag: ETag header
         - last_modified_header: Last-Modified header
-        - has_changed: bool
+        - has_changed: bool (with fingerprints on both sides, only when the
+          content moved more than CHANGE_DISTANCE bits)
+        - not_modified: bool (server answered 304)
         - last_checked: datetime
         """
         try:
-            response = self.session.get(url, timeout=self.timeout)
-            if response.status_code != 200:
+            if page is None:
+                headers = {'Cache-Control': 'no-cache'}
+                if existing_hash:
+                    headers.update(self._conditional_headers(existing_etag, existing_last_modified))
+                self.scheduler.acquire(url)
+                response = self.session.get(url, timeout=self.timeout, headers=headers)
+                if response.status_code == 304 and existing_hash:
+                    return {
+                        'content_hash': existing_hash,
+                        'simhash': existing_simhash,
+                        'distance': 0 if existing_simhash else None,
+                        'etag': response.headers.get('ETag', '').strip('"') or existing_etag,
+                        'last_modified_header': response.headers.get('Last-Modified') or existing_last_modified,
+                        'has_changed': False,
+                        'not_modified': True,
+                        'last_checked': datetime.utcnow()
+                    }
+                page = FetchedPage.from_response(response)
+            if page.status_code != 200:
                 return {
                     'content_hash': existing_hash,
+                    'simhash': existing_simhash,
                     'etag': existing_etag,
                     'last_modified_header': existing_last_modified,
                     'has_changed': False,
                     'last_checked': datetime.utcnow(),
-                    'error': f'HTTP {response.status_code}'
+                    'error': f'HTTP {page.status_code}'
                 }
             
             # Extract headers
-            etag = response.headers.get('ETag', '').strip('"')
-            last_modified = response.headers.get('Last-Modified', '')
+            etag = page.headers.get('ETag', '').strip('"')
+            last_modified = page.headers.get('Last-Modified', '')
             
-            # Calculate content hash
-            content = self._clean_content(response.text)
+            # Hash the main content only, so rotating banners, menus and
+            # footers don't count as changes
+            content = page.main_text
             content_hash = self._calculate_hash(content)
+            simhash = page.simhash
+            distance = None
+            if simhash and existing_simhash:
+                distance = hamming_distance(simhash, existing_simhash)
             
             # Check for changes
             has_changed = False
-            if existing_hash:
+            if distance is not None and existing_hash:
+                # Dates, counters and session tokens move a few bits at most
+                has_changed = distance > CHANGE_DISTANCE
+                if not has_changed:
+                    # Keep the stored baseline, so small edits can't add up unnoticed
+                    content_hash, simhash = existing_hash, existing_simhash
+            elif existing_hash:
                 if content_hash != existing_hash:
                     has_changed = True
                 elif etag and existing_etag and etag != existing_etag:
@@ -69,9 +129,12 @@ class MetadataChecker:
             
             return {
                 'content_hash': content_hash,
+                'simhash': simhash,
+                'distance': distance,
                 'etag': etag,
                 'last_modified_header': last_modified,
                 'has_changed': has_changed,
+                'not_modified': False,
                 'last_checked': datetime.utcnow()
             }
         
@@ -79,6 +142,7 @@ class MetadataChecker:
             logger.error(f"Metadata check error for {url}: {e}")
             return {
                 'content_hash': existing_hash,
+                'simhash': existing_simhash,
                 'etag': existing_etag,
                 'last_modified_header': existing_last_modified,
                 'has_changed': False,
@@ -86,32 +150,38 @@ class MetadataChecker:
                 'error': str(e)
             }
     
-    def _clean_content(self, html_content: str) -> str:
-        """Clean HTML content for hashing (remove dynamic elements)"""
-        from bs4 import BeautifulSoup
-        try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Remove script and style tags
-            for tag in soup.find_all(['script', 'style', 'noscript']):
-                tag.decompose()
-            
-            # Remove comments
-            from bs4 import Comment
-            comments = soup.find_all(string=lambda text: isinstance(text, Comment))
-            for comment in comments:
-                comment.extract()
-            
-            # Get text content
-            text = soup.get_text()
-            
-            # Normalize whitespace
-            text = ' '.join(text.split())
-            
-            return text
-        except Exception as e:
-            logger.warning(f"Content cleaning error: {e}")
-            return html_content
+    def check_many(self, items: List[Dict], max_workers: int = 8) -> List[Dict]:
+        """
+        Revalidate many stored programs concurrently
+        items: dicts with url, content_hash, simhash, etag, last_modified_header
+        Returns check_metadata results in input order
+        """
+        def _check(item: Dict) -> Dict:
+            return self.check_metadata(
+                item['url'],
+                existing_hash=item.get('content_hash'),
+                existing_etag=item.get('etag'),
+                existing_last_modified=item.get('last_modified_header'),
+                existing_simhash=item.get('simhash')
+            )
+        
+        if max_workers <= 1 or len(items) <= 1:
+            return [_check(item) for item in items]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(_check, items))
+    
+    def _conditional_headers(self, etag: Optional[str], last_modified: Optional[str]) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since from stored validators"""
+        headers = {}
+        if etag:
+            # ETags are stored without their quotes
+            if etag.startswith('W/'):
+                headers['If-None-Match'] = 'W/"' + etag[2:].strip('"') + '"'
+            else:
+                headers['If-None-Match'] = '"' + etag + '"'
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
     
     def _calculate_hash(self, content: str) -> str:
         """Calculate SHA256 hash of content"""
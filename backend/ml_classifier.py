@@ -3,34 +3,103 @@ ML classification module for UG/PG classification
 Uses SentenceTransformers for embeddings and scikit-learn for classification
 """
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.linear_model import LogisticRegression
-from typing import Tuple, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 import logging
 import pickle
 import os
+import threading
+
+from keyword_matcher import LEVEL_RULES
+from embedding_cache import EmbeddingCache, get_shared_embedding_cache
+from embedding_backends import default_backend, load_embedding_model
+from ml_training import IncrementalTrainer, ModelRegistry, ReplayStore, new_incremental_classifier
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class MLClassifier:
-    """ML-based UG/PG classifier"""
+    """
+    ML-based UG/PG classifier
+    The embedding model is loaded on first use (or by warm_up()), so creating
+    a classifier is cheap; backend selects torch, onnx or onnx-int8 inference
+    (default: GUIS_EMBEDDING_BACKEND)
+    The active classifier is the current version in the model registry;
+    trainer produces new versions and swaps them in while predictions run
+    """
     
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', embedding_cache: Optional[EmbeddingCache] = None,
+                 backend: Optional[str] = None, registry: Optional[ModelRegistry] = None,
+                 replay_store: Optional[ReplayStore] = None):
         self.model_name = model_name
-        self.embedding_model = SentenceTransformer(model_name)
+        self.backend = backend or default_backend()
+        self._embedding_model = None
+        self._model_lock = threading.RLock()
+        # Repeated texts (titles recur across universities) skip the model
+        self.embedding_cache = embedding_cache or get_shared_embedding_cache()
         self.classifier = None
         self.is_trained = False
-        # Store model in project root
-        import os
+        self.model_version: Optional[int] = None
+        self.model_metadata: Optional[Dict] = None
+        self._needs_initial_training = False
+        # Pre-registry model file in project root, still loaded if present
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.model_path = os.path.join(project_root, 'ml_classifier_model.pkl')
+        self.registry = registry or ModelRegistry()
+        self.trainer = IncrementalTrainer(self, replay_store or ReplayStore(), self.registry)
         self._load_or_initialize()
     
+    @property
+    def embedding_model(self):
+        """Sentence embedding model (loaded on first access)"""
+        if self._embedding_model is None:
+            with self._model_lock:
+                if self._embedding_model is None:
+                    self._embedding_model, self.backend = load_embedding_model(self.model_name, self.backend)
+        return self._embedding_model
+    
+    @property
+    def model_loaded(self) -> bool:
+        return self._embedding_model is not None
+    
+    @property
+    def cache_model_name(self) -> str:
+        """
+        Embedding cache namespace: int8 vectors differ from full-precision ones
+        Loads the model first: the backend is only final then (onnx-int8 may
+        fall back to torch)
+        """
+        self.embedding_model
+        return f"{self.model_name}@int8" if self.backend == 'onnx-int8' else self.model_name
+    
+    @property
+    def embedding_dimension(self) -> int:
+        """
+        Length of the embedding vectors; taken from the active classifier when
+        it was trained on this model's embeddings, so the model isn't loaded
+        just for that
+        """
+        if not self.model_loaded:
+            classifier = self.classifier
+            trained_on = (self.model_metadata or {}).get('embedding_model') or ''
+            if trained_on.split('@')[0] == self.model_name and hasattr(classifier, 'n_features_in_'):
+                return int(classifier.n_features_in_)
+        return self.embedding_model.get_sentence_embedding_dimension()
+    
+    def warm_up(self):
+        """Load the model, train the initial classifier if needed and run one encode"""
+        self._ensure_trained()
+        self.embedding_model.encode(["Master of Science"], show_progress_bar=False)
+        logger.info(f"ML classifier ready ({self.backend})")
+    
     def _load_or_initialize(self):
-        """Load existing model or initialize new one"""
-        if os.path.exists(self.model_path):
+        """Load existing model or initialize new one (trained on first use)"""
+        loaded = self.registry.load()
+        if loaded is not None:
+            model, metadata = loaded
+            self.swap_classifier(model, metadata['version'], metadata)
+            logger.info(f"Loaded ML classifier version {self.model_version}")
+        elif os.path.exists(self.model_path):
             try:
                 with open(self.model_path, 'rb') as f:
                     self.classifier = pickle.load(f)
@@ -41,94 +110,86 @@ class MLClassifier:
                 self._initialize_classifier()
         else:
             self._initialize_classifier()
-            self._train_initial_model()
+            # Needs embeddings, so it waits until the model is used anyway
+            self._needs_initial_training = True
+    
+    def _ensure_trained(self):
+        """Train the initial model if there was no saved one"""
+        if self._needs_initial_training:
+            with self._model_lock:
+                if self._needs_initial_training:
+                    self._train_initial_model()
+                    self._needs_initial_training = False
     
     def _initialize_classifier(self):
         """Initialize the classifier"""
-        self.classifier = LogisticRegression(max_iter=1000, random_state=42)
+        self.classifier = new_incremental_classifier()
         self.is_trained = False
     
-    def _train_initial_model(self):
-        """Train initial model with common examples"""
-        # Training data: (text, label) where 0=UG, 1=PG
-        training_data = [
-            # Undergraduate examples
-            ("Bachelor of Science in Computer Science", 0),
-            ("BSc Information Technology", 0),
-            ("Bachelor of Arts", 0),
-            ("Undergraduate degree in Engineering", 0),
-            ("BA in Business Administration", 0),
-            ("Bachelor's program", 0),
-            ("Undergraduate studies", 0),
-            ("BSc IT", 0),
-            ("BA Economics", 0),
-            ("Bachelor degree", 0),
-            
-            # Postgraduate examples
-            ("Master of Science in Data Science", 1),
-            ("MSc Computer Science", 1),
-            ("Master of Arts", 1),
-            ("Postgraduate degree", 1),
-            ("MA in Literature", 1),
-            ("Master's program", 1),
-            ("Graduate studies", 1),
-            ("MSc Data Science", 1),
-            ("PhD program", 1),
-            ("Doctorate", 1),
-            
-            # Ambiguous cases
-            ("Data Science program", 0),  # Default to UG if ambiguous
-            ("Computer Science course", 0),
-            ("Engineering program", 0),
-        ]
-        
-        texts = [item[0] for item in training_data]
-        labels = [item[1] for item in training_data]
-        
-        # Generate embeddings
-        embeddings = self.embedding_model.encode(texts)
-        
-        # Train classifier
-        self.classifier.fit(embeddings, labels)
+    def swap_classifier(self, classifier, version: Optional[int] = None, metadata: Optional[Dict] = None):
+        """
+        Make a trained classifier active
+        A single reference assignment: a classification already running
+        finishes on the model it started with
+        """
+        self.classifier = classifier
+        self.model_version = version
+        self.model_metadata = metadata
         self.is_trained = True
-        
-        # Save model
-        try:
-            with open(self.model_path, 'wb') as f:
-                pickle.dump(self.classifier, f)
-            logger.info("Initial ML classifier model trained and saved")
-        except Exception as e:
-            logger.warning(f"Failed to save model: {e}")
+        self._needs_initial_training = False
+    
+    def _train_initial_model(self):
+        """Train initial model with the built-in examples (plus any stored feedback)"""
+        self.trainer.train(full=True)
     
     def classify(self, program_title: str, page_content_snippet: Optional[str] = None) -> Tuple[str, float]:
         """
         Classify program as UG or PG
         Returns: (level: 'UG' or 'PG', confidence: float)
         """
+        return self.classify_batch([program_title], [page_content_snippet])[0]
+    
+    def classify_batch(self, program_titles: Sequence[str],
+                       page_content_snippets: Optional[Sequence[Optional[str]]] = None,
+                       embeddings: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """
+        Classify many programs as UG or PG with at most one model pass
+        Titles the rules settle are not embedded. embeddings (one row per
+        title, e.g. from embed_batch) are used as-is instead of encoding
+        title + snippet, so one embedding can serve classification and storage
+        Returns: [(level, confidence)] in input order
+        """
         # First try rule-based
-        rule_result = self._rule_based_classify(program_title)
-        if rule_result[1] > 0.9:  # High confidence rule-based
-            return rule_result
+        results = [self._rule_based_classify(title) for title in program_titles]
         
-        # If ambiguous, use ML
-        if self.is_trained:
-            combined_text = program_title
-            if page_content_snippet:
-                combined_text += " " + page_content_snippet[:500]  # Limit snippet length
-            
-            # Generate embedding
-            embedding = self.embedding_model.encode([combined_text])
-            
-            # Predict
-            prediction = self.classifier.predict(embedding)[0]
-            probabilities = self.classifier.predict_proba(embedding)[0]
-            confidence = float(max(probabilities))
-            
-            level = 'PG' if prediction == 1 else 'UG'
-            return level, confidence
+        # Ambiguous titles go to the ML model
+        pending = [i for i, (_, confidence) in enumerate(results) if confidence <= 0.9]  # High confidence rule-based stays
+        if not pending:
+            return results
+        self._ensure_trained()
+        if not self.is_trained:
+            return results
         
-        # Fallback to rule-based
-        return rule_result
+        if embeddings is None:
+            texts = []
+            for i in pending:
+                combined_text = program_titles[i]
+                snippet = page_content_snippets[i] if page_content_snippets else None
+                if snippet:
+                    combined_text += " " + snippet[:500]  # Limit snippet length
+                texts.append(combined_text)
+            matrix = self.embed_batch(texts)
+        else:
+            matrix = np.asarray(embeddings)[pending]
+        
+        # Predict with one model, even if a new version is swapped in meanwhile
+        classifier = self.classifier
+        probabilities = classifier.predict_proba(matrix)
+        for i, row in zip(pending, probabilities):
+            best = int(np.argmax(row))
+            level = 'PG' if classifier.classes_[best] == 1 else 'UG'
+            results[i] = (level, float(row[best]))
+        return results
     
     def _rule_based_classify(self, text: str) -> Tuple[str, float]:
         """
@@ -137,21 +198,10 @@ class MLClassifier:
         """
         text_lower = text.lower()
         
-        # UG keywords
-        ug_keywords = [
-            'bachelor', 'bsc', 'ba', 'undergraduate', 'b.tech', 'btech',
-            'bachelor\'s', 'bachelors', 'undergrad'
-        ]
-        
-        # PG keywords
-        pg_keywords = [
-            'master', 'msc', 'ma', 'postgraduate', 'm.tech', 'mtech',
-            'master\'s', 'masters', 'phd', 'doctorate', 'doctoral',
-            'graduate', 'mba', 'mphil'
-        ]
-        
-        ug_count = sum(1 for keyword in ug_keywords if keyword in text_lower)
-        pg_count = sum(1 for keyword in pg_keywords if keyword in text_lower)
+        # UG / PG keywords, counted in one pass
+        counts = LEVEL_RULES.counts(text_lower)
+        ug_count = counts['UG']
+        pg_count = counts['PG']
         
         if pg_count > ug_count and pg_count > 0:
             return 'PG', 0.95
@@ -166,33 +216,56 @@ class MLClassifier:
     
     def get_embedding(self, text: str) -> np.ndarray:
         """Get embedding vector for text"""
-        return self.embedding_model.encode([text])[0]
+        return self.embed_batch([text])[0]
+    
+    def embed_batch(self, texts: Sequence[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Embeddings for many texts, one row per text, in batched model passes
+        Repeated texts are encoded once, and texts already in the embedding
+        cache not at all
+        """
+        unique = list(dict.fromkeys(texts))
+        if not unique:
+            return np.empty((0, self.embedding_dimension), dtype=np.float32)
+        
+        if self.embedding_cache is None:
+            vectors = self.embedding_model.encode(unique, batch_size=batch_size, show_progress_bar=False)
+        else:
+            keys = [EmbeddingCache.key(self.cache_model_name, text) for text in unique]
+            cached = self.embedding_cache.get_many(keys)
+            # Texts differing only in whitespace share a key: encode it once
+            first_of = {}
+            for i, key in enumerate(keys):
+                first_of.setdefault(key, i)
+            missing = [i for key, i in first_of.items() if key not in cached]
+            if missing:
+                encoded = self.embedding_model.encode(
+                    [unique[i] for i in missing], batch_size=batch_size, show_progress_bar=False
+                )
+                # Same precision as cached vectors, so results don't depend on cache state
+                encoded = EmbeddingCache.quantize(encoded)
+                self.embedding_cache.put_many(self.cache_model_name, zip([keys[i] for i in missing], encoded))
+                for i, vector in zip(missing, encoded):
+                    cached[keys[i]] = vector
+            vectors = np.stack([cached[key] for key in keys])
+        
+        if len(unique) == len(texts):
+            return vectors
+        row_of = {text: row for row, text in enumerate(unique)}
+        return vectors[[row_of[text] for text in texts]]
     
-    def update_model(self, texts: list, labels: list):
+    def update_model(self, texts: list, labels: list) -> Optional[int]:
         """
         Update model with new training data
         labels: 0 for UG, 1 for PG
+        The examples join the replay store and the model is updated
+        incrementally; returns the new version
         """
         if not texts or not labels:
-            return
+            return None
         
-        # Generate embeddings
-        embeddings = self.embedding_model.encode(texts)
-        
-        # Retrain or update classifier
-        if self.is_trained:
-            # Combine with existing training data if available
-            # For simplicity, retrain on new data
-            self.classifier.fit(embeddings, labels)
-        else:
-            self.classifier.fit(embeddings, labels)
-            self.is_trained = True
-        
-        # Save updated model
-        try:
-            with open(self.model_path, 'wb') as f:
-                pickle.dump(self.classifier, f)
-            logger.info("ML classifier model updated")
-        except Exception as e:
-            logger.warning(f"Failed to save updated model: {e}")
-
+        self._ensure_trained()
+        self.trainer.add_examples(
+            {'text': text, 'label': label, 'source': 'update_model'} for text, label in zip(texts, labels)
+        )
+        return self.trainer.train()
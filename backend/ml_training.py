@@ -0,0 +1,565 @@
+"""
+Incremental training module for the UG/PG classifier
+Replay store of labelled embeddings, versioned model artifacts and a
+background worker that folds user feedback into the running classifier
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import copy
+import json
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+import logging
+
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LABELS = {'UG': 0, 'PG': 1}
+CLASSES = np.array([0, 1])
+
+# Built-in training data: (text, label) where 0=UG, 1=PG
+SEED_EXAMPLES = [
+    # Undergraduate examples
+    ("Bachelor of Science in Computer Science", 0),
+    ("BSc Information Technology", 0),
+    ("Bachelor of Arts", 0),
+    ("Undergraduate degree in Engineering", 0),
+    ("BA in Business Administration", 0),
+    ("Bachelor's program", 0),
+    ("Undergraduate studies", 0),
+    ("BSc IT", 0),
+    ("BA Economics", 0),
+    ("Bachelor degree", 0),
+
+    # Postgraduate examples
+    ("Master of Science in Data Science", 1),
+    ("MSc Computer Science", 1),
+    ("Master of Arts", 1),
+    ("Postgraduate degree", 1),
+    ("MA in Literature", 1),
+    ("Master's program", 1),
+    ("Graduate studies", 1),
+    ("MSc Data Science", 1),
+    ("PhD program", 1),
+    ("Doctorate", 1),
+
+    # Ambiguous cases
+    ("Data Science program", 0),  # Default to UG if ambiguous
+    ("Computer Science course", 0),
+    ("Engineering program", 0),
+]
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def new_incremental_classifier() -> SGDClassifier:
+    """Logistic regression trained by SGD, so it can be updated with partial_fit"""
+    return SGDClassifier(loss='log_loss', alpha=1e-4, max_iter=50, tol=1e-3, random_state=42)
+
+
+class ReplayStore:
+    """
+    Labelled examples in SQLite: text, label and (float16) embedding, per
+    embedding namespace (model and backend, see MLClassifier.cache_model_name)
+    Feedback is stored as soon as it arrives (trained_version NULL) so
+    nothing is lost if the process stops before the next training run. A
+    new label for a program replaces its earlier one. Labels don't depend on
+    the model, so migrate() carries examples over to a new namespace.
+    """
+
+    def __init__(self, db_path: str = None):
+        if db_path is None:
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            db_path = os.path.join(project_root, "ml_training.db")
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS examples (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    model TEXT NOT NULL,
+                    text TEXT,
+                    label INTEGER NOT NULL,
+                    vector BLOB,
+                    source TEXT NOT NULL,
+                    program_id INTEGER,
+                    created_at REAL NOT NULL,
+                    trained_version INTEGER
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_examples_model ON examples (model, trained_version)")
+            self._conn.commit()
+
+    @staticmethod
+    def _blob(vector: Optional[np.ndarray]) -> Optional[bytes]:
+        return None if vector is None else np.asarray(vector, dtype=np.float16).tobytes()
+
+    @staticmethod
+    def _vector(blob: Optional[bytes]) -> Optional[np.ndarray]:
+        return None if blob is None else np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+
+    def add_many(self, model_name: str, examples: Iterable[Dict]) -> List[int]:
+        """
+        Store examples: dicts with label (0/1) and text and/or vector,
+        optional program_id and source
+        """
+        ids = []
+        now = time.time()
+        with self._lock:
+            for example in examples:
+                program_id = example.get('program_id')
+                if program_id is not None:
+                    self._conn.execute(
+                        "DELETE FROM examples WHERE model = ? AND program_id = ?", (model_name, program_id)
+                    )
+                cursor = self._conn.execute(
+                    "INSERT INTO examples (model, text, label, vector, source, program_id, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (model_name, example.get('text'), int(example['label']), self._blob(example.get('vector')),
+                     example.get('source', 'feedback'), program_id, now)
+                )
+                ids.append(cursor.lastrowid)
+            self._conn.commit()
+        return ids
+
+    def has_source(self, model_name: str, source: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM examples WHERE model = ? AND source = ? LIMIT 1", (model_name, source)
+            ).fetchone() is not None
+
+    def pending(self, model_name: str) -> List[Tuple[int, Optional[str], int, Optional[np.ndarray]]]:
+        """(id, text, label, vector or None) of examples not trained on yet, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, text, label, vector FROM examples WHERE model = ? AND trained_version IS NULL ORDER BY id",
+                (model_name,)
+            ).fetchall()
+        return [(row_id, text, label, self._vector(blob)) for row_id, text, label, blob in rows]
+
+    def pending_stats(self, model_name: Optional[str] = None) -> Tuple[int, Optional[float]]:
+        """(number of untrained examples, creation time of the oldest); all namespaces if model_name is None"""
+        query = "SELECT COUNT(*), MIN(created_at) FROM examples WHERE trained_version IS NULL"
+        params = ()
+        if model_name is not None:
+            query += " AND model = ?"
+            params = (model_name,)
+        with self._lock:
+            count, oldest = self._conn.execute(query, params).fetchone()
+        return count, oldest
+
+    def migrate(self, model_name: str, base_model: str) -> int:
+        """
+        Move examples of other namespaces into model_name, as untrained
+        Examples with text are re-embedded (their vector is cleared); those
+        with only a vector move if it comes from the same base model (int8
+        and full-precision vectors of one model are comparable), otherwise
+        they stay behind. Built-in seeds aren't moved, _seed adds them anew.
+        Returns the number of examples moved
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM examples WHERE model != ? AND source = 'seed'", (model_name,))
+            moved = self._conn.execute(
+                "UPDATE examples SET model = ?, vector = NULL, trained_version = NULL "
+                "WHERE model != ? AND text IS NOT NULL AND text != ''",
+                (model_name, model_name)
+            ).rowcount
+            moved += self._conn.execute(
+                "UPDATE examples SET model = ?, trained_version = NULL "
+                "WHERE model != ? AND (text IS NULL OR text = '') AND vector IS NOT NULL "
+                "AND (model = ? OR model LIKE ?)",
+                (model_name, model_name, base_model, base_model + '@%')
+            ).rowcount
+            if moved:
+                # One label per program: the newest wins
+                self._conn.execute(
+                    "DELETE FROM examples WHERE model = ? AND program_id IS NOT NULL AND id NOT IN "
+                    "(SELECT MAX(id) FROM examples WHERE model = ? AND program_id IS NOT NULL GROUP BY program_id)",
+                    (model_name, model_name)
+                )
+            self._conn.commit()
+        return moved
+
+    def set_vectors(self, items: Iterable[Tuple[int, np.ndarray]]):
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE examples SET vector = ? WHERE id = ?",
+                [(self._blob(vector), row_id) for row_id, vector in items]
+            )
+            self._conn.commit()
+
+    def mark_trained(self, ids: Sequence[int], version: int):
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE examples SET trained_version = ? WHERE id = ?", [(version, row_id) for row_id in ids]
+            )
+            self._conn.commit()
+
+    def sample(self, model_name: str, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """About n already-trained examples, drawn at random and split evenly between labels"""
+        vectors, labels = [], []
+        with self._lock:
+            for label in LABELS.values():
+                rows = self._conn.execute(
+                    "SELECT vector FROM examples WHERE model = ? AND label = ? AND vector IS NOT NULL "
+                    "AND trained_version IS NOT NULL ORDER BY RANDOM() LIMIT ?",
+                    (model_name, label, n // 2)
+                ).fetchall()
+                vectors.extend(self._vector(blob) for (blob,) in rows)
+                labels.extend([label] * len(rows))
+        if not vectors:
+            return np.empty((0, 0), dtype=np.float32), np.empty(0, dtype=np.int64)
+        return np.stack(vectors), np.array(labels, dtype=np.int64)
+
+    def all(self, model_name: str) -> Tuple[List[int], np.ndarray, np.ndarray]:
+        """(ids, vectors, labels) of every example with an embedding"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, vector, label FROM examples WHERE model = ? AND vector IS NOT NULL ORDER BY id",
+                (model_name,)
+            ).fetchall()
+        if not rows:
+            return [], np.empty((0, 0), dtype=np.float32), np.empty(0, dtype=np.int64)
+        return ([row_id for row_id, _, _ in rows], np.stack([self._vector(blob) for _, blob, _ in rows]),
+                np.array([label for _, _, label in rows], dtype=np.int64))
+
+    def counts(self, model_name: Optional[str] = None) -> Dict:
+        """Examples by source and label; all namespaces if model_name is None"""
+        query = "SELECT label, source, COUNT(*) FROM examples"
+        params = ()
+        if model_name is not None:
+            query += " WHERE model = ?"
+            params = (model_name,)
+        with self._lock:
+            rows = self._conn.execute(query + " GROUP BY label, source", params).fetchall()
+        names = {value: name for name, value in LABELS.items()}
+        counts = {}
+        for label, source, count in rows:
+            counts.setdefault(source, {})[names.get(label, str(label))] = count
+        return counts
+
+
+class ModelRegistry:
+    """
+    Versioned classifier artifacts: model-v000001.pkl with a .json sidecar
+    of metadata, and current.json naming the active version
+    Files are written to a temporary name and renamed, so readers see
+    either the old or the new version, never a partial one.
+    """
+
+    FILE_RE = re.compile(r'^model-v(\d{6})\.pkl$')
+
+    def __init__(self, directory: str = None, keep_versions: Optional[int] = None):
+        if directory is None:
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            directory = os.path.join(project_root, "ml_models")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.keep_versions = keep_versions or _env_int('GUIS_ML_KEEP_VERSIONS', 10)
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @staticmethod
+    def _name(version: int) -> str:
+        return f"model-v{version:06d}"
+
+    def _write_atomic(self, name: str, data: bytes):
+        tmp_path = self._path(name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(name))
+
+    def versions(self) -> List[int]:
+        return sorted(int(match.group(1)) for match in map(self.FILE_RE.match, os.listdir(self.directory)) if match)
+
+    def current_version(self) -> Optional[int]:
+        try:
+            with open(self._path('current.json')) as f:
+                return json.load(f)['version']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def metadata(self, version: int) -> Dict:
+        try:
+            with open(self._path(self._name(version) + '.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'version': version}
+
+    def save(self, model, metadata: Dict) -> int:
+        """Write a new version and make it current; returns its number"""
+        with self._lock:
+            versions = self.versions()
+            version = (versions[-1] if versions else 0) + 1
+            name = self._name(version)
+            metadata = dict(metadata, version=version, created_at=datetime.utcnow().isoformat())
+            self._write_atomic(name + '.pkl', pickle.dumps(model))
+            self._write_atomic(name + '.json', json.dumps(metadata, indent=2).encode('utf-8'))
+            self._write_atomic('current.json', json.dumps({'version': version}).encode('utf-8'))
+            self._prune(versions + [version], version)
+        return version
+
+    def _prune(self, versions: List[int], current: int):
+        for version in versions[:-self.keep_versions]:
+            if version == current:
+                continue
+            for suffix in ('.pkl', '.json'):
+                try:
+                    os.remove(self._path(self._name(version) + suffix))
+                except OSError:
+                    pass
+
+    def load(self, version: Optional[int] = None) -> Optional[Tuple[object, Dict]]:
+        """(model, metadata) of a version (default: current), or None"""
+        version = version or self.current_version()
+        if version is None:
+            return None
+        try:
+            with open(self._path(self._name(version) + '.pkl'), 'rb') as f:
+                return pickle.load(f), self.metadata(version)
+        except Exception as e:
+            logger.warning(f"Failed to load classifier version {version}: {e}")
+            return None
+
+    def activate(self, version: int):
+        """Make an existing version current (rollback)"""
+        with self._lock:
+            if version not in self.versions():
+                raise ValueError(f"Unknown classifier version {version}")
+            self._write_atomic('current.json', json.dumps({'version': version}).encode('utf-8'))
+
+
+class IncrementalTrainer:
+    """
+    Trains new classifier versions from the replay store and hot-swaps them
+    into the classifier
+    An incremental run copies the active model and runs a few partial_fit
+    epochs over the new examples mixed with a replayed sample of older ones
+    (so earlier knowledge isn't overwritten). A full refit over everything
+    stored runs for the first SGD model, after an embedding model change
+    and every full_refit_every versions.
+    """
+
+    def __init__(self, classifier, replay_store: ReplayStore, registry: ModelRegistry,
+                 replay_ratio: int = 4, epochs: int = 5, full_refit_every: Optional[int] = None):
+        self.classifier = classifier
+        self.replay_store = replay_store
+        self.registry = registry
+        self.replay_ratio = replay_ratio
+        self.epochs = epochs
+        self.full_refit_every = full_refit_every or _env_int('GUIS_ML_FULL_REFIT_EVERY', 20)
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng(42)
+        self.last_trained_at: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def model_name(self) -> str:
+        """Replay namespace; loads the embedding model, which settles the backend"""
+        return self.classifier.cache_model_name
+
+    def add_examples(self, examples: Iterable[Dict]) -> List[int]:
+        """Store labelled examples for the next training run"""
+        return self.replay_store.add_many(self.model_name, examples)
+
+    def pending_stats(self) -> Tuple[int, Optional[float]]:
+        """
+        Untrained examples, without loading the embedding model: before it is
+        loaded every namespace counts (the next run migrates them anyway)
+        """
+        if not self.classifier.model_loaded:
+            return self.replay_store.pending_stats()
+        return self.replay_store.pending_stats(self.model_name)
+
+    def counts(self) -> Dict:
+        """Stored examples by source and label (every namespace until the model is loaded)"""
+        return self.replay_store.counts(self.model_name if self.classifier.model_loaded else None)
+
+    def _seed(self):
+        """Add the built-in examples to the replay store (once per embedding model)"""
+        if self.replay_store.has_source(self.model_name, 'seed'):
+            return
+        texts = [text for text, _ in SEED_EXAMPLES]
+        vectors = self.classifier.embed_batch(texts)
+        self.replay_store.add_many(self.model_name, [
+            {'text': text, 'label': label, 'vector': vector, 'source': 'seed'}
+            for (text, label), vector in zip(SEED_EXAMPLES, vectors)
+        ])
+
+    def _embed_pending(self, pending: List[Tuple[int, Optional[str], int, Optional[np.ndarray]]]):
+        """Embed examples stored with text only"""
+        missing = [(row_id, text) for row_id, text, _, vector in pending if vector is None and text]
+        if not missing:
+            return pending
+        vectors = self.classifier.embed_batch([text for _, text in missing])
+        self.replay_store.set_vectors(zip([row_id for row_id, _ in missing], vectors))
+        embedded = dict(zip([row_id for row_id, _ in missing], vectors))
+        return [(row_id, text, label, vector if vector is not None else embedded.get(row_id))
+                for row_id, text, label, vector in pending]
+
+    def _needs_full_refit(self) -> bool:
+        current = self.classifier.classifier
+        if not isinstance(current, SGDClassifier) or not hasattr(current, 'coef_'):
+            return True
+        metadata = self.classifier.model_metadata or {}
+        if metadata.get('embedding_model') != self.model_name:
+            return True
+        return metadata.get('incremental_runs', 0) + 1 >= self.full_refit_every
+
+    def train(self, full: bool = False) -> Optional[int]:
+        """
+        Train on the pending examples and activate the result
+        Returns the new version, or None if there was nothing to train on
+        """
+        with self._lock:
+            try:
+                return self._train(full)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Classifier training failed: {e}")
+                raise
+
+    def _train(self, full: bool) -> Optional[int]:
+        # Examples stored under another namespace (other backend or model) join this one
+        moved = self.replay_store.migrate(self.model_name, self.classifier.model_name)
+        if moved:
+            logger.info(f"Moved {moved} training examples to {self.model_name}")
+            full = True
+        self._seed()
+        pending = self._embed_pending(self.replay_store.pending(self.model_name))
+        pending = [(row_id, label, vector) for row_id, _, label, vector in pending if vector is not None]
+        full = full or self._needs_full_refit()
+        if not pending and not full:
+            return None
+
+        metadata = self.classifier.model_metadata or {}
+        if full:
+            ids, X, y = self.replay_store.all(self.model_name)
+            model = new_incremental_classifier()
+            model.fit(X, y)
+            metadata = {'kind': 'full', 'incremental_runs': 0, 'examples': len(ids)}
+            trained_ids = ids
+        else:
+            trained_ids = [row_id for row_id, _, _ in pending]
+            X_new = np.stack([vector for _, _, vector in pending])
+            y_new = np.array([label for _, label, _ in pending], dtype=np.int64)
+            X_replay, y_replay = self.replay_store.sample(self.model_name, max(64, self.replay_ratio * len(pending)))
+            X = np.concatenate([X_new, X_replay]) if len(y_replay) else X_new
+            y = np.concatenate([y_new, y_replay]) if len(y_replay) else y_new
+            # Training happens on a copy; predictions keep using the active model
+            model = copy.deepcopy(self.classifier.classifier)
+            for _ in range(self.epochs):
+                order = self._rng.permutation(len(y))
+                model.partial_fit(X[order], y[order], classes=CLASSES)
+            metadata = {
+                'kind': 'incremental',
+                'incremental_runs': metadata.get('incremental_runs', 0) + 1,
+                'examples': len(pending),
+                'replayed': len(y_replay),
+                'parent_version': self.classifier.model_version,
+            }
+
+        metadata['embedding_model'] = self.model_name
+        version = self.registry.save(model, metadata)
+        self.classifier.swap_classifier(model, version, self.registry.metadata(version))
+        self.replay_store.mark_trained(trained_ids, version)
+        self.last_trained_at = datetime.utcnow().isoformat()
+        self.last_error = None
+        logger.info(f"Classifier version {version} active ({metadata['kind']}, {metadata['examples']} examples)")
+        return version
+
+
+class RetrainWorker:
+    """
+    Background thread that trains once enough feedback is pending
+    Training runs when batch_size examples are waiting, or when the oldest
+    has waited max_delay seconds (GUIS_ML_RETRAIN_BATCH, GUIS_ML_RETRAIN_DELAY)
+    """
+
+    def __init__(self, trainer: IncrementalTrainer, batch_size: Optional[int] = None,
+                 max_delay: Optional[float] = None, poll_interval: float = 5.0):
+        self.trainer = trainer
+        self.batch_size = batch_size or _env_int('GUIS_ML_RETRAIN_BATCH', 32)
+        self.max_delay = max_delay if max_delay is not None else _env_int('GUIS_ML_RETRAIN_DELAY', 60)
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._force = False
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="ml-retrain", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, examples: Iterable[Dict]) -> List[int]:
+        """Store feedback and wake the worker if a batch is ready"""
+        ids = self.trainer.add_examples(examples)
+        self.start()
+        if self.trainer.pending_stats()[0] >= self.batch_size:
+            self._wake.set()
+        return ids
+
+    def retrain_now(self):
+        """Train on whatever is pending without waiting for a full batch"""
+        self._force = True
+        self.start()
+        self._wake.set()
+
+    def _due(self) -> bool:
+        count, oldest = self.trainer.pending_stats()
+        if not count:
+            return False
+        return count >= self.batch_size or time.time() - oldest >= self.max_delay
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                force, self._force = self._force, False
+                if force or self._due():
+                    # Initial training takes the classifier's model lock first
+                    self.trainer.classifier._ensure_trained()
+                    self.trainer.train()
+            except Exception as e:
+                logger.warning(f"Background retraining failed: {e}")
+
+    def status(self) -> Dict:
+        count, oldest = self.trainer.pending_stats()
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'pending': count,
+            'oldest_pending_age': round(time.time() - oldest, 1) if oldest else None,
+            'batch_size': self.batch_size,
+            'max_delay': self.max_delay,
+            'last_trained_at': self.trainer.last_trained_at,
+            'last_error': self.trainer.last_error,
+        }
@@ -0,0 +1,179 @@
+"""
+Shared page fetching module
+Downloads a program page once and shares the parsed result across analyzers
+"""
+from bs4 import BeautifulSoup, NavigableString, Tag
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+import threading
+import logging
+
+from html_parsing import parse_html
+from content_extractor import extract_main_content
+from simhash import compute_simhash
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tags whose text never counts as page content
+NON_CONTENT_TAGS = frozenset(['script', 'style', 'noscript', 'template'])
+
+
+def visible_text(element: Tag, skip_tags: Iterable[str] = NON_CONTENT_TAGS) -> str:
+    """
+    Collect the text of an element, skipping the given tags
+    Unlike decompose(), this leaves the (shared) tree untouched
+    """
+    skip = frozenset(skip_tags)
+    parts = []
+    stack = [element]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Tag):
+            if node.name in skip and node is not element:
+                continue
+            stack.extend(reversed(node.contents))
+        elif type(node) is NavigableString:
+            # Comments, CDATA, doctype etc. are NavigableString subclasses
+            parts.append(str(node))
+    return ''.join(parts)
+
+
+class FetchedPage:
+    """A downloaded page: raw bytes, headers, parsed tree and text, each computed once"""
+
+    def __init__(self, url: str, status_code: int, content: bytes, headers=None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content or b''
+        self.headers = headers if headers is not None else {}
+        self._soup = None
+        self._text = None
+        self._text_lower = None
+        self._clean_text = None
+        self._main_text = None
+        self._lang = None
+        self._simhash = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_response(cls, response) -> 'FetchedPage':
+        """Build a page from a requests.Response"""
+        return cls(response.url or '', response.status_code, response.content, response.headers)
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code == 200
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        """Parsed tree (parsed on first access)"""
+        if self._soup is None:
+            with self._lock:
+                if self._soup is None:
+                    self._soup = parse_html(self.content)
+        return self._soup
+
+    @property
+    def text(self) -> str:
+        """Full page text, as soup.get_text() would return it"""
+        if self._text is None:
+            self._text = self.soup.get_text()
+        return self._text
+
+    @property
+    def text_lower(self) -> str:
+        """Lowercased page text for keyword matching"""
+        if self._text_lower is None:
+            self._text_lower = self.text.lower()
+        return self._text_lower
+
+    @property
+    def clean_text(self) -> str:
+        """Visible text without scripts, styles and comments, whitespace normalized"""
+        if self._clean_text is None:
+            self._clean_text = ' '.join(visible_text(self.soup).split())
+        return self._clean_text
+
+    @property
+    def main_text(self) -> str:
+        """
+        Main content without navigation, headers, footers and sidebars,
+        whitespace normalized (extracted once; falls back to clean_text)
+        """
+        if self._main_text is None:
+            with self._lock:
+                if self._main_text is None:
+                    try:
+                        extracted = extract_main_content(self.content)
+                        self._lang = extracted['lang']
+                        main_text = extracted['text']
+                    except Exception as e:
+                        logger.debug(f"Main content extraction failed for {self.url}: {e}")
+                        main_text = None
+                    self._main_text = main_text if main_text is not None else ''
+            if not self._main_text:
+                self._main_text = self.clean_text
+        return self._main_text
+
+    @property
+    def lang(self) -> Optional[str]:
+        """Language declared on the <html> element, if any"""
+        self.main_text  # read during extraction
+        return self._lang
+
+    @property
+    def simhash(self) -> Optional[str]:
+        """SimHash fingerprint of the main text (None for near-empty pages)"""
+        if self._simhash is None:
+            self._simhash = compute_simhash(self.main_text) or ''
+        return self._simhash or None
+
+
+class PageCache:
+    """Bounded, thread-safe LRU cache of fetched pages for a single job"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url: str) -> Optional[FetchedPage]:
+        """Return cached page (None if missing or the fetch failed)"""
+        with self._lock:
+            if url in self._pages:
+                self._pages.move_to_end(url)
+                self.hits += 1
+                return self._pages[url]
+            self.misses += 1
+            return None
+
+    def put(self, url: str, page: Optional[FetchedPage]):
+        """Store a page; None records a failed fetch so it is not retried"""
+        with self._lock:
+            self._pages[url] = page
+            self._pages.move_to_end(url)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+
+    def get_or_fetch(self, url: str, fetch_func: Callable[[str], Optional[FetchedPage]]) -> Optional[FetchedPage]:
+        """Return the cached page for url, fetching it on a miss"""
+        with self._lock:
+            if url in self._pages:
+                self._pages.move_to_end(url)
+                self.hits += 1
+                return self._pages[url]
+            self.misses += 1
+        page = fetch_func(url)
+        self.put(url, page)
+        return page
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return url in self._pages
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pages)
@@ -0,0 +1,280 @@
+"""
+Program search pipeline
+Searches university websites for a course and analyzes every program link,
+processing several universities at once on a bounded pool of worker threads
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import os
+import re
+import threading
+import logging
+
+import numpy as np
+
+from scraper import CourseScraper
+from language_detector import LanguageDetector
+from metadata_checker import MetadataChecker
+from page_fetcher import PageCache
+from url_utils import url_key, url_variants
+from simhash import SimHashIndex
+from keyword_matcher import LEVEL_RULES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# How long a failed homepage discovery is remembered before trying again
+WEBSITE_RETRY_AFTER = timedelta(days=30)
+
+
+def known_website_miss(status: Optional[str], checked_at: Optional[datetime]) -> bool:
+    """True if homepage discovery failed within WEBSITE_RETRY_AFTER (no point retrying yet)"""
+    return status == 'unresolved' and checked_at is not None and datetime.utcnow() - checked_at < WEBSITE_RETRY_AFTER
+
+
+# Whole-word study level terms (substring matching would find 'ma' everywhere)
+_LEVEL_WORD_RES = {
+    level: re.compile(r"\b(?:%s)\b" % '|'.join(re.escape(word) for word in words))
+    for level, words in LEVEL_RULES.groups.items()
+}
+
+
+def level_hint(text: Optional[str]) -> Optional[str]:
+    """UG or PG if a text uses level terms of one kind more often, else None"""
+    text = (text or '').lower()
+    counts = {level: len(pattern.findall(text)) for level, pattern in _LEVEL_WORD_RES.items()}
+    if counts['UG'] == counts['PG']:
+        return None
+    return 'UG' if counts['UG'] > counts['PG'] else 'PG'
+
+
+def _normalized_title(title: Optional[str]) -> str:
+    return ' '.join(re.findall(r'\w+', (title or '').lower()))
+
+
+class ProgramPageIndex:
+    """
+    Near-duplicate check for program pages
+    Close fingerprints alone don't make two pages one program: UG and PG
+    pages of one template differ in a few words. A page is a duplicate only
+    if it is a URL variant of the match, or has the same title without a
+    conflicting study level.
+    """
+
+    def __init__(self):
+        self._simhashes = SimHashIndex()
+        self._pages: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+
+    def add(self, url: str, fingerprint: Optional[str], title: Optional[str] = None,
+            level: Optional[str] = None):
+        self._pages[url] = (_normalized_title(title) or None, level)
+        self._simhashes.add(url, fingerprint)
+
+    def find_duplicate(self, url: str, fingerprint: Optional[str], title: Optional[str] = None,
+                       level: Optional[str] = None) -> Optional[str]:
+        """URL of the known page this one duplicates, or None"""
+        title = _normalized_title(title) or None
+
+        def same_program(other_url: str) -> bool:
+            if url_variants(url, other_url):
+                return True
+            other_title, other_level = self._pages[other_url]
+            if level and other_level and level != other_level:
+                return False
+            return title is not None and title == other_title
+
+        return self._simhashes.find_duplicate(fingerprint, accept=same_program)
+
+    def __len__(self) -> int:
+        return len(self._simhashes)
+
+
+def default_worker_count() -> int:
+    """Worker threads per search (GUIS_SEARCH_WORKERS, default 4)"""
+    try:
+        return max(1, int(os.getenv('GUIS_SEARCH_WORKERS', 4)))
+    except ValueError:
+        return 4
+
+
+class ProgramSearch:
+    """
+    Runs the per-university search and analysis
+    Network-bound work happens in worker threads, each with its own scraper and
+    analyzer instances (requests sessions are not shared across threads). The
+    ML classifier is shared behind a lock. Workers never touch the database:
+    they return plain records and the caller persists them.
+    """
+
+    def __init__(self, ml_classifier, workers: Optional[int] = None):
+        self.ml_classifier = ml_classifier
+        self.workers = workers or default_worker_count()
+        self._local = threading.local()
+        self._ml_lock = threading.Lock()
+
+    def _components(self) -> Tuple[CourseScraper, LanguageDetector, MetadataChecker]:
+        """Per-thread component instances"""
+        if not hasattr(self._local, 'course_scraper'):
+            self._local.course_scraper = CourseScraper()
+            self._local.language_detector = LanguageDetector()
+            self._local.metadata_checker = MetadataChecker()
+        return self._local.course_scraper, self._local.language_detector, self._local.metadata_checker
+
+    def resolve_website(self, university: Dict) -> Optional[str]:
+        """
+        Homepage for a university, using the stored result when there is one
+        A fresh discovery (hit or miss) is recorded in university['website_update']
+        for the caller to persist
+        """
+        if university.get('website_url'):
+            return university['website_url']
+
+        if known_website_miss(university.get('website_status'), university.get('website_checked_at')):
+            return None  # Known miss, don't pay the discovery cost again
+
+        course_scraper = self._components()[0]
+        website_url = course_scraper.resolve_university_url(university['name'])
+        university['website_update'] = {
+            'website_url': website_url,
+            'website_status': 'resolved' if website_url else 'unresolved',
+            'website_checked_at': datetime.utcnow()
+        }
+        return website_url
+
+    def process_university(self, university: Dict, course: str, existing_urls: Set[str]) -> List[Dict]:
+        """
+        Search one university and analyze its new program links
+        university: dict with id, name, the stored website fields and
+        simhashes ((url, fingerprint, level) of its stored programs)
+        existing_urls: url_key() of every stored program
+        Returns records with 'program' (Program columns), 'embedding' (vector) and
+        'result' (API dict)
+        """
+        course_scraper, language_detector, metadata_checker = self._components()
+        # One fetch and one parse per URL while this university is processed
+        page_cache = PageCache()
+
+        base_url = self.resolve_website(university)
+        if not base_url:
+            logger.warning(f"Could not determine URL for {university['name']}")
+            return []
+
+        course_links = course_scraper.search_courses(
+            university['name'],
+            course,
+            base_url=base_url,
+            page_cache=page_cache
+        )
+
+        # Fingerprints of this university's stored and newly found programs
+        near_duplicates = ProgramPageIndex()
+        for stored_url, fingerprint, stored_level in university.get('simhashes', ()):
+            near_duplicates.add(stored_url, fingerprint, level=stored_level)
+
+        analyzed = []
+        for link_info in course_links:
+            url = link_info['url']
+
+            # Skip programs that are already stored (under any URL variant)
+            if url_key(url) in existing_urls:
+                continue
+
+            # Shared page, already fetched during validation
+            page = course_scraper.fetch_page(url, page_cache)
+
+            # Mirrors and near-identical copies of a known program page are collapsed
+            title = link_info.get('title', course)
+            fingerprint = page.simhash if page else None
+            level = level_hint(f"{title} {page.main_text}") if page else level_hint(title)
+            duplicate = near_duplicates.find_duplicate(url, fingerprint, title, level)
+            if duplicate is not None:
+                logger.debug(f"Skipping {url}: near-duplicate of {duplicate}")
+                continue
+            near_duplicates.add(url, fingerprint, title, level)
+
+            # Detect language
+            is_english, confidence = language_detector.detect_english(url, page=page)
+
+            # Get metadata
+            metadata = metadata_checker.check_metadata(url, page=page)
+
+            analyzed.append((url, title, is_english, metadata))
+
+        if not analyzed:
+            return []
+
+        # All links of the university in one batched model pass; each
+        # embedding is both stored and used to classify ambiguous titles
+        titles = [title for _, title, _, _ in analyzed]
+        with self._ml_lock:
+            embeddings = self.ml_classifier.embed_batch([f"{title} {course}" for title in titles])
+            classifications = self.ml_classifier.classify_batch(titles, embeddings=embeddings)
+
+        records = []
+        for (url, title, is_english, metadata), embedding, (level, ml_confidence) in zip(
+            analyzed, embeddings, classifications
+        ):
+            records.append({
+                "program": {
+                    "university_id": university['id'],
+                    "course_name": course,
+                    "program_url": url,
+                    "level": level,
+                    "taught_in_english": is_english,
+                    "visited": False,
+                    "content_hash": metadata.get('content_hash'),
+                    "simhash": metadata.get('simhash'),
+                    "last_checked": metadata.get('last_checked'),
+                    "last_modified_header": metadata.get('last_modified_header'),
+                    "etag": metadata.get('etag'),
+                    "confidence_score": str(ml_confidence),
+                    # Legacy column, still written until the embedding store has proven itself
+                    "embedding_vector": np.asarray(embedding, dtype=np.float32).tobytes()
+                },
+                "embedding": embedding,
+                "result": {
+                    "university": university['name'],
+                    "url": url,
+                    "level": level,
+                    "taught_in_english": is_english,
+                    "confidence": ml_confidence
+                }
+            })
+
+        return records
+
+    def iter_universities(self, universities: List[Dict], course: str, existing_urls: Set[str],
+                          workers: Optional[int] = None, ordered: bool = True) -> Iterator[Tuple[Dict, List[Dict]]]:
+        """
+        Process universities, yielding (university, records)
+        In input order by default; ordered=False yields each university as
+        soon as it finishes. Errors for one university are logged and yield
+        no records
+        """
+        workers = workers or self.workers
+
+        def _run(university: Dict) -> List[Dict]:
+            try:
+                return self.process_university(university, course, existing_urls)
+            except Exception as e:
+                logger.warning(f"Error processing {university.get('original_name', university['name'])}: {e}")
+                return []
+
+        if workers <= 1 or len(universities) <= 1:
+            for university in universities:
+                yield university, _run(university)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='search')
+        try:
+            if ordered:
+                yield from zip(universities, executor.map(_run, universities))
+            else:
+                futures = {executor.submit(_run, university): university for university in universities}
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+        finally:
+            # If the consumer stops early, drop universities not started yet
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,186 @@
+"""
+Per-host request scheduler
+Token bucket rate limiting per host with Retry-After and Crawl-delay support
+"""
+import requests
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import threading
+import time
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket; reservations may go negative so waiters queue up fairly"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """Take one token and return how long the caller must wait for it"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class _HostState:
+    """Bookkeeping for a single host"""
+
+    def __init__(self, rate: float, burst: float):
+        self.bucket = TokenBucket(rate, burst)
+        self.blocked_until = 0.0
+        self.crawl_delay = None
+        self.queued = 0
+        self.requests = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class RequestScheduler:
+    """
+    Shared politeness scheduler for all fetchers
+    Only the thread talking to a throttled host waits; other hosts keep going.
+    """
+
+    def __init__(self, rate_per_host: float = 4.0, burst: int = 4, max_retry_after: float = 120.0):
+        self.rate_per_host = rate_per_host
+        self.burst = burst
+        self.max_retry_after = max_retry_after
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _host_of(url: str) -> str:
+        return urlparse(url).netloc.lower() or url.lower()
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = _HostState(self.rate_per_host, self.burst)
+            self._hosts[host] = state
+        return state
+
+    def acquire(self, url: str) -> float:
+        """Wait for this host's turn; returns the time spent waiting"""
+        host = self._host_of(url)
+        with self._lock:
+            state = self._state(host)
+            now = time.monotonic()
+            wait = max(state.bucket.reserve(now), state.blocked_until - now, 0.0)
+            state.queued += 1
+        try:
+            if wait > 0:
+                time.sleep(wait)
+        finally:
+            with self._lock:
+                state.queued -= 1
+                state.requests += 1
+                state.total_wait += wait
+                state.max_wait = max(state.max_wait, wait)
+        return wait
+
+    def defer(self, url: str, delay: float):
+        """Block a host for delay seconds (e.g. after a 429)"""
+        host = self._host_of(url)
+        with self._lock:
+            state = self._state(host)
+            state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+
+    def set_crawl_delay(self, url: str, delay: Optional[float]):
+        """Apply a robots.txt Crawl-delay: at most one request per delay seconds"""
+        if not delay or delay <= 0:
+            return
+        host = self._host_of(url)
+        with self._lock:
+            state = self._state(host)
+            state.crawl_delay = delay
+            state.bucket.rate = min(self.rate_per_host, 1.0 / delay)
+            state.bucket.capacity = 1
+            state.bucket.tokens = min(state.bucket.tokens, 1)
+
+    def request(self, session: requests.Session, url: str, timeout: int = 10,
+                retry_count: int = 3, **kwargs) -> Optional[requests.Response]:
+        """
+        GET url politely with retry logic
+        Returns the response on HTTP 200, otherwise None
+        """
+        # Responses served from a local cache don't count against the host
+        adapter = session.get_adapter(url)
+        from_cache = getattr(adapter, 'has_fresh', None)
+        for attempt in range(retry_count):
+            if not (from_cache and from_cache(url)):
+                self.acquire(url)
+            try:
+                response = session.get(url, timeout=timeout, **kwargs)
+                if response.status_code == 200:
+                    return response
+                elif response.status_code in (429, 503):  # Rate limited / overloaded
+                    delay = parse_retry_after(response.headers.get('Retry-After'))
+                    if delay is None:
+                        delay = 2 ** attempt  # Exponential backoff
+                    elif delay > self.max_retry_after:
+                        logger.warning(f"{self._host_of(url)} asked to wait {delay:.0f}s, giving up on {url}")
+                        self.defer(url, delay)
+                        return None
+                    with self._lock:
+                        self._state(self._host_of(url)).throttled += 1
+                    self.defer(url, delay)
+                else:
+                    return None
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Request attempt {attempt + 1} failed: {e}")
+                if attempt < retry_count - 1:
+                    self.defer(url, 2 ** attempt)
+        return None
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-host queue depth, wait times and throttling state"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                host: {
+                    'queued': state.queued,
+                    'requests': state.requests,
+                    'throttled': state.throttled,
+                    'total_wait': round(state.total_wait, 3),
+                    'avg_wait': round(state.total_wait / state.requests, 3) if state.requests else 0.0,
+                    'max_wait': round(state.max_wait, 3),
+                    'blocked_for': round(max(0.0, state.blocked_until - now), 3),
+                    'crawl_delay': state.crawl_delay,
+                }
+                for host, state in self._hosts.items()
+            }
+
+
+# Shared by every fetcher in the process
+default_scheduler = RequestScheduler()
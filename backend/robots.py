@@ -0,0 +1,170 @@
+"""
+robots.txt module
+Per-host cache of robots.txt rules, Crawl-delay and declared sitemaps, plus
+a memory of paths a host answered 404/410 for, so they are not probed again
+"""
+import requests
+from typing import Dict, List, Optional, Set
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+import os
+import threading
+import time
+import logging
+
+from request_scheduler import RequestScheduler, default_scheduler
+from http_cache import install_cache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Statuses that mean "this path does not exist", remembered per host
+MISSING_STATUSES = (404, 410)
+# Remembered missing paths per host
+MAX_MISSING_PATHS = 1000
+
+
+def robots_enabled() -> bool:
+    """robots.txt is honoured unless GUIS_RESPECT_ROBOTS is 0/false/no"""
+    return os.getenv('GUIS_RESPECT_ROBOTS', '1').strip().lower() not in ('0', 'false', 'no')
+
+
+class RobotsRules:
+    """Parsed robots.txt of one host"""
+
+    def __init__(self, parser: RobotFileParser, user_agent: str, expires_at: float):
+        self.parser = parser
+        self.user_agent = user_agent
+        self.expires_at = expires_at
+        self.sitemaps: List[str] = list(parser.site_maps() or [])
+        delay = parser.crawl_delay(user_agent)
+        self.crawl_delay: Optional[float] = float(delay) if delay else None
+        self.missing_paths: Set[str] = set()
+
+    def allows(self, url: str) -> bool:
+        return self.parser.can_fetch(self.user_agent, url)
+
+
+class RobotsCache:
+    """
+    robots.txt rules per host, fetched on first use and kept for ttl seconds
+    Follows RFC 9309: a 4xx robots.txt allows everything, a 5xx or unreachable
+    one disallows everything (re-checked after error_ttl). Crawl-delay is
+    applied to the request scheduler as soon as the rules are read.
+    With enabled=False rules are still read (for their sitemaps) but neither
+    Disallow nor Crawl-delay is applied.
+    """
+
+    def __init__(self, timeout: int = 10, scheduler: Optional[RequestScheduler] = None,
+                 ttl: float = 86400, error_ttl: float = 600, user_agent: str = '*',
+                 enabled: Optional[bool] = None):
+        self.timeout = timeout
+        self.scheduler = scheduler or default_scheduler
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.user_agent = user_agent
+        self.enabled = robots_enabled() if enabled is None else enabled
+        self._rules: Dict[str, RobotsRules] = {}
+        self._host_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        # requests sessions are not shared across threads
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        if not hasattr(self._local, 'session'):
+            session = requests.Session()
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            })
+            install_cache(session)
+            self._local.session = session
+        return self._local.session
+
+    @staticmethod
+    def _origin(url: str) -> Optional[str]:
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.netloc:
+            return None
+        return f"{parts.scheme}://{parts.netloc.lower()}"
+
+    def rules_for(self, url: str) -> Optional[RobotsRules]:
+        """Rules of the host serving url (fetched if missing or expired)"""
+        origin = self._origin(url)
+        if origin is None:
+            return None
+        rules = self._rules.get(origin)
+        if rules is not None and rules.expires_at > time.monotonic():
+            return rules
+
+        with self._lock:
+            host_lock = self._host_locks.setdefault(origin, threading.Lock())
+        # One fetch per host; other threads asking for the same host wait for it
+        with host_lock:
+            rules = self._rules.get(origin)
+            if rules is None or rules.expires_at <= time.monotonic():
+                rules = self._fetch(origin)
+                self._rules[origin] = rules
+                if rules.crawl_delay and self.enabled:
+                    self.scheduler.set_crawl_delay(origin, rules.crawl_delay)
+        return rules
+
+    def _fetch(self, origin: str) -> RobotsRules:
+        robots_url = f"{origin}/robots.txt"
+        parser = RobotFileParser(robots_url)
+        ttl = self.ttl
+        try:
+            self.scheduler.acquire(robots_url)
+            response = self._session().get(robots_url, timeout=self.timeout)
+            if response.status_code == 200:
+                parser.parse(response.text.splitlines())
+            elif 400 <= response.status_code < 500:
+                parser.allow_all = True
+            else:
+                parser.disallow_all = True
+                ttl = self.error_ttl
+        except requests.exceptions.RequestException as e:
+            logger.debug(f"robots.txt fetch failed for {origin}: {e}")
+            parser.disallow_all = True
+            ttl = self.error_ttl
+        # can_fetch() refuses everything until the parser is marked as read
+        parser.modified()
+        return RobotsRules(parser, self.user_agent, time.monotonic() + ttl)
+
+    def allowed(self, url: str) -> bool:
+        """True if robots.txt allows fetching url and it is not known to be missing"""
+        rules = self.rules_for(url)
+        if rules is None:
+            return True
+        if urlsplit(url).path in rules.missing_paths:
+            return False
+        return rules.allows(url) or not self.enabled
+
+    def sitemaps(self, url: str) -> List[str]:
+        """Sitemap URLs declared in the host's robots.txt"""
+        rules = self.rules_for(url)
+        return list(rules.sitemaps) if rules else []
+
+    def crawl_delay(self, url: str) -> Optional[float]:
+        rules = self.rules_for(url)
+        return rules.crawl_delay if rules else None
+
+    def is_missing(self, url: str) -> bool:
+        """True if the host recently answered 404/410 for this path"""
+        rules = self._rules.get(self._origin(url) or '')
+        return rules is not None and urlsplit(url).path in rules.missing_paths
+
+    def record_response(self, response: requests.Response, *args, **kwargs):
+        """
+        requests response hook: remember paths that don't exist
+        Usage: session.get(url, hooks={'response': robots_cache.record_response})
+        """
+        if response.status_code not in MISSING_STATUSES:
+            return
+        url = response.request.url if response.request is not None else response.url
+        rules = self._rules.get(self._origin(url or '') or '')
+        if rules is not None and len(rules.missing_paths) < MAX_MISSING_PATHS:
+            rules.missing_paths.add(urlsplit(url).path)
+
+
+# Shared by every scraper in the process
+default_robots_cache = RobotsCache()
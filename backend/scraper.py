@@ -3,27 +3,71 @@ University and course scraper module
 Fetches universities by country and searches for course programs
 """
 import requests
-from bs4 import BeautifulSoup
-from typing import List, Dict, Optional
-import time
+from typing import List, Dict, Optional, Tuple
 import re
-from urllib.parse import urljoin, urlparse
+import socket
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urldefrag, urljoin, urlparse
 import logging
 
+from page_fetcher import FetchedPage, PageCache
+from html_parsing import parse_html, extract_links, INFOBOX_ONLY, SEARCH_RESULTS_ONLY
+from async_crawler import AsyncFetcher
+from request_scheduler import RequestScheduler, default_scheduler
+from http_cache import HTTPCache, get_shared_cache, install_cache
+from sitemap import SitemapReader
+from robots import RobotsCache, default_robots_cache
+from url_utils import LinkSet, url_key
+from keyword_matcher import KeywordMatcher, ACADEMIC_STRUCTURE_RULES, LINK_RULES
+from wikipedia_source import default_wikipedia_source, extract_universities_from_html
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Guessed seeds for the best-first crawler, used only when the homepage
+# has no link worth following
+COMMON_PROGRAM_PATHS = [
+    '/programs', '/programmes', '/program',
+    '/courses', '/course',
+    '/study', '/studies', '/studying',
+    '/academics', '/academic',
+    '/departments', '/department',
+    '/faculties', '/faculty',
+    '/degrees', '/degree',
+    '/undergraduate', '/graduate',
+    '/bachelor', '/master',
+]
+# Crawl priority of a guessed path (below any scored link)
+GUESSED_PATH_PRIORITY = 0.1
+
+# Links to files that are never HTML pages
+SKIPPED_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.zip', '.doc',
+                      '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.mp4', '.mp3', '.ics')
+
 
 class UniversityScraper:
     """Scrapes universities from various sources"""
     
-    def __init__(self, timeout: int = 10, retry_count: int = 3):
+    def __init__(self, timeout: int = 10, retry_count: int = 3,
+                 scheduler: Optional[RequestScheduler] = None,
+                 http_cache: Optional[HTTPCache] = None,
+                 wikipedia_source=None):
         self.timeout = timeout
         self.retry_count = retry_count
+        self.scheduler = scheduler or default_scheduler
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        # Persistent on-disk HTTP cache shared by all sessions
+        self.http_cache = install_cache(self.session, http_cache)
+        # MediaWiki API or local dump; the HTML scraper below is the fallback
+        self.wikipedia_source = wikipedia_source or default_wikipedia_source(
+            self.session, timeout=timeout, retry_count=retry_count, scheduler=self.scheduler
+        )
     
     def fetch_universities(self, country: str) -> List[str]:
         """
@@ -45,7 +89,17 @@ class UniversityScraper:
         return list(set(cleaned))  # Remove duplicates
     
     def _fetch_from_wikipedia(self, country: str) -> List[str]:
-        """Fetch universities from Wikipedia - IMPROVED with better error handling"""
+        """Fetch universities from Wikipedia: API or dump first, rendered HTML as fallback"""
+        try:
+            universities = self.wikipedia_source.fetch_universities(country)
+            if universities:
+                return universities
+        except Exception as e:
+            logger.warning(f"Wikipedia source failed for {country}: {e}")
+        return self._fetch_from_wikipedia_html(country)
+
+    def _fetch_from_wikipedia_html(self, country: str) -> List[str]:
+        """Fetch universities from rendered Wikipedia pages - IMPROVED with better error handling"""
         universities = set()
         try:
             # Wikipedia list format: "List of universities in [Country]"
@@ -68,64 +122,8 @@ class UniversityScraper:
                     response = self._make_request(url)
                     if response and response.status_code == 200:
                         logger.info(f"Successfully fetched: {url}")
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        
-                        # Method 1: Find ALL tables (not just wikitable class)
-                        all_tables = soup.find_all('table')
-                        for table in all_tables:
-                            rows = table.find_all('tr')
-                            for row in rows[1:]:  # Skip header
-                                cells = row.find_all(['td', 'th'])
-                                for cell in cells[:3]:  # Check first 3 cells
-                                    # Look for links
-                                    links = cell.find_all('a')
-                                    for link in links:
-                                        name = link.get_text(strip=True)
-                                        href = link.get('href', '')
-                                        # Filter for university-related links
-                                        if name and len(name) > 3:
-                                            name_lower = name.lower()
-                                            if any(keyword in name_lower for keyword in ['university', 'college', 'institute', 'academy', 'school']):
-                                                universities.add(name)
-                                            # Also check if href suggests it's a university page
-                                            elif '/wiki/' in href and any(keyword in href.lower() for keyword in ['university', 'college', 'institute']):
-                                                universities.add(name)
-                        
-                        # Method 2: Check ALL lists more thoroughly
-                        all_lists = soup.find_all(['ul', 'ol'])
-                        for ul in all_lists:
-                            items = ul.find_all('li')
-                            for item in items:
-                                # Get all links in the item
-                                links = item.find_all('a')
-                                for link in links:
-                                    name = link.get_text(strip=True)
-                                    href = link.get('href', '')
-                                    if name and len(name) > 3:
-                                        name_lower = name.lower()
-                                        # More lenient matching
-                                        if any(keyword in name_lower for keyword in ['university', 'college', 'institute', 'academy', 'school', 'universität', 'université', 'universidad']):
-                                            universities.add(name)
-                                        elif '/wiki/' in href:
-                                            # Check if it's likely a university page
-                                            href_lower = href.lower()
-                                            if any(keyword in href_lower for keyword in ['university', 'college', 'institute', 'academy']):
-                                                universities.add(name)
-                        
-                        # Method 3: Look for divs with university lists
-                        content_divs = soup.find_all('div', class_=['mw-parser-output', 'mw-content-ltr'])
-                        for div in content_divs:
-                            # Find all links that might be universities
-                            links = div.find_all('a', href=True)
-                            for link in links:
-                                name = link.get_text(strip=True)
-                                href = link.get('href', '')
-                                if name and len(name) > 5 and '/wiki/' in href:
-                                    name_lower = name.lower()
-                                    href_lower = href.lower()
-                                    # Check if it's a university-related page
-                                    if any(keyword in name_lower or keyword in href_lower for keyword in ['university', 'college', 'institute', 'academy']):
-                                        universities.add(name)
+                        # One pass over the page classifies every link once
+                        universities.update(extract_universities_from_html(response.content))
                         
                         if universities:
                             logger.info(f"Found {len(universities)} universities from {term}")
@@ -155,7 +153,7 @@ class UniversityScraper:
             search_url = f"https://en.wikipedia.org/wiki/Special:Search/{country}_university"
             response = self._make_request(search_url)
             if response and response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
+                soup = parse_html(response.content, only=SEARCH_RESULTS_ONLY)
                 # Find search results
                 results = soup.find_all('div', class_='mw-search-result')
                 for result in results:
@@ -187,59 +185,92 @@ class UniversityScraper:
         return name.strip()
     
     def _make_request(self, url: str) -> Optional[requests.Response]:
-        """Make HTTP request with retry logic"""
-        for attempt in range(self.retry_count):
-            try:
-                response = self.session.get(url, timeout=self.timeout)
-                if response.status_code == 200:
-                    return response
-                elif response.status_code == 429:  # Rate limited
-                    time.sleep(2 ** attempt)  # Exponential backoff
-                else:
-                    return None
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"Request attempt {attempt + 1} failed: {e}")
-                if attempt < self.retry_count - 1:
-                    time.sleep(2 ** attempt)
-        return None
+        """Make HTTP request with retry logic (throttled per host by the scheduler)"""
+        return self.scheduler.request(self.session, url, timeout=self.timeout, retry_count=self.retry_count)
 
 
 class CourseScraper:
     """Scrapes course/program links from university websites"""
     
-    def __init__(self, timeout: int = 10, retry_count: int = 3):
+    def __init__(self, timeout: int = 10, retry_count: int = 3, use_async: bool = True,
+                 max_concurrency: int = 16, per_host_concurrency: int = 4,
+                 scheduler: Optional[RequestScheduler] = None,
+                 http_cache: Optional[HTTPCache] = None,
+                 crawl_max_depth: int = 3, crawl_max_pages: int = 40,
+                 crawl_time_budget: float = 30.0, robots_cache: Optional[RobotsCache] = None):
         self.timeout = timeout
         self.retry_count = retry_count
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        self.scheduler = scheduler or default_scheduler
+        # Persistent on-disk HTTP cache shared by all sessions
+        self.http_cache = http_cache or get_shared_cache()
+        # Fetches run on the async fetchers' worker threads: one session per thread
+        self._local = threading.local()
+        # Best-first crawl limits, per university site
+        self.crawl_max_depth = crawl_max_depth
+        self.crawl_max_pages = crawl_max_pages
+        self.crawl_time_budget = crawl_time_budget
+        # Async engine for probing many URLs at once (sequential path is the fallback)
+        self.use_async = use_async
+        self.async_fetcher = AsyncFetcher(self._make_request, max_concurrency, per_host_concurrency)
+        # Guessed homepages are all on different hosts, so probe them all at once
+        self.probe_fetcher = AsyncFetcher(self._probe_homepage, max_concurrency, 1)
+        # robots.txt rules, Crawl-delay, declared sitemaps and known-missing paths per host
+        self.robots = robots_cache or default_robots_cache
+        # Sitemaps are streamed, never held in memory whole
+        self.sitemap_reader = SitemapReader(lambda: self.session, timeout=timeout, scheduler=self.scheduler,
+                                            response_hook=self.robots.record_response)
+    
+    @property
+    def session(self) -> requests.Session:
+        """This thread's session"""
+        if not hasattr(self._local, 'session'):
+            session = requests.Session()
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            })
+            install_cache(session, self.http_cache)
+            self._local.session = session
+        return self._local.session
+    
+    def close(self):
+        """Shut down the async fetchers' worker threads"""
+        self.async_fetcher.close()
+        self.probe_fetcher.close()
     
-    def search_courses(self, university_name: str, course_keyword: str, base_url: Optional[str] = None) -> List[Dict[str, str]]:
+    def search_courses(self, university_name: str, course_keyword: str, base_url: Optional[str] = None,
+                       page_cache: Optional[PageCache] = None,
+                       use_async: Optional[bool] = None) -> List[Dict[str, str]]:
         """
         Search for courses matching keyword in university website
         Returns list of dicts with 'url' and 'title'
+        Validated pages are kept in page_cache so analyzers can reuse them
+        use_async overrides the instance setting for this call
         """
+        if page_cache is None:
+            page_cache = PageCache()
+        if use_async is None:
+            use_async = self.use_async
+        
         if not base_url:
             # Try to construct base URL from university name
-            base_url = self._guess_university_url(university_name)
+            base_url = self.resolve_university_url(university_name)
         
         if not base_url:
             logger.warning(f"Could not determine URL for {university_name}")
             return []
         
-        program_links = []
+        program_links = LinkSet()
         
         # Search strategies
         strategies = [
             self._search_via_sitemap,
             self._search_via_search_page,
-            self._crawl_common_paths
+            self._crawl_best_first
         ]
         
         for strategy in strategies:
             try:
-                links = strategy(base_url, course_keyword)
+                links = strategy(base_url, course_keyword, use_async=use_async)
                 if links:
                     program_links.extend(links)
                     break  # If one strategy works, use it
@@ -247,14 +278,24 @@ class CourseScraper:
                 logger.warning(f"Strategy {strategy.__name__} failed: {e}")
                 continue
         
+        # Fetch all candidate pages up front (concurrently in async mode)
+        self.prefetch_pages([link_info['url'] for link_info in program_links], page_cache, use_async)
+        
         # Validate and filter links
         validated_links = []
         for link_info in program_links:
-            if self._validate_program_page(link_info['url'], course_keyword):
+            if self._validate_program_page(link_info['url'], course_keyword, page_cache):
                 validated_links.append(link_info)
         
         return validated_links
     
+    def resolve_university_url(self, university_name: str) -> Optional[str]:
+        """
+        Find the homepage of a university (Wikipedia infobox, then guessed domains)
+        Callers should store the result; this is the expensive discovery path
+        """
+        return self._guess_university_url(university_name)
+    
     def _guess_university_url(self, university_name: str) -> Optional[str]:
         """Try to guess university website URL - IMPROVED with more patterns"""
         # Common patterns
@@ -300,7 +341,7 @@ class CourseScraper:
             wiki_url = f"https://en.wikipedia.org/wiki/{university_name.replace(' ', '_')}"
             response = self._make_request(wiki_url)
             if response and response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
+                soup = parse_html(response.content, only=INFOBOX_ONLY)
                 # Look for official website link
                 infobox = soup.find('table', class_='infobox')
                 if infobox:
@@ -321,43 +362,91 @@ class CourseScraper:
             pass
         
         # Try patterns
-        for pattern in patterns:
-            if pattern:
-                try:
-                    response = self._make_request(pattern)
-                    if response and response.status_code == 200:
-                        return pattern
-                except:
-                    continue
+        return self._probe_candidate_urls(patterns)
+    
+    def _probe_candidate_urls(self, candidates: List[str]) -> Optional[str]:
+        """
+        Return the first candidate (in priority order) that answers
+        Hosts that don't resolve in DNS are dropped first; the rest get a cheap
+        HEAD request, all probed concurrently
+        """
+        candidates = [c for c in dict.fromkeys(candidates) if c]
+        if not candidates:
+            return None
         
+        hosts = list(dict.fromkeys(urlparse(c).hostname for c in candidates))
+        with ThreadPoolExecutor(max_workers=min(16, len(hosts))) as executor:
+            resolvable = {host for host, ok in zip(hosts, executor.map(self._host_resolves, hosts)) if ok}
+        candidates = [c for c in candidates if urlparse(c).hostname in resolvable]
+        if not candidates:
+            return None
+        
+        if self.use_async and len(candidates) > 1 and AsyncFetcher.can_run():
+            try:
+                results = self.probe_fetcher.fetch_all(candidates)
+            except Exception as e:
+                logger.warning(f"Async probe failed, falling back to sequential: {e}")
+                results = None
+            if results is not None:
+                for candidate, ok in results:
+                    if ok:
+                        return candidate
+                return None
+        
+        for candidate in candidates:
+            if self._probe_homepage(candidate):
+                return candidate
         return None
     
-    def _search_via_sitemap(self, base_url: str, keyword: str) -> List[Dict[str, str]]:
-        """Search via sitemap.xml"""
-        sitemap_urls = [
+    @staticmethod
+    def _host_resolves(host: Optional[str]) -> bool:
+        """DNS pre-check so dead domains cost no HTTP timeouts or retries"""
+        if not host:
+            return False
+        try:
+            socket.getaddrinfo(host, 443)
+            return True
+        except (socket.gaierror, UnicodeError, OSError):
+            return False
+    
+    def _probe_homepage(self, url: str) -> bool:
+        """Cheap liveness check: HEAD, with a GET fallback for servers that reject HEAD"""
+        try:
+            self.scheduler.acquire(url)
+            response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+            if response.status_code in (403, 405, 501):
+                return self._make_request(url) is not None
+            return response.status_code < 400
+        except requests.exceptions.RequestException:
+            return False
+    
+    def _search_via_sitemap(self, base_url: str, keyword: str, use_async: bool = False) -> List[Dict[str, str]]:
+        """
+        Search via sitemap.xml (streamed; sitemap indexes and .xml.gz are followed)
+        Sitemaps declared in robots.txt come first, then the conventional paths
+        """
+        guessed = [
             urljoin(base_url, '/sitemap.xml'),
             urljoin(base_url, '/sitemap_index.xml')
         ]
+        sitemap_urls = list(dict.fromkeys(
+            self.robots.sitemaps(base_url) + [url for url in guessed if self.robots.allowed(url)]
+        ))
+        if not sitemap_urls:
+            return []
         
-        links = []
-        for sitemap_url in sitemap_urls:
-            try:
-                response = self._make_request(sitemap_url)
-                if response and response.status_code == 200:
-                    soup = BeautifulSoup(response.content, 'xml')
-                    urls = soup.find_all('url')
-                    for url_tag in urls:
-                        loc = url_tag.find('loc')
-                        if loc:
-                            url = loc.text
-                            if keyword.lower() in url.lower():
-                                links.append({'url': url, 'title': url})
-            except Exception as e:
-                logger.debug(f"Sitemap search failed: {e}")
+        links = LinkSet()
+        keyword_lower = keyword.lower()
+        try:
+            for entry in self.sitemap_reader.iter_entries(sitemap_urls):
+                if keyword_lower in entry.loc.lower() and self.robots.allowed(entry.loc):
+                    links.add(entry.loc, lastmod=entry.lastmod)
+        except Exception as e:
+            logger.debug(f"Sitemap search failed: {e}")
         
-        return links
+        return links.to_list()
     
-    def _search_via_search_page(self, base_url: str, keyword: str) -> List[Dict[str, str]]:
+    def _search_via_search_page(self, base_url: str, keyword: str, use_async: bool = False) -> List[Dict[str, str]]:
         """Search via website search functionality - IMPROVED"""
         from urllib.parse import quote
         
@@ -372,112 +461,218 @@ class CourseScraper:
             urljoin(base_url, f'/academics/search?q={keyword_encoded}'),
         ]
         
-        links = []
-        for search_url in search_urls:
+        keyword_lower = keyword.lower()
+        course_matcher = KeywordMatcher({'words': [keyword_lower] + keyword_lower.split()})
+        links = LinkSet()
+        for search_url, response in self._fetch_many(search_urls, use_async):
             try:
-                response = self._make_request(search_url)
                 if response and response.status_code == 200:
-                    soup = BeautifulSoup(response.content, 'html.parser')
                     # Find links in search results - more thorough
-                    result_links = soup.find_all('a', href=True)
-                    for link in result_links:
-                        href = link.get('href')
-                        text = link.get_text(strip=True)
+                    for href, text in extract_links(response.content):
                         if href:
-                            keyword_lower = keyword.lower()
                             href_lower = href.lower()
-                            text_lower = text.lower()
                             
-                            # More lenient matching
-                            if (keyword_lower in href_lower or 
-                                keyword_lower in text_lower or
-                                any(word in href_lower for word in keyword_lower.split()) or
-                                any(word in text_lower for word in keyword_lower.split())):
-                                full_url = urljoin(base_url, href)
-                                # Avoid duplicates and non-program pages
-                                if full_url not in [l['url'] for l in links]:
-                                    if any(term in href_lower for term in ['program', 'course', 'degree', 'study', 'academic']):
-                                        links.append({'url': full_url, 'title': text or href})
+                            # More lenient matching: the phrase or any of its words;
+                            # skip non-program pages; duplicates merge in the link set
+                            if (LINK_RULES.matches(href_lower, 'search_result')
+                                    and (course_matcher.matches(href_lower, 'words')
+                                         or course_matcher.matches(text.lower(), 'words'))):
+                                links.add(urljoin(base_url, href), text or href)
             except Exception as e:
                 logger.debug(f"Search page failed: {e}")
         
-        return links
+        return links.to_list()
     
-    def _crawl_common_paths(self, base_url: str, keyword: str) -> List[Dict[str, str]]:
-        """Crawl common program/course paths - IMPROVED"""
-        common_paths = [
-            '/programs', '/programmes', '/program',
-            '/courses', '/course',
-            '/study', '/studies', '/studying',
-            '/academics', '/academic',
-            '/departments', '/department',
-            '/faculties', '/faculty',
-            '/degrees', '/degree',
-            '/undergraduate', '/graduate',
-            '/bachelor', '/master',
-        ]
-        
-        links = []
+    def _crawl_best_first(self, base_url: str, keyword: str, use_async: bool = False) -> List[Dict[str, str]]:
+        """
+        Crawl the site best-first, following the links that match the course best
+        The frontier starts at the homepage; the common program paths are
+        guessed only if it yields no link worth following. Each round fetches
+        the highest-priority pages (concurrently in async mode); links are
+        scored by keyword matches in anchor text and URL, and links with no
+        match at all are never followed. Stops once programs are found and
+        nothing better than a guessed path is left, or at crawl_max_depth,
+        crawl_max_pages fetched pages or crawl_time_budget seconds.
+        """
+        deadline = time.monotonic() + self.crawl_time_budget
         keyword_lower = keyword.lower()
-        keyword_words = keyword_lower.split()
+        keyword_words = [word for word in keyword_lower.split() if len(word) > 2] or [keyword_lower]
+        course_matcher = KeywordMatcher({
+            'phrase': [keyword_lower, keyword_lower.replace(' ', '-'), keyword_lower.replace(' ', '_')],
+            'words': keyword_words,
+        })
+        site = self._site_of(base_url)
+        batch_size = 8 if use_async else 1
+        
+        links = LinkSet()
+        frontier = []  # (-priority, order, url, depth); stale entries are skipped on pop
+        best_priority = {}  # url_key -> highest priority queued
+        visited = set()
+        counter = 0
+        
+        def _push(url: str, depth: int, priority: float):
+            nonlocal counter
+            key = url_key(url)
+            if key in visited or best_priority.get(key, float('-inf')) >= priority:
+                return
+            best_priority[key] = priority
+            counter += 1
+            heapq.heappush(frontier, (-priority, counter, url, depth))
+        
+        _push(base_url, 0, 10.0)
+        
+        fetched = 0
+        while frontier and fetched < self.crawl_max_pages and time.monotonic() < deadline:
+            # Drop entries already visited under a higher priority
+            while frontier and url_key(frontier[0][2]) in visited:
+                heapq.heappop(frontier)
+            if not frontier:
+                break
+            if links and -frontier[0][0] <= GUESSED_PATH_PRIORITY:
+                break  # Programs found; what's left is no better than guessing
+            # The homepage goes alone, so its links are ranked before anything else is fetched
+            round_size = min(batch_size if fetched else 1, self.crawl_max_pages - fetched)
+            batch = []
+            while frontier and len(batch) < round_size:
+                _, _, url, depth = heapq.heappop(frontier)
+                key = url_key(url)
+                if key not in visited:
+                    visited.add(key)
+                    batch.append((url, depth))
+            if not batch:
+                break
+            depths = dict(batch)
+            fetched += len(batch)
+            
+            for url, response in self._fetch_many([url for url, _ in batch], use_async):
+                if not response or response.status_code != 200:
+                    continue
+                if 'html' not in response.headers.get('Content-Type', 'text/html').lower():
+                    continue
+                depth = depths[url]
+                try:
+                    page_links = extract_links(response.content)
+                except Exception as e:
+                    logger.debug(f"Crawl of {url} failed: {e}")
+                    continue
+                for href, text in page_links:
+                    if not href:
+                        continue
+                    full_url = urldefrag(urljoin(response.url or url, href))[0]
+                    if self._site_of(full_url) != site or full_url.lower().endswith(SKIPPED_EXTENSIONS):
+                        continue
+                    href_lower = full_url.lower()
+                    text_lower = (text or '').lower()
+                    href_found = course_matcher.find(href_lower)
+                    text_found = course_matcher.find(text_lower)
+                    score = self._link_score(href_lower, text_lower, keyword_lower, href_found, text_found)
+                    if score <= 0:
+                        continue
+                    # Program-related links that mention the course are results
+                    if (href_found['words'] or text_found['words']) and LINK_RULES.matches(href_lower, 'program'):
+                        links.add(full_url, text or href)
+                    if depth < self.crawl_max_depth:
+                        _push(full_url, depth + 1, score / (1 + depth * 0.25))
+            
+            if fetched == 1 and not frontier:
+                # Homepage unreachable or without a useful link: guess the usual paths
+                for path in COMMON_PROGRAM_PATHS:
+                    _push(urljoin(base_url, path), 1, GUESSED_PATH_PRIORITY)
+        
+        logger.info(f"Best-first crawl of {base_url}: {fetched} pages, {len(links)} program links")
+        return links.to_list()
+    
+    @staticmethod
+    def _site_of(url: str) -> str:
+        """Host without 'www.', so both forms count as the same site"""
+        host = (urlparse(url).hostname or '').lower()
+        return host[4:] if host.startswith('www.') else host
+    
+    @staticmethod
+    def _link_score(href_lower: str, text_lower: str, keyword_lower: str,
+                    href_found: Dict[str, set], text_found: Dict[str, set]) -> float:
+        """
+        How strongly a link points towards the course; 0 means don't follow
+        href_found / text_found: course keyword matches (groups 'phrase' and 'words')
+        """
+        score = 0.0
+        if keyword_lower in text_lower:
+            score += 3
+        if href_found['phrase']:
+            score += 3
+        score += len(text_found['words']) + len(href_found['words'])
+        navigational = LINK_RULES.matches(href_lower, 'navigation') or LINK_RULES.matches(text_lower, 'navigation')
+        if score and navigational:
+            score += 1
+        elif not score and navigational:
+            score = 0.5  # Program listings and faculty pages lead to programs
+        return score
+    
+    def _fetch_many(self, urls: List[str], use_async: bool = False) -> List[Tuple[str, Optional[requests.Response]]]:
+        """
+        Fetch several URLs, concurrently through the async engine when enabled
+        Returns (url, response) pairs in input order
+        """
+        if use_async and len(urls) > 1 and AsyncFetcher.can_run():
+            try:
+                return self.async_fetcher.fetch_all(urls)
+            except Exception as e:
+                logger.warning(f"Async fetch failed, falling back to sequential: {e}")
         
-        for path in common_paths:
+        results = []
+        for url in urls:
             try:
-                url = urljoin(base_url, path)
-                response = self._make_request(url)
-                if response and response.status_code == 200:
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    all_links = soup.find_all('a', href=True)
-                    for link in all_links:
-                        href = link.get('href')
-                        text = link.get_text(strip=True)
-                        href_lower = href.lower() if href else ""
-                        text_lower = text.lower() if text else ""
-                        
-                        # More lenient matching
-                        matches = (
-                            keyword_lower in (href_lower + text_lower) or
-                            any(word in href_lower for word in keyword_words) or
-                            any(word in text_lower for word in keyword_words)
-                        )
-                        
-                        if matches:
-                            full_url = urljoin(url, href)
-                            # Avoid duplicates
-                            if full_url not in [l['url'] for l in links]:
-                                # Prefer program-related links
-                                if any(term in href_lower for term in ['program', 'course', 'degree', 'study', 'bachelor', 'master']):
-                                    links.append({'url': full_url, 'title': text or href})
+                results.append((url, self._make_request(url)))
             except Exception as e:
-                logger.debug(f"Crawl path {path} failed: {e}")
+                logger.debug(f"Fetch failed for {url}: {e}")
+                results.append((url, None))
+        return results
+    
+    def prefetch_pages(self, urls: List[str], page_cache: PageCache, use_async: bool = False):
+        """Fetch pages that are not cached yet and store them in page_cache"""
+        missing = list(dict.fromkeys(url for url in urls if url not in page_cache))
+        if not missing:
+            return
+        for url, response in self._fetch_many(missing, use_async):
+            if response and response.status_code == 200:
+                page_cache.put(url, FetchedPage.from_response(response))
+            else:
+                page_cache.put(url, None)
+    
+    def fetch_page(self, url: str, page_cache: Optional[PageCache] = None) -> Optional[FetchedPage]:
+        """
+        Fetch a page once and share it through page_cache
+        Returns None if the page could not be fetched
+        """
+        def _fetch(page_url: str) -> Optional[FetchedPage]:
+            response = self._make_request(page_url)
+            if response and response.status_code == 200:
+                return FetchedPage.from_response(response)
+            return None
         
-        return links
+        if page_cache is None:
+            return _fetch(url)
+        return page_cache.get_or_fetch(url, _fetch)
     
-    def _validate_program_page(self, url: str, course_keyword: str) -> bool:
+    def _validate_program_page(self, url: str, course_keyword: str,
+                               page_cache: Optional[PageCache] = None) -> bool:
         """
         Validate that URL is a valid program page
         Checks: HTTP 200, contains keyword, contains academic structure
         """
         try:
-            response = self._make_request(url)
-            if not response or response.status_code != 200:
+            page = self.fetch_page(url, page_cache)
+            if not page:
                 return False
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            text = soup.get_text().lower()
+            text = page.text_lower
             
             # Must contain course keyword
             if course_keyword.lower() not in text:
                 return False
             
             # Must contain academic structure keywords
-            academic_keywords = [
-                'program', 'curriculum', 'course', 'module', 'credit',
-                'degree', 'bachelor', 'master', 'study', 'academic'
-            ]
-            
-            has_academic_structure = any(keyword in text for keyword in academic_keywords)
-            if not has_academic_structure:
+            if not ACADEMIC_STRUCTURE_RULES.matches(text, 'academic'):
                 return False
             
             return True
@@ -486,18 +681,13 @@ class CourseScraper:
             return False
     
     def _make_request(self, url: str) -> Optional[requests.Response]:
-        """Make HTTP request with retry logic"""
-        for attempt in range(self.retry_count):
-            try:
-                response = self.session.get(url, timeout=self.timeout)
-                if response.status_code == 200:
-                    return response
-                elif response.status_code == 429:
-                    time.sleep(2 ** attempt)
-                else:
-                    return None
-            except requests.exceptions.RequestException as e:
-                if attempt < self.retry_count - 1:
-                    time.sleep(2 ** attempt)
-        return None
+        """
+        Make HTTP request with retry logic (throttled per host by the scheduler)
+        URLs disallowed by robots.txt or known to be missing are not requested
+        """
+        if not self.robots.allowed(url):
+            logger.debug(f"Skipping {url}: disallowed by robots.txt or known missing")
+            return None
+        return self.scheduler.request(self.session, url, timeout=self.timeout, retry_count=self.retry_count,
+                                      hooks={'response': self.robots.record_response})
 
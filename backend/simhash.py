@@ -0,0 +1,144 @@
+"""
+SimHash fingerprinting module
+64-bit similarity fingerprints of page text and a banded index that finds
+near-duplicates (few differing bits) without comparing every pair
+"""
+from collections import Counter
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+import hashlib
+import re
+import logging
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SIMHASH_BITS = 64
+# Word n-grams hashed as features; single words move the fewest bits on
+# small edits (a changed date shifts 2 bits on a typical page, 2-grams 4)
+SHINGLE_SIZE = 1
+# Texts with fewer words are not fingerprinted: every near-empty page
+# (error pages, JavaScript shells) would look like a duplicate of the others
+MIN_WORDS = 20
+
+# Fingerprints at most this many bits apart are near-identical text. That
+# includes sibling pages of one template (a UG and a PG variant differing in
+# a few words), so callers confirm a match by URL or title before merging
+NEAR_DUPLICATE_DISTANCE = 3
+# A re-fetched page counts as changed only above this distance
+CHANGE_DISTANCE = 3
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_BIT_POSITIONS = np.arange(SIMHASH_BITS - 1, -1, -1, dtype=np.uint64)
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def compute_simhash(text: str) -> Optional[str]:
+    """
+    SimHash of a text as 16 hex digits (None for texts too short to compare)
+    Features are lowercased word shingles weighted by their count
+    """
+    words = _WORD_RE.findall((text or '').lower())
+    if len(words) < MIN_WORDS:
+        return None
+    shingles = Counter(
+        ' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)
+    )
+    hashes = np.fromiter((_feature_hash(shingle) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+    weights = np.fromiter(shingles.values(), dtype=np.int64, count=len(shingles))
+
+    # bits[i, j]: bit j (most significant first) of feature i
+    bits = ((hashes[:, None] >> _BIT_POSITIONS) & np.uint64(1)).astype(np.int64)
+    totals = weights @ (2 * bits - 1)
+    value = 0
+    for total in totals:
+        value = (value << 1) | int(total > 0)
+    return f"{value:016x}"
+
+
+def hamming_distance(a: str, b: str) -> int:
+    """Number of differing bits between two hex fingerprints"""
+    return (int(a, 16) ^ int(b, 16)).bit_count()
+
+
+class SimHashIndex:
+    """
+    Near-duplicate index over fingerprints
+    A fingerprint is split into `bands` equal bit ranges; two fingerprints
+    within bands - 1 bits of each other agree exactly on at least one band
+    (pigeonhole), so only items sharing a band value are compared.
+    """
+
+    def __init__(self, bands: int = NEAR_DUPLICATE_DISTANCE + 1):
+        if SIMHASH_BITS % (bands * 4):
+            raise ValueError(f"bands must split {SIMHASH_BITS} bits into whole hex digits")
+        self.bands = bands
+        self._band_width = SIMHASH_BITS // 4 // bands  # hex digits per band
+        self._buckets: Dict[Tuple[int, str], Set[Hashable]] = {}
+        self._fingerprints: Dict[Hashable, str] = {}
+
+    def _band_keys(self, fingerprint: str) -> List[Tuple[int, str]]:
+        width = self._band_width
+        return [(band, fingerprint[band * width:(band + 1) * width]) for band in range(self.bands)]
+
+    def add(self, key: Hashable, fingerprint: Optional[str]):
+        """Index an item (items without a fingerprint are ignored)"""
+        if not fingerprint:
+            return
+        self.remove(key)
+        self._fingerprints[key] = fingerprint
+        for band_key in self._band_keys(fingerprint):
+            self._buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key: Hashable):
+        fingerprint = self._fingerprints.pop(key, None)
+        if fingerprint is None:
+            return
+        for band_key in self._band_keys(fingerprint):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def near(self, fingerprint: Optional[str], max_distance: int = NEAR_DUPLICATE_DISTANCE) -> List[Tuple[Hashable, int]]:
+        """
+        (key, distance) of indexed items within max_distance bits, closest first
+        Complete for max_distance < bands
+        """
+        if not fingerprint:
+            return []
+        if max_distance >= self.bands:
+            logger.debug(f"max_distance {max_distance} exceeds what {self.bands} bands guarantee")
+        candidates = set()
+        for band_key in self._band_keys(fingerprint):
+            candidates.update(self._buckets.get(band_key, ()))
+        matches = []
+        for key in candidates:
+            distance = hamming_distance(fingerprint, self._fingerprints[key])
+            if distance <= max_distance:
+                matches.append((key, distance))
+        matches.sort(key=lambda match: match[1])
+        return matches
+
+    def find_duplicate(self, fingerprint: Optional[str], max_distance: int = NEAR_DUPLICATE_DISTANCE,
+                       accept: Optional[Callable[[Hashable], bool]] = None) -> Optional[Hashable]:
+        """
+        Key of the closest near-duplicate, or None
+        accept(key) can reject candidates that are close in bits but known to
+        be a different item
+        """
+        for key, _ in self.near(fingerprint, max_distance):
+            if accept is None or accept(key):
+                return key
+        return None
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._fingerprints
@@ -0,0 +1,141 @@
+"""
+Sitemap reader module
+Streams <loc>/<lastmod> entries from sitemaps and sitemap indexes,
+decompressing gzip on the fly, with memory bounded by one entry at a time
+"""
+import requests
+from collections import deque
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, Tuple
+import gzip
+import io
+import xml.etree.ElementTree as ET
+import logging
+
+from request_scheduler import RequestScheduler, default_scheduler
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Child sitemaps with these words in their URL are read first
+PRIORITY_HINTS = ('program', 'course', 'study', 'degree', 'academic')
+
+
+class SitemapEntry(NamedTuple):
+    loc: str
+    lastmod: Optional[str] = None
+
+
+def _local_name(tag) -> str:
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+
+class SitemapReader:
+    """
+    Incremental sitemap reader
+    Follows sitemap indexes breadth-first up to max_sitemaps files and stops
+    after max_entries page entries. response_hook, if given, is called with
+    every sitemap response (a requests response hook). session is a
+    requests.Session or a callable returning one (e.g. a per-thread session)
+    """
+
+    def __init__(self, session, timeout: int = 10,
+                 scheduler: Optional[RequestScheduler] = None,
+                 max_sitemaps: int = 25, max_entries: int = 500000,
+                 response_hook: Optional[Callable] = None):
+        self.session = session
+        self.response_hook = response_hook
+        self.timeout = timeout
+        self.scheduler = scheduler or default_scheduler
+        self.max_sitemaps = max_sitemaps
+        self.max_entries = max_entries
+
+    def iter_entries(self, sitemap_urls: Iterable[str]) -> Iterator[SitemapEntry]:
+        """Yield page entries from the given sitemaps and every index they reference"""
+        queue = deque(sitemap_urls)
+        seen = set(queue)
+        fetched = 0
+        emitted = 0
+
+        while queue and fetched < self.max_sitemaps:
+            sitemap_url = queue.popleft()
+            opened = self._open(sitemap_url)
+            if opened is None:
+                continue
+            stream, response = opened
+            fetched += 1
+            try:
+                for kind, entry in self._parse(stream):
+                    if kind == 'sitemap':
+                        if entry.loc not in seen:
+                            seen.add(entry.loc)
+                            if any(hint in entry.loc.lower() for hint in PRIORITY_HINTS):
+                                queue.appendleft(entry.loc)
+                            else:
+                                queue.append(entry.loc)
+                    else:
+                        yield entry
+                        emitted += 1
+                        if emitted >= self.max_entries:
+                            logger.info(f"Sitemap entry limit reached at {sitemap_url}")
+                            return
+            except Exception as e:
+                # Malformed XML, bad gzip data or a connection dropped mid-stream
+                logger.debug(f"Sitemap read failed for {sitemap_url}: {e}")
+            finally:
+                stream.close()
+                response.close()
+
+        if queue:
+            logger.info(f"Sitemap limit reached, {len(queue)} child sitemaps not read")
+
+    def _open(self, url: str) -> Optional[Tuple[io.IOBase, requests.Response]]:
+        """Streaming body of a sitemap (gunzipped if needed) and its response; None on failure"""
+        try:
+            self.scheduler.acquire(url)
+            hooks = {'response': self.response_hook} if self.response_hook else None
+            session = self.session() if callable(self.session) else self.session
+            response = session.get(url, timeout=self.timeout, stream=True, hooks=hooks)
+        except requests.exceptions.RequestException as e:
+            logger.debug(f"Sitemap fetch failed for {url}: {e}")
+            return None
+        if response.status_code != 200:
+            response.close()
+            return None
+
+        # Undo Content-Encoding while reading; .xml.gz files are gzip themselves
+        response.raw.decode_content = True
+        # Keep the raw stream readable at EOF so wrappers can finish (gzip trailer)
+        response.raw.auto_close = False
+        stream = io.BufferedReader(response.raw)
+        if stream.peek(2)[:2] == GZIP_MAGIC:
+            return gzip.GzipFile(fileobj=stream), response
+        return stream, response
+
+    @staticmethod
+    def _parse(stream) -> Iterator[tuple]:
+        """
+        Yield ('url', entry) and ('sitemap', entry) as their elements close
+        Processed elements are dropped from the root, so the tree never grows
+        """
+        root = None
+        loc = None
+        lastmod = None
+        for event, element in ET.iterparse(stream, events=('start', 'end')):
+            if root is None:
+                root = element
+                continue
+            if event != 'end':
+                continue
+            name = _local_name(element.tag)
+            if name == 'loc':
+                loc = (element.text or '').strip()
+            elif name == 'lastmod':
+                lastmod = (element.text or '').strip() or None
+            elif name in ('url', 'sitemap'):
+                if loc:
+                    yield name, SitemapEntry(loc, lastmod)
+                loc = None
+                lastmod = None
+                root.clear()
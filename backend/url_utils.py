@@ -0,0 +1,166 @@
+"""
+URL canonicalization module
+Normalizes URLs so tracking parameters, fragments, trailing slashes and
+http/https variants of the same page collapse to one key
+"""
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import parse_qsl, quote, urlencode, urljoin, urlsplit, urlunsplit
+import re
+
+# Query parameters that never change page content
+TRACKING_PARAM_PREFIXES = ('utm_',)
+TRACKING_PARAMS = frozenset([
+    'gclid', 'dclid', 'fbclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', '_hsenc', '_hsmi', 'hsctatracking', 'igshid', 'sessionid',
+    'phpsessid', 'jsessionid',
+])
+
+_DEFAULT_PORTS = {'http': '80', 'https': '443'}
+_SESSION_PATH_PARAM_RE = re.compile(r';(jsessionid|phpsessid|sid)=[^/?#]*', re.IGNORECASE)
+_MULTI_SLASH_RE = re.compile(r'/{2,}')
+# Characters left as-is when re-quoting a path (includes '%' so escapes survive)
+_PATH_SAFE = "/%:@!$&'()*+,;=-._~"
+
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def canonicalize_url(url: str, base_url: Optional[str] = None) -> str:
+    """
+    Canonical form of a URL (resolved against base_url if relative)
+    Lowercases scheme and host, drops default ports, fragments, session ids
+    and tracking parameters, sorts the query and removes trailing slashes
+    """
+    url = (url or '').strip()
+    if base_url:
+        url = urljoin(base_url, url)
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+
+    host = (parts.hostname or '').rstrip('.')
+    if ':' in host:
+        host = f"[{host}]"  # IPv6 literal
+    netloc = host
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and str(port) != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+    if parts.username:
+        netloc = f"{parts.username}@{netloc}"
+
+    path = _SESSION_PATH_PARAM_RE.sub('', parts.path)
+    path = quote(_MULTI_SLASH_RE.sub('/', path), safe=_PATH_SAFE)
+    if len(path) > 1:
+        path = path.rstrip('/')
+    if not path:
+        path = '/'
+
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(name)
+    ))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def _strip_scheme(canonical: str) -> str:
+    scheme_end = canonical.find('://')
+    return canonical[scheme_end + 3:] if scheme_end != -1 else canonical
+
+
+def url_key(url: str) -> str:
+    """Dedup key: the canonical URL without its scheme, so http and https match"""
+    return _strip_scheme(canonicalize_url(url))
+
+
+_INDEX_FILE_RE = re.compile(r'/index\.(?:html?|php|aspx?|jsp)$', re.IGNORECASE)
+
+
+def _variant_parts(url: str):
+    canonical = canonicalize_url(url)
+    parts = urlsplit(canonical)
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = _INDEX_FILE_RE.sub('', parts.path).rstrip('/').lower() or '/'
+    return host, path, parts.query
+
+
+def url_variants(a: str, b: str) -> bool:
+    """
+    True if two URLs address the same page: same url_key, or the same path
+    and query on one host or on a host and one of its subdomains (www.,
+    language subdomains), ignoring case and index files
+    """
+    if url_key(a) == url_key(b):
+        return True
+    host_a, path_a, query_a = _variant_parts(a)
+    host_b, path_b, query_b = _variant_parts(b)
+    if (path_a, query_a) != (path_b, query_b):
+        return False
+    if host_a == host_b:
+        return True
+    # One path on a host and its subdomain; shared homepages say nothing.
+    # Sibling hosts don't count: ox.ac.uk and cam.ac.uk share only a suffix
+    return path_a != '/' and (host_a.endswith('.' + host_b) or host_b.endswith('.' + host_a))
+
+
+class LinkSet:
+    """
+    Ordered link collection deduplicated by url_key
+    Entries keep the URL as the site wrote it, since that is what gets
+    fetched and stored. Adding a known page merges it into the existing
+    entry: the https variant wins over http, and a descriptive title wins
+    over a bare URL. Non-web links (mailto:, javascript:, ...) are ignored.
+    """
+
+    def __init__(self, links: Iterable[Dict] = ()):
+        self._links: Dict[str, Dict] = {}
+        for link in links:
+            self.add(**link)
+
+    def add(self, url: str, title: Optional[str] = None, **extra) -> bool:
+        """Add a link; returns True if the page was not in the set yet"""
+        url = (url or '').strip()
+        if not url.lower().startswith(('http://', 'https://')):
+            return False
+        key = url_key(url)
+        existing = self._links.get(key)
+        if existing is None:
+            self._links[key] = dict(extra, url=url, title=title or url)
+            return True
+
+        if url.lower().startswith('https:') and existing['url'].lower().startswith('http:'):
+            existing['url'] = url
+        if title and self._is_bare(existing['title']) and not self._is_bare(title):
+            existing['title'] = title
+        for name, value in extra.items():
+            if existing.get(name) is None:
+                existing[name] = value
+        return False
+
+    def extend(self, links: Iterable[Dict]):
+        for link in links:
+            self.add(**link)
+
+    @staticmethod
+    def _is_bare(title: str) -> bool:
+        return not title or title.startswith(('http://', 'https://', '/'))
+
+    def __contains__(self, url: str) -> bool:
+        return url_key(url) in self._links
+
+    def __len__(self) -> int:
+        return len(self._links)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self._links.values())
+
+    def to_list(self) -> List[Dict]:
+        return list(self._links.values())
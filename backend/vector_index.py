@@ -0,0 +1,172 @@
+"""
+Vector index module
+In-memory cosine-similarity index over program embeddings: one contiguous
+float32 matrix searched with a single matrix product, or an HNSW graph
+(hnswlib, optional) once the corpus is large
+"""
+from typing import Iterable, List, Optional, Sequence, Tuple
+import os
+import threading
+import logging
+
+import numpy as np
+
+try:
+    import hnswlib
+    HAS_HNSWLIB = True
+except ImportError:
+    HAS_HNSWLIB = False
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def hnsw_threshold() -> int:
+    """Corpus size from which HNSW is used when available (GUIS_VECTOR_HNSW_THRESHOLD)"""
+    try:
+        return int(os.getenv('GUIS_VECTOR_HNSW_THRESHOLD', 200000))
+    except ValueError:
+        return 200000
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+class VectorIndex:
+    """
+    Top-k cosine search over (id, vector) pairs
+    Vectors are normalized on insert, so similarity is a dot product. The
+    exact index keeps rows in a preallocated matrix that doubles when full;
+    above hnsw_threshold() items (and with hnswlib installed) an approximate
+    HNSW graph is built and kept up to date alongside.
+    """
+
+    def __init__(self, dim: Optional[int] = None, initial_capacity: int = 1024,
+                 use_hnsw: Optional[bool] = None):
+        self.dim = dim
+        self._capacity = initial_capacity
+        self._matrix: Optional[np.ndarray] = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._row_of = {}
+        self._count = 0
+        self._hnsw = None
+        self._use_hnsw = HAS_HNSWLIB if use_hnsw is None else (use_hnsw and HAS_HNSWLIB)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._row_of
+
+    def _grow(self, needed: int):
+        capacity = max(self._capacity, 1)
+        while capacity < needed:
+            capacity *= 2
+        if self._matrix is None:
+            self._matrix = np.empty((capacity, self.dim), dtype=np.float32)
+            self._ids = np.empty(capacity, dtype=np.int64)
+        elif capacity > self._matrix.shape[0]:
+            matrix = np.empty((capacity, self.dim), dtype=np.float32)
+            matrix[:self._count] = self._matrix[:self._count]
+            ids = np.empty(capacity, dtype=np.int64)
+            ids[:self._count] = self._ids[:self._count]
+            self._matrix, self._ids = matrix, ids
+        self._capacity = capacity
+
+    def add_many(self, ids: Sequence[int], vectors: np.ndarray):
+        """Insert or replace vectors (rows of a 2-D array, one per id)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(ids):
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+            vectors = _normalized(vectors)
+
+            ids = [int(item_id) for item_id in ids]
+            existing = [(position, self._row_of[item_id]) for position, item_id in enumerate(ids)
+                        if item_id in self._row_of]
+            if existing:
+                positions, rows = zip(*existing)
+                self._matrix[list(rows)] = vectors[list(positions)]
+            replaced = {position for position, _ in existing}
+            # Later duplicates within one call win, like separate calls
+            latest = {item_id: position for position, item_id in enumerate(ids) if position not in replaced}
+            if latest:
+                new_ids = list(latest)
+                start = self._count
+                self._grow(start + len(new_ids))
+                self._matrix[start:start + len(new_ids)] = vectors[list(latest.values())]
+                self._ids[start:start + len(new_ids)] = new_ids
+                self._row_of.update(zip(new_ids, range(start, start + len(new_ids))))
+                self._count += len(new_ids)
+
+            if self._hnsw is not None:
+                self._hnsw_add(np.asarray(ids, dtype=np.int64), vectors)
+            elif self._use_hnsw and self._count >= hnsw_threshold():
+                self._build_hnsw()
+
+    def add(self, item_id: int, vector: np.ndarray):
+        self.add_many([item_id], np.asarray(vector, dtype=np.float32)[None, :])
+
+    def _build_hnsw(self):
+        logger.info(f"Building HNSW index over {self._count} vectors")
+        index = hnswlib.Index(space='ip', dim=self.dim)
+        index.init_index(max_elements=self._capacity, ef_construction=200, M=16)
+        index.add_items(self._matrix[:self._count], self._ids[:self._count])
+        index.set_ef(128)
+        self._hnsw = index
+
+    def _hnsw_add(self, ids: np.ndarray, vectors: np.ndarray):
+        if self._hnsw.get_current_count() + len(ids) > self._hnsw.get_max_elements():
+            self._hnsw.resize_index(max(self._capacity, self._hnsw.get_current_count() + len(ids)))
+        self._hnsw.add_items(vectors, ids)
+
+    def vector(self, item_id: int) -> Optional[np.ndarray]:
+        """Stored (normalized) vector of an item"""
+        with self._lock:
+            row = self._row_of.get(item_id)
+            return None if row is None else self._matrix[row].copy()
+
+    def search(self, query: np.ndarray, k: int = 10,
+               exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        """(id, cosine similarity) of the k nearest items, best first"""
+        exclude = set(exclude)
+        with self._lock:
+            if not self._count:
+                return []
+            query = _normalized(query).reshape(-1)
+            wanted = min(k + len(exclude), self._count)
+
+            if self._hnsw is not None:
+                labels, distances = self._hnsw.knn_query(query, k=wanted)
+                hits = [(int(item_id), float(1.0 - distance)) for item_id, distance in zip(labels[0], distances[0])]
+            else:
+                scores = self._matrix[:self._count] @ query
+                if wanted < self._count:
+                    top = np.argpartition(scores, self._count - wanted)[self._count - wanted:]
+                else:
+                    top = np.arange(self._count)
+                top = top[np.argsort(-scores[top])]
+                hits = [(int(self._ids[row]), float(scores[row])) for row in top]
+
+        return [(item_id, score) for item_id, score in hits if item_id not in exclude][:k]
+
+
+def load_program_index(store, chunk_size: int = 50000) -> VectorIndex:
+    """
+    Build an index from an EmbeddingStore
+    Rows are read from the store's memory map in chunks, without a
+    database round trip or a Python object per program
+    """
+    index = VectorIndex(store.dim, initial_capacity=max(len(store), 1024))
+    for ids, vectors in store.iter_chunks(chunk_size):
+        index.add_many(ids.tolist(), vectors)
+    logger.info(f"Vector index loaded: {len(index)} programs")
+    return index
@@ -0,0 +1,321 @@
+"""
+Wikipedia source module
+Reads university lists through the MediaWiki API or a locally stored dump,
+instead of downloading and walking rendered HTML pages
+"""
+import requests
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import bz2
+import gzip
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+import logging
+
+from request_scheduler import RequestScheduler, default_scheduler
+from html_parsing import parse_tree, walk_tree
+from keyword_matcher import UNIVERSITY_RULES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_CONTENT_DIV_CLASSES = frozenset(['mw-parser-output', 'mw-content-ltr'])
+_NO_MATCH = UNIVERSITY_RULES.find('')
+
+# Title prefixes of the pages we read ("<prefix> <Country>")
+LIST_PAGE_PREFIXES = [
+    "List of universities in",
+    "List of universities and colleges in",
+    "Universities in",
+    "List of higher education institutions in",
+]
+
+# [[Target]], [[Target|label]], [[Target#Section|label]]
+WIKILINK_RE = re.compile(r'\[\[([^\[\]|#]+)(?:#[^\[\]|]*)?(?:\|[^\[\]]*)?\]\]')
+
+
+def list_page_titles(country: str) -> List[str]:
+    """Candidate list page titles for a country"""
+    country_clean = ' '.join(country.replace(',', '').split())
+    return [f"{prefix} {country_clean}" for prefix in LIST_PAGE_PREFIXES]
+
+
+def looks_like_university(title: str) -> bool:
+    """Page title that names a higher education institution"""
+    if not title or len(title) <= 3 or ':' in title:
+        return False
+    title_lower = title.lower()
+    if title_lower.startswith('list of'):
+        return False
+    return UNIVERSITY_RULES.matches(title_lower, 'any')
+
+
+def _is_content_div(element) -> bool:
+    return not _CONTENT_DIV_CLASSES.isdisjoint(element.get('class', '').split())
+
+
+def extract_universities_from_html(content: bytes) -> List[str]:
+    """
+    University names from a rendered Wikipedia list page, in one tree walk
+    Anchors count when they sit in one of the first three cells of a table
+    data row, in a list item, or (with a /wiki/ href) in the article body.
+    Each anchor is classified once and names are deduplicated as they are found.
+    """
+    found = {}  # Ordered set
+    li_depth = 0
+    content_depth = 0
+    table_rows = []  # Rows seen so far, per open table
+    open_rows = []   # [is data row, cells seen], per open row
+    open_cells = []  # Whether links in this cell count, per open cell
+
+    for event, element in walk_tree(parse_tree(content)):
+        tag = element.tag
+        if event == 'start':
+            if tag == 'li':
+                li_depth += 1
+            elif tag == 'div':
+                if _is_content_div(element):
+                    content_depth += 1
+            elif tag == 'table':
+                table_rows.append(0)
+            elif tag == 'tr':
+                if table_rows:
+                    table_rows[-1] += 1
+                open_rows.append([bool(table_rows) and table_rows[-1] > 1, 0])
+            elif tag in ('td', 'th'):
+                if open_rows:
+                    open_rows[-1][1] += 1
+                    open_cells.append(open_rows[-1][0] and open_rows[-1][1] <= 3)
+                else:
+                    open_cells.append(False)
+            continue
+
+        if tag == 'a':
+            href = element.get('href')
+            in_cell = bool(open_cells) and open_cells[-1]
+            in_list = li_depth > 0
+            in_content = content_depth > 0 and href is not None
+            if not (in_cell or in_list or in_content):
+                continue
+            name = ''.join(text.strip() for text in element.itertext())
+            if len(name) <= 3 or name in found:
+                continue
+            href = href or ''
+            is_wiki = '/wiki/' in href
+            name_groups = UNIVERSITY_RULES.find(name.lower())
+            href_groups = UNIVERSITY_RULES.find(href.lower()) if is_wiki else _NO_MATCH
+            if ((in_cell and (name_groups['table_name'] or href_groups['table_href']))
+                    or (in_list and (name_groups['any'] or href_groups['link']))
+                    or (in_content and is_wiki and len(name) > 5
+                        and (name_groups['link'] or href_groups['link']))):
+                found[name] = None
+        elif tag == 'li':
+            li_depth -= 1
+        elif tag == 'div':
+            if _is_content_div(element):
+                content_depth -= 1
+        elif tag == 'table':
+            table_rows.pop()
+        elif tag == 'tr':
+            open_rows.pop()
+        elif tag in ('td', 'th'):
+            open_cells.pop()
+
+    return list(found)
+
+
+class MediaWikiSource:
+    """University names from the MediaWiki API (links, categories, search)"""
+
+    API_URL = "https://en.wikipedia.org/w/api.php"
+
+    def __init__(self, session: requests.Session, timeout: int = 10, retry_count: int = 3,
+                 scheduler: Optional[RequestScheduler] = None, api_url: str = API_URL):
+        self.session = session
+        self.timeout = timeout
+        self.retry_count = retry_count
+        self.scheduler = scheduler or default_scheduler
+        self.api_url = api_url
+
+    def fetch_universities(self, country: str) -> List[str]:
+        """List pages first (one batched query), then categories, then search"""
+        universities = self._from_list_pages(country)
+        if not universities:
+            universities = self._from_categories(country)
+        if not universities:
+            universities = self._from_search(country)
+        logger.info(f"MediaWiki API: {len(universities)} universities for {country}")
+        return sorted(universities)
+
+    def _query(self, params: Dict) -> Iterator[Dict]:
+        """Run an API query, following 'continue' until exhausted"""
+        params = dict(params, action='query', format='json', formatversion=2)
+        continuation = {}
+        while True:
+            response = self.scheduler.request(
+                self.session, self.api_url, timeout=self.timeout,
+                retry_count=self.retry_count, params=dict(params, **continuation)
+            )
+            if not response:
+                return
+            data = response.json()
+            if 'error' in data:
+                logger.warning(f"MediaWiki API error: {data['error'].get('info')}")
+                return
+            yield data.get('query', {})
+            if 'continue' not in data:
+                return
+            continuation = data['continue']
+
+    def _from_list_pages(self, country: str) -> Set[str]:
+        """Links of all candidate list pages, redirects resolved, in one batched query"""
+        universities = set()
+        for query in self._query({
+            'titles': '|'.join(list_page_titles(country)),
+            'redirects': 1,
+            'prop': 'links',
+            'plnamespace': 0,
+            'pllimit': 'max',
+        }):
+            for page in query.get('pages', []):
+                if page.get('missing'):
+                    continue
+                for link in page.get('links', []):
+                    if looks_like_university(link.get('title', '')):
+                        universities.add(link['title'])
+        return universities
+
+    def _from_categories(self, country: str) -> Set[str]:
+        universities = set()
+        country_clean = ' '.join(country.replace(',', '').split())
+        for category in (f"Category:Universities and colleges in {country_clean}",
+                         f"Category:Universities in {country_clean}"):
+            for query in self._query({
+                'list': 'categorymembers',
+                'cmtitle': category,
+                'cmtype': 'page',
+                'cmnamespace': 0,
+                'cmlimit': 'max',
+            }):
+                for member in query.get('categorymembers', []):
+                    if looks_like_university(member.get('title', '')):
+                        universities.add(member['title'])
+            if universities:
+                break
+        return universities
+
+    def _from_search(self, country: str) -> Set[str]:
+        universities = set()
+        for query in self._query({
+            'list': 'search',
+            'srsearch': f"{country} university",
+            'srnamespace': 0,
+            'srlimit': 'max',
+        }):
+            for result in query.get('search', []):
+                title = result.get('title', '')
+                if 'university' in title.lower() or 'college' in title.lower():
+                    universities.add(title)
+            break  # First page of results is enough
+        return universities
+
+
+class WikipediaDumpSource:
+    """
+    University names from a local Wikipedia dump, for offline bulk runs
+    Accepts a MediaWiki XML export (.xml, .xml.bz2, .xml.gz) or a JSONL extract
+    with one {"title": ..., "links": [...]} or {"title": ..., "text": wikitext}
+    object per line. The file is streamed once; only list pages are kept.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._pages: Optional[Dict[str, List[str]]] = None
+        self._redirects: Dict[str, str] = {}
+
+    def fetch_universities(self, country: str) -> List[str]:
+        pages = self._load()
+        universities = set()
+        for title in list_page_titles(country):
+            title = self._redirects.get(title, title)
+            for link in pages.get(title, []):
+                if looks_like_university(link):
+                    universities.add(link)
+        logger.info(f"Wikipedia dump: {len(universities)} universities for {country}")
+        return sorted(universities)
+
+    @staticmethod
+    def _is_list_page(title: str) -> bool:
+        return any(title.startswith(prefix + ' ') for prefix in LIST_PAGE_PREFIXES)
+
+    @staticmethod
+    def _links_from_wikitext(text: str) -> List[str]:
+        return [match.group(1).strip() for match in WIKILINK_RE.finditer(text or '')]
+
+    def _open(self):
+        if self.path.endswith('.bz2'):
+            return bz2.open(self.path, 'rb')
+        if self.path.endswith('.gz'):
+            return gzip.open(self.path, 'rb')
+        return open(self.path, 'rb')
+
+    def _load(self) -> Dict[str, List[str]]:
+        if self._pages is None:
+            self._pages = {}
+            if not os.path.exists(self.path):
+                logger.warning(f"Wikipedia dump not found: {self.path}")
+                return self._pages
+            loader = self._iter_jsonl if '.jsonl' in self.path else self._iter_xml
+            for title, links, redirect in loader():
+                if redirect:
+                    self._redirects[title] = redirect
+                else:
+                    self._pages[title] = links
+            logger.info(f"Loaded {len(self._pages)} list pages from {self.path}")
+        return self._pages
+
+    def _iter_jsonl(self) -> Iterator[Tuple[str, List[str], Optional[str]]]:
+        with self._open() as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                title = record.get('title', '')
+                if not self._is_list_page(title):
+                    continue
+                links = record.get('links') or self._links_from_wikitext(record.get('text', ''))
+                yield title, links, record.get('redirect')
+
+    def _iter_xml(self) -> Iterator[Tuple[str, List[str], Optional[str]]]:
+        """Stream <page> elements, dropping each from the root so memory stays flat"""
+        with self._open() as f:
+            root = None
+            title, redirect, text = None, None, None
+            for event, element in ET.iterparse(f, events=('start', 'end')):
+                if root is None:
+                    root = element
+                    continue
+                if event != 'end':
+                    continue
+                tag = element.tag.rsplit('}', 1)[-1]
+                if tag == 'title':
+                    title = element.text or ''
+                elif tag == 'redirect':
+                    redirect = element.get('title')
+                elif tag == 'text':
+                    text = element.text
+                elif tag == 'page':
+                    if title and self._is_list_page(title):
+                        yield title, self._links_from_wikitext(text), redirect
+                    title, redirect, text = None, None, None
+                    root.clear()
+
+
+def default_wikipedia_source(session: requests.Session, timeout: int = 10, retry_count: int = 3,
+                             scheduler: Optional[RequestScheduler] = None):
+    """Local dump when GUIS_WIKIPEDIA_DUMP points at one, otherwise the MediaWiki API"""
+    dump_path = os.getenv('GUIS_WIKIPEDIA_DUMP')
+    if dump_path:
+        return WikipediaDumpSource(dump_path)
+    return MediaWikiSource(session, timeout=timeout, retry_count=retry_count, scheduler=scheduler)
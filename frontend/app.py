@@ -217,6 +217,41 @@ def make_api_request(endpoint: str, method: str = "GET", data: Dict = None, api_
         return None
 
 
+def run_background_job(endpoint: str, data: Dict, api_url: str = None, poll_interval: float = 2.0):
+    """Submit a background job and poll it until it finishes, showing progress"""
+    submitted = make_api_request(endpoint, method="POST", data=data, api_url=api_url)
+    if not submitted or "job_id" not in submitted:
+        return None
+    
+    job_id = submitted["job_id"]
+    progress_bar = st.progress(0.0)
+    status_text = st.empty()
+    
+    while True:
+        job = make_api_request(f"/api/jobs/{job_id}", api_url=api_url)
+        if not job:
+            return None
+        
+        progress = job.get("progress", {})
+        total = progress.get("total") or 0
+        current = progress.get("current") or 0
+        if total:
+            progress_bar.progress(min(1.0, current / total))
+        status_text.info(f"⏳ {job.get('message') or job.get('status', '')} ({current}/{total})")
+        
+        status = job.get("status")
+        if status == "completed":
+            progress_bar.progress(1.0)
+            status_text.empty()
+            return job.get("result")
+        if status in ("failed", "cancelled", "interrupted"):
+            status_text.empty()
+            st.error(f"Job {status}: {job.get('error') or ''}")
+            return None
+        
+        time.sleep(poll_interval)
+
+
 def display_stats(api_url: str = None):
     """Display system statistics in professional cards"""
     stats = make_api_request("/api/stats", api_url=api_url)
@@ -443,7 +478,7 @@ def main():
         
         if fetch_universities_btn and country:
             with st.spinner(f"🔍 Fetching universities for {country}... This may take a few moments."):
-                result = make_api_request("/api/universities/fetch", method="POST", data={"country": country}, api_url=current_api_url)
+                result = run_background_job("/api/jobs/universities/fetch", {"country": country}, api_url=current_api_url)
                 if result:
                     st.success(f"✅ {result.get('message', '')}")
                     
@@ -489,10 +524,10 @@ def main():
         
         if search_programs_btn and program_country and course:
             with st.spinner(f"🔍 Searching for {course} programs in {program_country}... This may take several minutes."):
-                result = make_api_request("/api/programs/search", method="POST", data={
+                result = run_background_job("/api/jobs/programs/search", {
                     "country": program_country,
                     "course": course
-                }, api_url=current_api_url, timeout=300)
+                }, api_url=current_api_url)
                 
                 if result:
                     st.success(f"✅ {result.get('message', '')}")
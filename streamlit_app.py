@@ -19,6 +19,9 @@ try:
     from metadata_checker import MetadataChecker
     from gotouni_checker import GotoUniChecker
     from ai_query import AIQuery
+    from page_fetcher import PageCache
+    from url_utils import url_key
+    from program_search import ProgramPageIndex, known_website_miss, level_hint
     from sqlalchemy.orm import Session
     BACKEND_AVAILABLE = True
 except Exception as e:
@@ -224,6 +227,12 @@ def search_programs(country: str, course: str):
         total_unis = len(universities)
         status_container.info(f"🔍 Searching {total_unis} universities. Processing one at a time...")
         
+        # Each URL is fetched and parsed once, then shared by all analyzers
+        page_cache = PageCache()
+        
+        # Canonical keys of stored programs, so URL variants aren't stored twice
+        existing_urls = {url_key(u) for (u,) in session.query(Program.program_url)}
+        
         # Process ONE university at a time, complete ALL links before moving to next
         for idx, university in enumerate(universities):
             try:
@@ -234,8 +243,20 @@ def search_programs(country: str, course: str):
                 # Update status
                 status_container.info(f"🔍 [{idx+1}/{total_unis}] Searching: {uni_original[:60]}...")
                 
+                # Resolve the homepage once and remember it (misses too, retried after a while)
+                base_url = university.website_url
+                if not base_url and not known_website_miss(university.website_status, university.website_checked_at):
+                    base_url = course_scraper.resolve_university_url(uni_translated)
+                    university.website_url = base_url
+                    university.website_status = 'resolved' if base_url else 'unresolved'
+                    university.website_checked_at = datetime.utcnow()
+                    session.commit()
+                if not base_url:
+                    status_container.warning(f"⚠️ [{idx+1}/{total_unis}] No website known for {uni_original[:50]}")
+                    continue
+                
                 # Search for courses
-                course_links = course_scraper.search_courses(uni_translated, course)
+                course_links = course_scraper.search_courses(uni_translated, course, base_url=base_url, page_cache=page_cache)
                 
                 if not course_links:
                     status_container.warning(f"⚠️ [{idx+1}/{total_unis}] No links found for {uni_original[:50]}")
@@ -245,43 +266,53 @@ def search_programs(country: str, course: str):
                 
                 # Process ALL links for this university before moving to next
                 uni_programs = []
+                
+                # Stored fingerprints, to collapse mirrors of known program pages
+                near_duplicates = ProgramPageIndex()
+                for program_url, simhash, stored_level in session.query(
+                    Program.program_url, Program.simhash, Program.level
+                ).filter(
+                    Program.university_id == university.id, Program.simhash.isnot(None)
+                ):
+                    near_duplicates.add(program_url, simhash, level=stored_level)
                 for link_idx, link_info in enumerate(course_links):
                     url = link_info['url']
                     
                     # Check if exists
-                    existing = session.query(Program).filter(Program.program_url == url).first()
-                    if existing:
+                    if url_key(url) in existing_urls:
                         continue
+                    existing_urls.add(url_key(url))
                     
                     # Update link status
                     status_container.info(f"🔗 [{idx+1}/{total_unis}] Processing link {link_idx+1}/{len(course_links)}: {url[:60]}...")
                     
+                    # Shared page (already fetched during validation)
+                    page = course_scraper.fetch_page(url, page_cache)
+                    
+                    # Skip near-duplicates of programs already stored for this university
+                    title = link_info.get('title', course)
+                    fingerprint = page.simhash if page else None
+                    page_level = level_hint(f"{title} {page.main_text}") if page else level_hint(title)
+                    if near_duplicates.find_duplicate(url, fingerprint, title, page_level) is not None:
+                        continue
+                    near_duplicates.add(url, fingerprint, title, page_level)
+                    
                     # Detect language
                     try:
-                        is_english, lang_confidence = language_detector.detect_english(url)
+                        is_english, lang_confidence = language_detector.detect_english(url, page=page)
                     except:
                         is_english, lang_confidence = False, 0.0
                     
                     # Detect delivery mode
                     try:
-                        delivery_mode, mode_confidence = language_detector.detect_delivery_mode(url)
+                        delivery_mode, mode_confidence = language_detector.detect_delivery_mode(url, page=page)
                     except:
                         delivery_mode, mode_confidence = "offline", 0.0
                     
                     # Classify (ML + Rule-based)
                     try:
                         # Get page content snippet for better ML classification
-                        page_snippet = None
-                        try:
-                            from backend.scraper import CourseScraper
-                            temp_scraper = CourseScraper()
-                            response = temp_scraper._make_request(url)
-                            if response and response.status_code == 200:
-                                from bs4 import BeautifulSoup
-                                soup = BeautifulSoup(response.content, 'html.parser')
-                                page_snippet = soup.get_text()[:500]  # First 500 chars
-                        except:
-                            pass
+                        page_snippet = page.main_text[:500] if page else None  # First 500 chars of main content
                         
                         # Use ML classifier with page content
                         level, ml_confidence = ml_classifier.classify(
@@ -295,7 +326,7 @@ def search_programs(country: str, course: str):
                     
                     # Get metadata
                     try:
-                        metadata = metadata_checker.check_metadata(url)
+                        metadata = metadata_checker.check_metadata(url, page=page)
                     except:
                         metadata = {'content_hash': None, 'last_checked': datetime.utcnow()}
                     
@@ -321,6 +352,7 @@ def search_programs(country: str, course: str):
                             delivery_mode=delivery_mode,
                             visited=False,
                             content_hash=metadata.get('content_hash'),
+                            simhash=metadata.get('simhash'),
                             last_checked=metadata.get('last_checked'),
                             confidence_score=str(ml_confidence)
                         )
@@ -334,6 +366,7 @@ def search_programs(country: str, course: str):
                             taught_in_english=is_english,
                             visited=False,
                             content_hash=metadata.get('content_hash'),
+                            simhash=metadata.get('simhash'),
                             last_checked=metadata.get('last_checked'),
                             confidence_score=str(ml_confidence)
                         )
@@ -0,0 +1,52 @@
+"""
+Shared test fixtures
+The embedding model is replaced by a small bag-of-words encoder, so the
+classifier and training code run without downloading a model
+"""
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+import ml_classifier  # noqa: E402
+
+DIM = 32
+
+
+class BagOfWordsEncoder:
+    """Hashes words into DIM buckets; similar titles get similar vectors"""
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, sentences, batch_size=32, show_progress_bar=False, **kwargs):
+        vectors = np.zeros((len(sentences), DIM), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            for word in sentence.lower().split():
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % DIM] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.encoded += len(sentences)
+        return vectors / np.clip(norms, 1e-12, None)
+
+    def get_sentence_embedding_dimension(self):
+        return DIM
+
+
+@pytest.fixture
+def fake_embeddings(monkeypatch):
+    """
+    Patch model loading; returns the list of loads as (requested, used) backends
+    onnx backends fall back to torch, as without onnxruntime
+    """
+    loads = []
+
+    def load(model_name, backend='torch'):
+        loads.append((backend, 'torch'))
+        return BagOfWordsEncoder(), 'torch'
+
+    monkeypatch.setattr(ml_classifier, 'load_embedding_model', load)
+    return loads
@@ -0,0 +1,32 @@
+"""
+Main content extraction
+Pages wrapped in one <form> (ASP.NET WebForms) still yield their main text,
+while search and login forms are dropped
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from content_extractor import extract_main_content  # noqa: E402
+
+PARAGRAPH = ("The Master of Science in Data Science covers statistics, machine learning, "
+             "databases and research methods, and ends with a supervised thesis project.")
+
+
+def test_webforms_page_keeps_main_content():
+    html = f"""<html lang="en"><body>
+      <form class="site-search" action="/search"><input name="q"> Search the university website</form>
+      <form id="aspnetForm" method="post" action="./program.aspx">
+        <div class="menu-links"><a href="/">Home</a> <a href="/study">Study</a></div>
+        <div id="content"><h1>Data Science MSc</h1>
+          <p>{PARAGRAPH}</p><p>{PARAGRAPH}</p><p>{PARAGRAPH}</p>
+        </div>
+      </form>
+      <form action="/account/login"><input name="user"> Log in to the student portal</form>
+    </body></html>"""
+    result = extract_main_content(html)
+    assert PARAGRAPH in result['text']
+    assert 'Search the university website' not in result['text']
+    assert 'student portal' not in result['text']
+    assert result['lang'] == 'en'
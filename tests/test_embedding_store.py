@@ -0,0 +1,90 @@
+"""
+Embedding store
+Torn appends are truncated on open, compact() drops superseded rows, and a
+model change moves the old files aside instead of deleting them
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from embedding_store import EmbeddingStore, IDS_FILE, PREVIOUS_DIR, VECTORS_FILE  # noqa: E402
+
+
+def _vectors(n: int, dim: int = 8, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+@pytest.mark.parametrize('dtype', ['float16', 'int8'])
+def test_round_trip(tmp_path, dtype):
+    store = EmbeddingStore(str(tmp_path), dtype=dtype)
+    store.ensure_model('model', 8)
+    vectors = _vectors(5)
+    store.put_many([1, 2, 3, 4, 5], vectors)
+
+    reopened = EmbeddingStore(str(tmp_path))
+    found, decoded = reopened.get_many([5, 1, 9])
+    assert found == [5, 1]
+    assert np.allclose(decoded, vectors[[4, 0]], atol=0.05)
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    store = EmbeddingStore(str(tmp_path), dtype='float16')
+    store.ensure_model('model', 8)
+    store.put_many([1, 2], _vectors(2))
+    # A crash after the vector was written but before (part of) its id
+    with open(os.path.join(str(tmp_path), VECTORS_FILE), 'ab') as f:
+        f.write(np.zeros(8, dtype=np.float16).tobytes())
+    with open(os.path.join(str(tmp_path), IDS_FILE), 'ab') as f:
+        f.write(b'\x03\x00\x00')
+
+    reopened = EmbeddingStore(str(tmp_path))
+    assert len(reopened) == 2 and 3 not in reopened
+    assert os.path.getsize(os.path.join(str(tmp_path), VECTORS_FILE)) == 2 * 8 * 2
+    assert os.path.getsize(os.path.join(str(tmp_path), IDS_FILE)) == 2 * 8
+    reopened.put_many([3], _vectors(1, seed=1))
+    assert EmbeddingStore(str(tmp_path)).get_many([1, 2, 3])[0] == [1, 2, 3]
+
+
+def test_compact_drops_superseded_rows(tmp_path):
+    store = EmbeddingStore(str(tmp_path), dtype='int8')
+    store.ensure_model('model', 8)
+    first, second = _vectors(3), _vectors(3, seed=1)
+    store.put_many([1, 2, 3], first)
+    store.put_many([2, 3], second[1:])
+    assert store.stats()['rows'] == 5
+
+    assert store.compact() == 2
+    assert store.stats()['rows'] == 3
+    reopened = EmbeddingStore(str(tmp_path))
+    ids, vectors = next(reopened.iter_chunks())
+    expected = {1: first[0], 2: second[1], 3: second[2]}
+    for item_id, vector in zip(ids.tolist(), vectors):
+        assert np.allclose(vector, expected[item_id], atol=0.05)
+
+
+def test_backend_suffix_keeps_the_store(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.ensure_model('model@int8', 8)
+    store.put_many([1, 2], _vectors(2))
+
+    assert not store.ensure_model('model', 8)
+    assert len(EmbeddingStore(str(tmp_path))) == 2
+
+
+def test_model_change_moves_old_files_aside(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.ensure_model('model', 8)
+    store.set_meta(legacy_imported=True)
+    store.put_many([1, 2], _vectors(2))
+
+    assert store.ensure_model('other-model', 16)
+    assert len(store) == 0 and store.generation == 2
+    store.put_many([7], _vectors(1, dim=16))
+    assert EmbeddingStore(str(tmp_path)).get_many([1, 7])[0] == [7]
+
+    previous = EmbeddingStore(os.path.join(str(tmp_path), PREVIOUS_DIR))
+    assert (previous.model, previous.dim, len(previous)) == ('model', 8, 2)
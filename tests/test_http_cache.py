@@ -0,0 +1,53 @@
+"""
+HTTP cache limits and cached responses
+Opening the cache drops entries past max_age and the oldest beyond max_entries
+"""
+import os
+import sys
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from http_cache import CachingAdapter, HTTPCache  # noqa: E402
+
+
+def _response(body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    response.headers['Content-Type'] = 'text/html'
+    return response
+
+
+def test_limits_apply_when_opened(tmp_path):
+    db_path = str(tmp_path / 'cache.db')
+    cache = HTTPCache(db_path, max_age=None, max_entries=None)
+    for i in range(5):
+        cache.store(f'https://uni.example/{i}', _response(b'page'))
+    # Entry 0 is 40 days old, the rest ordered by index
+    with cache._lock:
+        cache._conn.execute("UPDATE responses SET stored_at = stored_at - 40 * 86400 WHERE url LIKE '%/0'")
+        for i in range(1, 5):
+            cache._conn.execute("UPDATE responses SET stored_at = stored_at - ? WHERE url LIKE ?", (5 - i, f'%/{i}'))
+        cache._conn.commit()
+
+    reopened = HTTPCache(db_path, max_age=30 * 86400, max_entries=3)
+    assert reopened.stats()['entries'] == 3
+    assert reopened.get('https://uni.example/0') is None
+    assert reopened.get('https://uni.example/1') is None
+    assert reopened.get('https://uni.example/4')['body'] == b'page'
+
+
+def test_cached_redirect_keeps_its_reason(tmp_path):
+    cache = HTTPCache(str(tmp_path / 'cache.db'))
+    response = _response(b'')
+    response.status_code = 308
+    response.headers['Location'] = 'https://uni.example/new'
+    cache.store('https://uni.example/old', response)
+
+    request = requests.Request('GET', 'https://uni.example/old').prepare()
+    cached = CachingAdapter(cache).send(request)
+    assert (cached.status_code, cached.reason) == (308, 'Permanent Redirect')
+    assert cached.headers['Location'] == 'https://uni.example/new'
+    assert cache.stats()['hits'] == 1
@@ -0,0 +1,49 @@
+"""
+Job cancellation
+A cancel stored by another process reaches the running job through the database
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from database import Database, Job  # noqa: E402
+from jobs import JobManager  # noqa: E402
+
+
+def _wait_for(manager: JobManager, job_id: str, statuses, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job and job['status'] in statuses:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} never reached {statuses}")
+
+
+def test_cancel_from_another_manager(tmp_path):
+    db_path = str(tmp_path / 'guis.db')
+    runner = JobManager(Database(db_path))
+    started = threading.Event()
+
+    def work(ctx):
+        ctx.cancel_poll_interval = 0.05
+        started.set()
+        for _ in range(400):
+            ctx.check_cancelled()
+            time.sleep(0.025)
+        return {}
+
+    job_id = runner.submit('test', {}, work)
+    assert started.wait(5)
+    # Another process only shares the database
+    session = Database(db_path).get_session()
+    try:
+        session.query(Job).filter(Job.id == job_id).update({Job.cancel_requested: True})
+        session.commit()
+    finally:
+        session.close()
+
+    assert _wait_for(runner, job_id, ('cancelled', 'completed'))['status'] == 'cancelled'
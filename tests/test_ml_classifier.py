@@ -0,0 +1,38 @@
+"""
+Embedding namespace and shapes of the UG/PG classifier
+The cache namespace reflects the backend actually loaded, not the one asked for
+"""
+from embedding_cache import EmbeddingCache
+from ml_classifier import MLClassifier
+from ml_training import ModelRegistry, ReplayStore
+
+from conftest import DIM
+
+
+def _classifier(tmp_path, backend='torch'):
+    return MLClassifier(
+        embedding_cache=EmbeddingCache(str(tmp_path / 'embeddings.db')), backend=backend,
+        registry=ModelRegistry(str(tmp_path / 'models')), replay_store=ReplayStore(str(tmp_path / 'training.db'))
+    )
+
+
+def test_namespace_follows_fallback_backend(tmp_path, fake_embeddings):
+    classifier = _classifier(tmp_path, backend='onnx-int8')
+    assert not classifier.model_loaded
+    # Reading the namespace settles the backend first
+    assert classifier.cache_model_name == 'all-MiniLM-L6-v2'
+    assert fake_embeddings == [('onnx-int8', 'torch')]
+
+    classifier.embed_batch(['MSc Data Science'])
+    key = EmbeddingCache.key('all-MiniLM-L6-v2', 'MSc Data Science')
+    assert key in classifier.embedding_cache.get_many([key])
+
+
+def test_empty_batch_has_embedding_width(tmp_path, fake_embeddings):
+    _classifier(tmp_path).classify('Data Science program')  # trains and saves a version
+
+    restarted = _classifier(tmp_path)
+    assert restarted.embed_batch([]).shape == (0, DIM)
+    assert not restarted.model_loaded  # width taken from the trained classifier
+    assert restarted.embed_batch(['BSc Physics']).shape == (1, DIM)
+    assert restarted.embed_batch([]).shape == (0, DIM)
@@ -0,0 +1,119 @@
+"""
+Incremental training of the UG/PG classifier
+Replay store bookkeeping, versioned model files, one incremental run, and
+feedback stored under another embedding namespace still being trained on
+"""
+import os
+
+import numpy as np
+import pytest
+
+from embedding_cache import EmbeddingCache
+from ml_classifier import MLClassifier
+from ml_training import ModelRegistry, ReplayStore, SEED_EXAMPLES, new_incremental_classifier
+
+from conftest import DIM
+
+MODEL = 'all-MiniLM-L6-v2'
+
+
+def _vector(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=DIM).astype(np.float32)
+
+
+def _classifier(tmp_path, backend='torch'):
+    return MLClassifier(
+        embedding_cache=EmbeddingCache(str(tmp_path / 'embeddings.db')), backend=backend,
+        registry=ModelRegistry(str(tmp_path / 'models')), replay_store=ReplayStore(str(tmp_path / 'training.db'))
+    )
+
+
+def test_replay_store_bookkeeping(tmp_path):
+    store = ReplayStore(str(tmp_path / 'training.db'))
+    ids = store.add_many(MODEL, [
+        {'text': 'MSc Physics', 'label': 1},
+        {'label': 0, 'vector': _vector(1), 'program_id': 7},
+    ])
+    # A new label for program 7 replaces the earlier one
+    ids.extend(store.add_many(MODEL, [{'label': 1, 'vector': _vector(2), 'program_id': 7}]))
+    pending = store.pending(MODEL)
+    assert [row_id for row_id, _, _, _ in pending] == [ids[0], ids[2]]
+    assert pending[0][3] is None
+    assert np.allclose(pending[1][3], _vector(2), atol=1e-2)  # stored as float16
+    assert store.pending_stats(MODEL)[0] == 2
+    assert store.pending_stats('other')[0] == 0
+
+    store.set_vectors([(ids[0], _vector(3))])
+    store.mark_trained([ids[0], ids[2]], version=1)
+    assert store.pending(MODEL) == []
+    X, y = store.sample(MODEL, 10)
+    assert X.shape == (2, DIM) and y.tolist() == [1, 1]  # both trained examples are PG
+    assert store.counts(MODEL) == {'feedback': {'PG': 2}}
+
+
+def test_migrate_moves_labels_to_the_new_namespace(tmp_path):
+    store = ReplayStore(str(tmp_path / 'training.db'))
+    old = f'{MODEL}@int8'
+    store.add_many(old, [
+        {'text': 'MSc Physics', 'label': 1, 'vector': _vector(1)},
+        {'label': 0, 'vector': _vector(2), 'program_id': 3},
+        {'text': 'BSc IT', 'label': 0, 'vector': _vector(3), 'source': 'seed'},
+    ])
+    store.add_many('other-model', [{'label': 1, 'vector': np.ones(8, dtype=np.float32)}])
+    store.mark_trained([1, 2], version=4)
+
+    assert store.migrate(MODEL, MODEL) == 2
+    pending = {text: vector for _, text, _, vector in store.pending(MODEL)}
+    assert pending['MSc Physics'] is None  # re-embedded by the next run
+    assert pending[None] is not None  # same base model: the vector is kept
+    assert store.counts(old) == {}
+    assert store.counts('other-model') == {'feedback': {'PG': 1}}
+
+
+def test_registry_save_prune_activate(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'models'), keep_versions=2)
+    assert registry.load() is None
+    versions = [registry.save(new_incremental_classifier(), {'kind': 'full', 'n': n}) for n in range(3)]
+    assert versions == [1, 2, 3]
+    assert registry.versions() == [2, 3]
+    assert registry.current_version() == 3
+
+    registry.activate(2)
+    model, metadata = registry.load()
+    assert metadata['version'] == 2 and metadata['n'] == 1
+    with pytest.raises(ValueError):
+        registry.activate(1)
+    assert sorted(os.listdir(str(tmp_path / 'models'))) == [
+        'current.json', 'model-v000002.json', 'model-v000002.pkl', 'model-v000003.json', 'model-v000003.pkl'
+    ]
+
+
+def test_incremental_run(tmp_path, fake_embeddings):
+    classifier = _classifier(tmp_path)
+    classifier.warm_up()  # initial full fit over the seeds
+    assert classifier.model_version == 1
+    assert classifier.model_metadata['examples'] == len(SEED_EXAMPLES)
+
+    version = classifier.update_model(['Graduate Diploma in Nursing', 'Foundation Year in Art'], [1, 0])
+    assert version == 2 and classifier.model_version == 2
+    metadata = classifier.model_metadata
+    assert (metadata['kind'], metadata['examples'], metadata['parent_version']) == ('incremental', 2, 1)
+    assert metadata['replayed'] > 0
+    assert classifier.trainer.pending_stats()[0] == 0
+    assert classifier.classify('Graduate Diploma in Nursing')[0] in ('UG', 'PG')
+
+
+def test_feedback_under_an_unavailable_backend_is_trained(tmp_path, fake_embeddings):
+    # Feedback stored by an earlier run that really had int8 inference
+    ReplayStore(str(tmp_path / 'training.db')).add_many(
+        f'{MODEL}@int8', [{'text': 'Graduate Diploma in Nursing', 'label': 1, 'source': 'feedback'}]
+    )
+    classifier = _classifier(tmp_path, backend='onnx-int8')  # falls back to torch
+    assert classifier.trainer.pending_stats()[0] == 1  # counted without loading the model
+    assert not classifier.model_loaded
+
+    classifier.warm_up()
+    assert classifier.cache_model_name == MODEL
+    assert classifier.trainer.pending_stats()[0] == 0
+    assert classifier.trainer.counts()['feedback'] == {'PG': 1}
+    assert classifier.model_metadata['embedding_model'] == MODEL
@@ -0,0 +1,71 @@
+"""
+Near-duplicate collapse of program pages
+UG and PG pages built from one template must both be kept; an edited copy
+of the same page must still collapse
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from simhash import compute_simhash, hamming_distance, NEAR_DUPLICATE_DISTANCE  # noqa: E402
+from program_search import ProgramPageIndex, level_hint  # noqa: E402
+
+FILLER = (
+    "students learn research methods statistics programming machine learning ethics and communication "
+    "through lectures seminars projects and a final thesis supervised by faculty members of the department "
+    "graduates work in industry government and academia across the region and abroad"
+).split()
+
+
+def program_page(level: str, seed: int, date: str = "1 March 2025") -> str:
+    """400-word page of one template; only the degree and duration words differ by level"""
+    rng = random.Random(seed)
+    degree, years = ("bachelor", "three") if level == 'UG' else ("master", "two")
+    words = [rng.choice(FILLER) for _ in range(380)]
+    header = f"data science {degree} programme lasting {years} years applications close {date}".split()
+    return ' '.join(header + words[:190] + [degree, years] + words[190:])
+
+
+def test_template_siblings_are_close_in_bits():
+    # The reason the fingerprint alone can't decide
+    close = 0
+    for seed in range(50):
+        ug, pg = compute_simhash(program_page('UG', seed)), compute_simhash(program_page('PG', seed))
+        close += hamming_distance(ug, pg) <= NEAR_DUPLICATE_DISTANCE
+    assert close > 0
+
+
+def test_ug_and_pg_siblings_are_both_kept():
+    for seed in range(50):
+        ug_text, pg_text = program_page('UG', seed), program_page('PG', seed)
+        index = ProgramPageIndex()
+        index.add("https://uni.example/programs/data-science-bsc/", compute_simhash(ug_text),
+                  "Data Science", level_hint(ug_text))
+        duplicate = index.find_duplicate("https://uni.example/programs/data-science-msc/",
+                                         compute_simhash(pg_text), "Data Science", level_hint(pg_text))
+        assert duplicate is None
+
+
+def test_stored_ug_page_does_not_hide_pg_sibling():
+    index = ProgramPageIndex()
+    ug_text, pg_text = program_page('UG', 1), program_page('PG', 1)
+    # Stored programs carry their URL and level, not a title
+    index.add("https://uni.example/programs/data-science-bsc", compute_simhash(ug_text), level='UG')
+    assert index.find_duplicate("https://uni.example/programs/data-science-msc",
+                                compute_simhash(pg_text), "Data Science MSc", level_hint(pg_text)) is None
+
+
+def test_edited_copy_of_same_page_collapses():
+    original, edited = program_page('PG', 7), program_page('PG', 7, date="15 April 2025")
+    assert hamming_distance(compute_simhash(original), compute_simhash(edited)) <= NEAR_DUPLICATE_DISTANCE
+
+    index = ProgramPageIndex()
+    url = "https://www.uni.example/programs/data-science-msc/"
+    index.add(url, compute_simhash(original), "Data Science MSc", level_hint(original))
+    # URL variant (no www, index file) and same title under another URL
+    assert index.find_duplicate("https://uni.example/programs/data-science-msc/index.html",
+                                compute_simhash(edited), None, level_hint(edited)) == url
+    assert index.find_duplicate("https://uni.example/study/ds-msc", compute_simhash(edited),
+                                "Data Science MSc", level_hint(edited)) == url
@@ -0,0 +1,33 @@
+"""
+Link deduplication
+Variants of one page collapse to one entry that keeps the site's own URL;
+pages on different sites under one public suffix are never variants
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from url_utils import LinkSet, url_variants  # noqa: E402
+
+
+def test_link_set_keeps_original_url():
+    links = LinkSet()
+    assert links.add('http://uni.example/Programs/Data%20Science/;jsessionid=1?b=2&a=1', 'Data Science')
+    assert not links.add('https://UNI.example/Programs/Data%20Science?a=1&b=2&utm_source=x#top')
+    assert not links.add('mailto:office@uni.example')
+
+    assert len(links) == 1
+    entry = links.to_list()[0]
+    # https variant wins, but as written by the site rather than canonicalized
+    assert entry['url'] == 'https://UNI.example/Programs/Data%20Science?a=1&b=2&utm_source=x#top'
+    assert entry['title'] == 'Data Science'
+    assert 'http://uni.example/Programs/Data%20Science/?a=1&b=2' in links
+
+
+def test_url_variants_stay_within_one_site():
+    assert url_variants('https://www.uni.example/study/msc/', 'http://uni.example/Study/MSc/index.html')
+    assert url_variants('https://en.uni.example/study/msc', 'https://uni.example/study/msc')
+    assert not url_variants('https://www.ox.ac.uk/admissions/msc', 'https://www.cam.ac.uk/admissions/msc')
+    assert not url_variants('https://www.unimelb.edu.au/study/msc', 'https://www.monash.edu.au/study/msc')
+    assert not url_variants('https://en.uni.example/', 'https://uni.example/')
@@ -0,0 +1,58 @@
+"""
+Vector index
+Exact search must agree with brute-force cosine similarity as the index
+grows, when vectors are replaced and when items are excluded
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from vector_index import VectorIndex  # noqa: E402
+
+
+def _brute_force(vectors: dict, query: np.ndarray, k: int, exclude=()):
+    query = query / np.linalg.norm(query)
+    scores = {item_id: float(vector @ query / np.linalg.norm(vector))
+              for item_id, vector in vectors.items() if item_id not in exclude}
+    return sorted(scores, key=lambda item_id: -scores[item_id])[:k]
+
+
+def test_top_k_matches_brute_force_while_growing():
+    rng = np.random.default_rng(0)
+    index = VectorIndex(initial_capacity=4, use_hnsw=False)
+    vectors = {}
+    for start in range(0, 300, 50):
+        ids = list(range(start, start + 50))
+        batch = rng.normal(size=(50, 16)).astype(np.float32)
+        index.add_many(ids, batch)
+        vectors.update(zip(ids, batch))
+    assert len(index) == 300
+
+    for query in rng.normal(size=(5, 16)).astype(np.float32):
+        hits = index.search(query, k=10)
+        assert [item_id for item_id, _ in hits] == _brute_force(vectors, query, 10)
+        scores = [score for _, score in hits]
+        assert scores == sorted(scores, reverse=True)
+
+
+def test_replace_and_exclude():
+    rng = np.random.default_rng(1)
+    index = VectorIndex(use_hnsw=False)
+    vectors = dict(enumerate(rng.normal(size=(20, 8)).astype(np.float32)))
+    index.add_many(list(vectors), np.stack(list(vectors.values())))
+
+    # Replacing keeps one row per id; the new vector is what's searched
+    query = rng.normal(size=8).astype(np.float32)
+    vectors[3] = query * 2
+    index.add_many([3, 3], np.stack([-query, query * 2]))  # later duplicate wins
+    assert len(index) == 20
+    assert index.search(query, k=1)[0][0] == 3
+    assert np.allclose(index.vector(3), query / np.linalg.norm(query), atol=1e-6)
+
+    hits = index.search(query, k=5, exclude=[3, 7])
+    assert [item_id for item_id, _ in hits] == _brute_force(vectors, query, 5, exclude={3, 7})
+    assert index.search(query, k=50, exclude=[3])[-1][0] != 3
+    assert len(index.search(query, k=50, exclude=[3])) == 19